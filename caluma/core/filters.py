@@ -1,4 +1,4 @@
-from functools import reduce
+from functools import partial, reduce
 
 import graphene
 from django import forms
@@ -24,7 +24,7 @@ from django_filters.rest_framework import (
 from graphene import Enum, InputObjectType, List
 from graphene.types import generic
 from graphene.types.utils import get_type
-from graphene.utils.str_converters import to_camel_case
+from graphene.utils.str_converters import to_camel_case, to_snake_case
 from graphene_django import filter
 from graphene_django.converter import convert_choice_name
 from graphene_django.filter.filterset import GrapheneFilterSetMixin
@@ -38,7 +38,7 @@ from .forms import (
     SlugMultipleChoiceField,
 )
 from .relay import extract_global_id
-from .types import DjangoConnectionField
+from .types import DjangoConnectionField, get_prefetched
 
 
 class CompositeFieldClass(forms.MultiValueField):
@@ -416,6 +416,10 @@ class MetaFilterSet(FilterSet):
     meta_value = JSONValueFilter(field_name="meta")
 
 
+def _resolve_prefetched(prefetched, root, info, **args):
+    return prefetched
+
+
 class DjangoFilterConnectionField(
     filter.DjangoFilterConnectionField, DjangoConnectionField
 ):
@@ -450,12 +454,18 @@ class DjangoFilterConnectionField(
         # and should only be done if there are actual filter arguments
         filter_kwargs = {k: v for k, v in args.items() if k in filtering_args}
         if not filter_kwargs:
+            # connection may already be loaded for all nodes of the parent
+            # connection, see `CountableConnectionBase.resolve_edges`
+            prefetched = get_prefetched(root, to_snake_case(info.field_name))
+            if prefetched is not None:
+                resolver = partial(_resolve_prefetched, prefetched)
+
             # skip parent DjangoFilterConnetionField which does filtering and directly
             # go to its parent
             return super(filter.DjangoFilterConnectionField, cls).connection_resolver(
                 resolver,
                 connection,
-                default_manager.get_queryset(),
+                default_manager,
                 max_limit,
                 enforce_first_or_last,
                 root,
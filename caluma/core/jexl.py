@@ -1,8 +1,11 @@
-from itertools import count
+from collections import Counter, OrderedDict, namedtuple
+from functools import partial
+from threading import Lock
 
 import pyjexl
 from pyjexl.analysis import ValidatingAnalyzer
-from pyjexl.exceptions import ParseError
+from pyjexl.evaluator import Context
+from pyjexl.exceptions import MissingTransformError, ParseError
 from rest_framework import exceptions
 
 
@@ -12,38 +15,351 @@ class Cache:
     For JEXL expressions, we cannot use django's cache infrastructure, as the
     cached objects are pickled. This won't work for parsed JEXL expressions, as
     they contain lambdas etc.
+
+    Least recently used entries are evicted once `max_size` is exceeded. Access
+    is guarded by a lock, so the cache may be shared between threads.
     """
 
-    def __init__(self, max_size=2000, evict_to=1500):
+    def __init__(self, max_size=2000):
         self.max_size = max_size
-        self.evict_to = evict_to
 
-        self._cache = {}
-        self._mru = {}
-        self._mru_count = count()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._cache = OrderedDict()
+        self._lock = Lock()
 
     def get_or_set(self, key, default):
-        if key in self._cache:
-            self._mru[key] = next(self._mru_count)
-            return self._cache[key]
+        with self._lock:
+            if key in self._cache:
+                self.hits += 1
+                self._cache.move_to_end(key)
+                return self._cache[key]
+            self.misses += 1
 
-        ret = self._cache[key] = default()
-        self._mru[key] = next(self._mru_count)
+        # compute value outside of lock so other threads are not blocked
+        ret = default()
 
-        if len(self._mru) > self.max_size:
-            self._evict()
+        with self._lock:
+            self._cache[key] = ret
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.max_size:
+                self._cache.popitem(last=False)
+                self.evictions += 1
 
         return ret
 
-    def _evict(self):
-        to_purge = list(sorted(self._cache.keys(), key=lambda key: self._mru[key]))
-        # to_purge contains all keys, but we only want to evict the oldest
-        # ones
-        num_to_evict = len(to_purge) - self.evict_to
+    def stats(self):
+        return {
+            "size": len(self._cache),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+class Compiler:
+    """Compile parsed JEXL expressions into a tree of python closures.
+
+    pyjexl's evaluator walks the AST on every evaluation, dispatching on the
+    node type of every visited node. Compiling does this dispatch only once.
+
+    The resulting callable takes the evaluation context and the transforms to
+    apply, so a compiled expression is independent of the JEXL instance and
+    can be cached and shared like a parsed one. Evaluation semantics are the
+    same as pyjexl's `Evaluator`.
+    """
+
+    def compile(self, expression):
+        method = getattr(
+            self, "compile_" + type(expression).__name__, self.generic_compile
+        )
+        return method(expression)
+
+    def compile_BinaryExpression(self, exp):
+        evaluate_operator = exp.operator.evaluate
+        left = self.compile(exp.left)
+        right = self.compile(exp.right)
+
+        def binary_expression(context, transforms):
+            return evaluate_operator(
+                left(context, transforms), right(context, transforms)
+            )
+
+        return binary_expression
+
+    def compile_UnaryExpression(self, exp):
+        evaluate_operator = exp.operator.evaluate
+        right = self.compile(exp.right)
+
+        def unary_expression(context, transforms):
+            return evaluate_operator(right(context, transforms))
+
+        return unary_expression
+
+    def compile_Literal(self, literal):
+        value = literal.value
+
+        def literal_value(context, transforms):
+            return value
+
+        return literal_value
+
+    def compile_Identifier(self, identifier):
+        name = identifier.value
+
+        if identifier.relative:
+
+            def identifier_value(context, transforms):
+                return context.relative_value.get(name, None)
+
+        elif identifier.subject:
+            subject = self.compile(identifier.subject)
+
+            def identifier_value(context, transforms):
+                return subject(context, transforms).get(name, None)
+
+        else:
+
+            def identifier_value(context, transforms):
+                return context.get(name, None)
+
+        return identifier_value
+
+    def compile_ObjectLiteral(self, object_literal):
+        items = [
+            (key, self.compile(value)) for key, value in object_literal.value.items()
+        ]
+
+        def object_literal_value(context, transforms):
+            return {key: value(context, transforms) for key, value in items}
+
+        return object_literal_value
+
+    def compile_ArrayLiteral(self, array_literal):
+        values = [self.compile(value) for value in array_literal.value]
+
+        def array_literal_value(context, transforms):
+            return [value(context, transforms) for value in values]
+
+        return array_literal_value
+
+    def compile_Transform(self, transform):
+        name = transform.name
+        args = [self.compile(arg) for arg in transform.args]
+        subject = self.compile(transform.subject)
+
+        def transform_value(context, transforms):
+            try:
+                transform_func = transforms[name]
+            except KeyError:
+                raise MissingTransformError(
+                    f'No transform found with the name "{name}"'
+                )
+
+            # pyjexl evaluates transform arguments without context
+            return transform_func(
+                subject(context, transforms),
+                *[arg(Context(), transforms) for arg in args],
+            )
+
+        return transform_value
+
+    def compile_FilterExpression(self, filter_expression):
+        subject = self.compile(filter_expression.subject)
+        expression = self.compile(filter_expression.expression)
+
+        if filter_expression.relative:
+
+            def filter_value(context, transforms):
+                return [
+                    value
+                    for value in subject(context, transforms)
+                    if expression(context.with_relative(value), transforms)
+                ]
+
+            return filter_value
+
+        def filter_value(context, transforms):
+            values = subject(context, transforms)
+            key = expression(context, transforms)
+            if key is True:
+                return values
+            elif key is False:
+                return None
+            try:
+                return values[key]
+            except (IndexError, KeyError):
+                return None
+
+        return filter_value
+
+    def compile_ConditionalExpression(self, conditional):
+        test = self.compile(conditional.test)
+        consequent = self.compile(conditional.consequent)
+        alternate = self.compile(conditional.alternate)
+
+        def conditional_value(context, transforms):
+            if test(context, transforms):
+                return consequent(context, transforms)
+            return alternate(context, transforms)
+
+        return conditional_value
+
+    def generic_compile(self, expression):
+        raise ValueError("Could not compile expression: " + repr(expression))
+
+
+#: Transforms used by batch compiled expressions
+BatchTransforms = namedtuple("BatchTransforms", ["transforms", "batch_transforms"])
+
+
+class BatchCompiler:
+    """Compile parsed JEXL expressions to evaluate them for many rows at once.
+
+    The resulting callable takes the context shared by all rows, the
+    `BatchTransforms` to apply and a list of row indexes. It returns a list
+    holding the value of every row, computing each node with one operation
+    over all rows.
+
+    Transforms listed in `BatchTransforms.batch_transforms` are called once
+    with the subjects of all rows and the row indexes, other transforms are
+    applied row by row.
+
+    Filter expressions are not supported and raise a `ValueError`.
+    """
+
+    def compile(self, expression):
+        method = getattr(
+            self, "compile_" + type(expression).__name__, self.generic_compile
+        )
+        return method(expression)
+
+    def compile_BinaryExpression(self, exp):
+        evaluate_operator = exp.operator.evaluate
+        left = self.compile(exp.left)
+        right = self.compile(exp.right)
+
+        def binary_expression(context, transforms, rows):
+            return list(
+                map(
+                    evaluate_operator,
+                    left(context, transforms, rows),
+                    right(context, transforms, rows),
+                )
+            )
+
+        return binary_expression
+
+    def compile_UnaryExpression(self, exp):
+        evaluate_operator = exp.operator.evaluate
+        right = self.compile(exp.right)
+
+        def unary_expression(context, transforms, rows):
+            return list(map(evaluate_operator, right(context, transforms, rows)))
+
+        return unary_expression
+
+    def compile_Literal(self, literal):
+        value = literal.value
+
+        def literal_values(context, transforms, rows):
+            return [value] * len(rows)
 
-        for key in to_purge[:num_to_evict]:
-            del self._cache[key]
-            del self._mru[key]
+        return literal_values
+
+    def compile_Identifier(self, identifier):
+        if identifier.relative:
+            return self.generic_compile(identifier)
+
+        name = identifier.value
+
+        if identifier.subject:
+            subject = self.compile(identifier.subject)
+
+            def identifier_values(context, transforms, rows):
+                return [
+                    value.get(name, None)
+                    for value in subject(context, transforms, rows)
+                ]
+
+        else:
+
+            def identifier_values(context, transforms, rows):
+                return [context.get(name, None)] * len(rows)
+
+        return identifier_values
+
+    def compile_ObjectLiteral(self, object_literal):
+        keys = list(object_literal.value.keys())
+        values = [self.compile(value) for value in object_literal.value.values()]
+
+        def object_literal_values(context, transforms, rows):
+            if not values:
+                return [{} for row in rows]
+
+            columns = [value(context, transforms, rows) for value in values]
+            return [dict(zip(keys, row_values)) for row_values in zip(*columns)]
+
+        return object_literal_values
+
+    def compile_ArrayLiteral(self, array_literal):
+        values = [self.compile(value) for value in array_literal.value]
+
+        def array_literal_values(context, transforms, rows):
+            if not values:
+                return [[] for row in rows]
+
+            columns = [value(context, transforms, rows) for value in values]
+            return [list(row_values) for row_values in zip(*columns)]
+
+        return array_literal_values
+
+    def compile_Transform(self, transform):
+        name = transform.name
+        # pyjexl evaluates transform arguments without context, so they are
+        # the same for all rows
+        args = [Compiler().compile(arg) for arg in transform.args]
+        subject = self.compile(transform.subject)
+
+        def transform_values(context, transforms, rows):
+            subjects = subject(context, transforms, rows)
+            arg_values = [arg(Context(), transforms.transforms) for arg in args]
+
+            if name in transforms.batch_transforms:
+                return transforms.batch_transforms[name](subjects, rows, *arg_values)
+
+            try:
+                transform_func = transforms.transforms[name]
+            except KeyError:
+                raise MissingTransformError(
+                    f'No transform found with the name "{name}"'
+                )
+
+            return [transform_func(value, *arg_values) for value in subjects]
+
+        return transform_values
+
+    def compile_ConditionalExpression(self, conditional):
+        test = self.compile(conditional.test)
+        consequent = self.compile(conditional.consequent)
+        alternate = self.compile(conditional.alternate)
+
+        def conditional_values(context, transforms, rows):
+            # only evaluate the branch taken by each row
+            tests = test(context, transforms, rows)
+            true_rows = [row for row, value in zip(rows, tests) if value]
+            false_rows = [row for row, value in zip(rows, tests) if not value]
+
+            values = dict(zip(true_rows, consequent(context, transforms, true_rows)))
+            values.update(zip(false_rows, alternate(context, transforms, false_rows)))
+            return [values[row] for row in rows]
+
+        return conditional_values
+
+    def generic_compile(self, expression):
+        raise ValueError("Could not batch compile expression: " + repr(expression))
 
 
 class JexlValidator(object):
@@ -58,6 +374,27 @@ class JexlValidator(object):
 
 class JEXL(pyjexl.JEXL):
     expr_cache = Cache()
+    compiled_cache = Cache()
+
+    # transforms whose result only depends on their subject and arguments
+    pure_transforms = frozenset()
+
+    constant_cache = Cache()
+    constant_stats = Counter()
+    _constant_stats_lock = Lock()
+
+    batch_compiled_cache = Cache()
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.batch_transforms = {}
+
+    def add_batch_transform(self, name, func):
+        """Add transform called once with the subjects of all rows in batches.
+
+        See `evaluate_batch`.
+        """
+        self.batch_transforms[name] = func
 
     def parse(self, expression):
         parsed_expression = self.expr_cache.get_or_set(
@@ -65,9 +402,80 @@ class JEXL(pyjexl.JEXL):
         )
         return parsed_expression
 
-    def analyze(self, expression, analyzer_class):
-        # some common shortcuts, no need to invoke JEXL engine for real
-        return super().analyze(expression, analyzer_class)
+    def compile(self, expression):
+        compiled_expression = self.compiled_cache.get_or_set(
+            expression, lambda: Compiler().compile(self.parse(expression))
+        )
+        return compiled_expression
+
+    def compile_batch(self, expression):
+        compiled_expression = self.batch_compiled_cache.get_or_set(
+            expression, lambda: BatchCompiler().compile(self.parse(expression))
+        )
+        return compiled_expression
+
+    def evaluate_batch(self, expression, size, context=None):
+        """Evaluate expression for `size` rows at once.
+
+        Returns a list with the value of every row. Only transforms added with
+        `add_batch_transform` can return different values per row.
+
+        Raises `ValueError` if expression can't be evaluated in a batch (see
+        `BatchCompiler`).
+        """
+        compiled_expression = self.compile_batch(expression)
+        context = Context(context) if context is not None else self.context
+        return compiled_expression(
+            context,
+            BatchTransforms(self.config.transforms, self.batch_transforms),
+            list(range(size)),
+        )
+
+    def warm_up(self, expressions):
+        """Parse and compile given expressions ahead of their first evaluation.
+
+        Invalid expressions are skipped.
+        """
+        for expression in expressions:
+            try:
+                self.compile(expression)
+            except ParseError:
+                pass
+
+    def is_constant(self, expression):
+        """Check whether expression evaluates to the same value in any context."""
+        return not any(
+            self.analyze(
+                expression,
+                partial(ConstantAnalyzer, pure_transforms=self.pure_transforms),
+            )
+        )
+
+    def _fold_constant(self, expression):
+        if not self.is_constant(expression):
+            return False, None
+
+        value = self.compile(expression)(Context(), self.config.transforms)
+        # mutable values can't be shared between evaluations
+        if not isinstance(value, (bool, int, float, str, type(None))):
+            return False, None
+
+        return True, value
+
+    def evaluate(self, expression, context=None):
+        # constant expressions (e.g. the common "true" and "false") are only
+        # evaluated once per expression
+        is_constant, value = self.constant_cache.get_or_set(
+            (type(self), expression), lambda: self._fold_constant(expression)
+        )
+        with self._constant_stats_lock:
+            self.constant_stats["folded" if is_constant else "evaluated"] += 1
+        if is_constant:
+            return value
+
+        compiled_expression = self.compile(expression)
+        context = Context(context) if context is not None else self.context
+        return compiled_expression(context, self.config.transforms)
 
     def validate(self, expression, ValidatingAnalyzerClass=ValidatingAnalyzer):
         try:
@@ -92,3 +500,40 @@ class ExtractTransformSubjectAnalyzer(ValidatingAnalyzer):
         if not self.transforms or transform.name in self.transforms:
             yield transform.subject.value
         yield from self.generic_visit(transform)
+
+    def visit_ObjectLiteral(self, object_literal):
+        for value in object_literal.value.values():
+            yield from self.visit(value)
+
+    def visit_ArrayLiteral(self, array_literal):
+        for value in array_literal.value:
+            yield from self.visit(value)
+
+
+class ConstantAnalyzer(ValidatingAnalyzer):
+    """
+    Extract all parts of an expression which depend on the evaluation context.
+
+    These are identifiers and transforms not listed in `pure_transforms`. An
+    expression without any of them is constant.
+    """
+
+    def __init__(self, config, pure_transforms=[]):
+        self.pure_transforms = pure_transforms
+        super().__init__(config)
+
+    def visit_Identifier(self, identifier):
+        yield identifier.value
+
+    def visit_Transform(self, transform):
+        if transform.name not in self.pure_transforms:
+            yield transform.name
+        yield from self.generic_visit(transform)
+
+    def visit_ObjectLiteral(self, object_literal):
+        for value in object_literal.value.values():
+            yield from self.visit(value)
+
+    def visit_ArrayLiteral(self, array_literal):
+        for value in array_literal.value:
+            yield from self.visit(value)
@@ -1,8 +1,97 @@
+import json
+import threading
+from collections import Counter
+from itertools import islice
+
+from django.conf import settings
+from django.contrib.postgres.fields import HStoreField
+from django.core.exceptions import FieldDoesNotExist
+from django.db import connections
+from django.db.models import Q, QuerySet
+from graphql import GraphQLError
 from graphql_relay.connection.arrayconnection import (
     get_offset_with_default,
     offset_to_cursor,
 )
 from graphql_relay.connection.connectiontypes import Connection, Edge, PageInfo
+from graphql_relay.utils import base64, unbase64
+
+KEYSET_PREFIX = "keyset:"
+UNUSABLE_CURSOR_MESSAGE = (
+    "Cursor can't be used with this ordering, query from the first page"
+)
+
+_stats = Counter()
+_stats_lock = threading.Lock()
+
+
+def _count(stat):
+    with _stats_lock:
+        _stats[stat] += 1
+
+
+def get_page_size_stats():
+    """Get how often the page size of connections was limited in this process.
+
+    `defaulted` counts connections queried without `first` or `last`, which
+    got a page size applied, `capped` those asking for more nodes than
+    `PAGINATION_MAX_PAGE_SIZE`.
+    """
+    with _stats_lock:
+        return {stat: _stats[stat] for stat in ("defaulted", "capped")}
+
+
+def reset_page_size_stats():
+    with _stats_lock:
+        _stats.clear()
+
+
+def limit_page_size(args):
+    """
+    Apply the default and maximum page size to the arguments of a connection.
+
+    Connections queried without `first` or `last` get the default page size
+    (or the maximum one), so they don't load all rows. Bigger pages are
+    reduced to the maximum page size. Returns the (new) arguments.
+    """
+    default = settings.PAGINATION_DEFAULT_PAGE_SIZE
+    maximum = settings.PAGINATION_MAX_PAGE_SIZE
+    sizes = {
+        arg: args[arg] for arg in ("first", "last") if isinstance(args.get(arg), int)
+    }
+
+    if not sizes:
+        size = min(filter(None, (default, maximum)), default=None)
+        if not size:
+            return args
+        _count("defaulted")
+        # paginating backwards, the nodes right before the cursor are closest
+        arg = "last" if args.get("before") and not args.get("after") else "first"
+        return {**args, arg: size}
+
+    if maximum and max(sizes.values()) > maximum:
+        _count("capped")
+        return {**args, **{arg: min(size, maximum) for arg, size in sizes.items()}}
+    return args
+
+
+def iterate_chunks(iterable, chunk_size):
+    """
+    Iterate over all rows of a queryset (or any iterable) in lists of `chunk_size`.
+
+    Querysets are streamed from the database with a server-side cursor, so
+    only a chunk of rows is in memory at a time. Internal callers which
+    really need all rows should use this instead of a connection, which
+    limits its page size.
+    """
+    if isinstance(iterable, QuerySet):
+        iterable = iterable.iterator(chunk_size=chunk_size)
+
+    iterator = iter(iterable)
+    chunk = list(islice(iterator, chunk_size))
+    while chunk:
+        yield chunk
+        chunk = list(islice(iterator, chunk_size))
 
 
 def connection_from_list(data, args=None, **kwargs):
@@ -92,3 +181,254 @@ def connection_from_list_slice(
             has_next_page=end_offset < list_length,
         ),
     )
+
+
+def connection_from_queryset(
+    queryset, args=None, connection_type=None, edge_type=None, pageinfo_type=None
+):
+    """
+    Paginate a queryset by offsets without counting it.
+
+    One row more than requested is fetched to know whether there is another
+    page, so the queryset only needs to be counted for pages relative to its
+    end (`last` without `before`). Otherwise counting is left to `totalCount`
+    and only happens when it is selected. The length is set on the returned
+    connection when it is known anyway.
+    """
+    connection_type = connection_type or Connection
+    edge_type = edge_type or Edge
+    pageinfo_type = pageinfo_type or PageInfo
+
+    args = args or {}
+    first = args.get("first")
+    last = args.get("last")
+
+    length = None
+    start_offset = get_offset_with_default(args.get("after"), -1) + 1
+    end_offset = get_offset_with_default(args.get("before"), None)
+    if end_offset is None and isinstance(last, int):
+        length = end_offset = queryset.count()
+    if isinstance(first, int):
+        end_offset = (
+            start_offset + first
+            if end_offset is None
+            else min(end_offset, start_offset + first)
+        )
+    if isinstance(last, int):
+        start_offset = max(start_offset, end_offset - last)
+
+    if end_offset is None:
+        nodes = list(queryset[start_offset:])
+        has_next_page = False
+        if not start_offset:
+            length = len(nodes)
+    else:
+        page_size = max(end_offset - start_offset, 0)
+        nodes = list(queryset[start_offset : start_offset + page_size + 1])
+        has_next_page = len(nodes) > page_size
+        nodes = nodes[:page_size]
+
+    edges = [
+        edge_type(node=node, cursor=offset_to_cursor(start_offset + i))
+        for i, node in enumerate(nodes)
+    ]
+    connection = connection_type(
+        edges=edges,
+        page_info=pageinfo_type(
+            start_cursor=edges[0].cursor if edges else None,
+            end_cursor=edges[-1].cursor if edges else None,
+            has_previous_page=start_offset > 0,
+            has_next_page=has_next_page,
+        ),
+    )
+    if length is not None:
+        connection.length = length
+    return connection
+
+
+def estimate_count(queryset):
+    """
+    Estimate the number of rows of a queryset without counting them.
+
+    Unfiltered querysets are estimated by the row count PostgreSQL keeps in
+    `pg_class` for the table (updated by `ANALYZE` and autovacuum), others by
+    the rows the query planner expects. Both can be off, but don't need to
+    scan the table.
+    """
+    query = queryset.query
+    with connections[queryset.db].cursor() as cursor:
+        if not query.where and not query.distinct:
+            cursor.execute(
+                "SELECT reltuples FROM pg_class WHERE oid = %s::regclass",
+                [query.get_meta().db_table],
+            )
+            reltuples = cursor.fetchone()[0]
+            # tables which have never been analyzed don't have an estimate yet
+            if reltuples > 0:
+                return int(reltuples)
+
+        sql, params = query.get_compiler(using=queryset.db).as_sql()
+        cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+        return cursor.fetchone()[0][0]["Plan"]["Plan Rows"]
+
+
+def get_keyset(queryset):
+    """
+    Get the fields a queryset can be paginated by with keyset pagination.
+
+    Returns a list of field and descending tuples ending with the primary key,
+    or `None` if the ordering of the queryset contains anything else than
+    non-nullable fields of the model itself. Unordered querysets are
+    paginated by `created_at`.
+    """
+    query = queryset.query
+    if query.low_mark or query.high_mark:
+        return None
+
+    meta = query.get_meta()
+    ordering = query.order_by or (meta.ordering if query.default_ordering else ())
+    if not ordering and "created_at" in [field.name for field in meta.fields]:
+        ordering = ("created_at",)
+
+    keyset = []
+    for term in ordering:
+        if not isinstance(term, str) or term == "?":
+            return None
+        name = term.lstrip("-")
+        try:
+            field = meta.pk if name == "pk" else meta.get_field(name)
+        except FieldDoesNotExist:
+            return None
+        if field.is_relation or field.null or isinstance(field, HStoreField):
+            return None
+        keyset.append((field, term.startswith("-")))
+
+    pk = meta.pk
+    if pk not in [field for field, _ in keyset]:
+        keyset.append((pk, False))
+    return keyset
+
+
+def is_keyset_cursor(cursor):
+    return unbase64(cursor).startswith(KEYSET_PREFIX)
+
+
+def _keyset_ordering(keyset):
+    """Describe the ordering of a keyset, so cursors can only be used with it."""
+    return [
+        f"{'-' if descending else ''}{field.model._meta.label_lower}.{field.name}"
+        for field, descending in keyset
+    ]
+
+
+def keyset_to_cursor(keyset, node):
+    return base64(
+        KEYSET_PREFIX
+        + json.dumps(
+            {
+                "ordering": _keyset_ordering(keyset),
+                "values": [field.value_to_string(node) for field, _ in keyset],
+            }
+        )
+    )
+
+
+def cursor_to_keyset_values(keyset, cursor):
+    """Get the keyset values of a cursor or `None` if it is invalid.
+
+    Cursors issued for another ordering are invalid as well.
+    """
+    try:
+        cursor = json.loads(unbase64(cursor)[len(KEYSET_PREFIX) :])
+    except ValueError:
+        return None
+    ordering = _keyset_ordering(keyset)
+    if not isinstance(cursor, dict) or cursor.get("ordering") != ordering:
+        return None
+    values = cursor.get("values")
+    if not isinstance(values, list) or len(values) != len(keyset):
+        return None
+    return values
+
+
+def _keyset_filter(keyset, values, before):
+    """Filter rows coming after (or before) given keyset values."""
+    condition = Q()
+    for index, (field, descending) in enumerate(keyset):
+        lookup = "lt" if descending != before else "gt"
+        equal = {
+            previous.attname: value
+            for (previous, _), value in zip(keyset[:index], values[:index])
+        }
+        condition |= Q(**equal, **{f"{field.attname}__{lookup}": values[index]})
+    return condition
+
+
+def connection_from_keyset(
+    queryset,
+    keyset,
+    args=None,
+    connection_type=None,
+    edge_type=None,
+    pageinfo_type=None,
+):
+    """
+    Paginate a queryset by the values of its ordering instead of offsets.
+
+    Cursors contain the values of the keyset, so pages are fetched with a
+    `WHERE` on the keyset instead of an `OFFSET` and don't shift when rows are
+    inserted. One row more than requested is fetched to know whether there is
+    another page, so no count is needed. Cursors which are invalid or were
+    issued for another ordering raise an error.
+    """
+    connection_type = connection_type or Connection
+    edge_type = edge_type or Edge
+    pageinfo_type = pageinfo_type or PageInfo
+
+    args = args or {}
+    first = args.get("first")
+    last = args.get("last")
+
+    queryset = queryset.order_by(
+        *[f"-{field.name}" if desc else field.name for field, desc in keyset]
+    )
+    cursors = {}
+    for arg in ("after", "before"):
+        if args.get(arg):
+            cursors[arg] = cursor_to_keyset_values(keyset, args[arg])
+            if cursors[arg] is None:
+                raise GraphQLError(UNUSABLE_CURSOR_MESSAGE)
+            queryset = queryset.filter(
+                _keyset_filter(keyset, cursors[arg], before=arg == "before")
+            )
+    after = cursors.get("after")
+    before = cursors.get("before")
+
+    has_previous_page = bool(after)
+    has_next_page = bool(before)
+    if isinstance(first, int):
+        nodes = list(queryset[: first + 1])
+        has_next_page = len(nodes) > first
+        nodes = nodes[:first]
+    elif isinstance(last, int):
+        nodes = list(queryset.reverse()[: last + 1])[::-1]
+        has_previous_page = len(nodes) > last
+        nodes = nodes[-last:] if last else []
+    else:
+        nodes = list(queryset)
+    if isinstance(first, int) and isinstance(last, int):
+        has_previous_page = has_previous_page or len(nodes) > last
+        nodes = nodes[-last:] if last else []
+
+    edges = [
+        edge_type(node=node, cursor=keyset_to_cursor(keyset, node)) for node in nodes
+    ]
+    return connection_type(
+        edges=edges,
+        page_info=pageinfo_type(
+            start_cursor=edges[0].cursor if edges else None,
+            end_cursor=edges[-1].cursor if edges else None,
+            has_previous_page=has_previous_page,
+            has_next_page=has_next_page,
+        ),
+    )
@@ -1,9 +1,13 @@
 import functools
+from collections import Counter
 
 import pytest
 from pyjexl import JEXL
+from pyjexl.evaluator import Context, Evaluator
+from pyjexl.exceptions import MissingTransformError
 
-from ..jexl import Cache, ExtractTransformSubjectAnalyzer
+from .. import jexl
+from ..jexl import Cache, Compiler, ExtractTransformSubjectAnalyzer
 
 
 @pytest.mark.parametrize(
@@ -13,6 +17,7 @@ from ..jexl import Cache, ExtractTransformSubjectAnalyzer
         ('63 > 62 ? "test"|transform1 : "test2"|transform1', {"test", "test2"}),
         ('"test2"|transform2', set()),
         ('"test2"|transform1', {"test2"}),
+        ('["test"|transform1, {key: "test2"|transform1}]', {"test", "test2"}),
     ],
 )
 def test_extract_transforms(expression, expected_transforms):
@@ -31,28 +36,174 @@ def test_extract_transforms(expression, expected_transforms):
 
 
 def test_jexl_cache():
-    cache = Cache(20, 10)
+    cache = Cache(10)
 
     # fill the cache "to the brim"
-    for x in range(19):
+    for x in range(10):
         cache.get_or_set(x, lambda: x)
-    assert len(cache._mru) == 19
-    assert len(cache._cache) == 19
+    assert len(cache._cache) == 10
 
-    # insert last element before eviction
-    cache.get_or_set("x", lambda: "x")
-    assert len(cache._mru) == 20
-    assert len(cache._cache) == 20
+    # mark first entry as recently used
+    assert cache.get_or_set(0, lambda: "not used") == 0
 
-    # one more - this should trigger eviction
+    # one more - this should evict the least recently used entry
     cache.get_or_set("y", lambda: "y")
-    assert len(cache._mru) == 10
     assert len(cache._cache) == 10
+    assert 0 in cache._cache
+    assert 1 not in cache._cache
+
+    assert cache.stats() == {"size": 10, "hits": 1, "misses": 11, "evictions": 1}
+
+
+def test_jexl_warm_up(mocker):
+    mocker.patch.object(jexl.JEXL, "expr_cache", Cache())
+    mocker.patch.object(jexl.JEXL, "compiled_cache", Cache())
+
+    expr = jexl.JEXL()
+    expr.warm_up(["1 + 1", "invalid +"])
+    assert expr.compiled_cache.stats()["size"] == 1
+
+    assert expr.evaluate("1 + 1") == 2
+    assert expr.compiled_cache.stats()["hits"] == 1
+
+
+@pytest.mark.parametrize(
+    "expression",
+    [
+        "1 + 2 * 3",
+        "!(foo.bar == 'baz')",
+        "foo.bar",
+        "foo.missing",
+        "missing",
+        "{a: foo.bar, b: [1, 2, foo.bar]}",
+        "items[.value > 1]",
+        "items[.value > 1][0].value",
+        "items[0]",
+        "items[5]",
+        "items[true]",
+        "items[false]",
+        "foo['bar']",
+        "foo['missing']",
+        "foo.bar|upper",
+        "items|mapby('value')",
+        "foo.bar == 'baz' ? 'yes' : 'no'",
+        "foo.bar != 'baz' ? 'yes' : 'no'",
+        "1 == 1 && 2 > 3 || 'x' in ['x']",
+    ],
+)
+def test_compiled_evaluation(expression):
+    context = {
+        "foo": {"bar": "baz"},
+        "items": [{"value": 1}, {"value": 2}, {"value": 3}],
+    }
+    jexl = JEXL()
+    jexl.add_transform("upper", lambda value: value.upper())
+    jexl.add_transform("mapby", lambda arr, key: [obj[key] for obj in arr])
+
+    parsed_expression = jexl.parse(expression)
+    compiled_expression = Compiler().compile(parsed_expression)
+
+    assert compiled_expression(Context(context), jexl.config.transforms) == Evaluator(
+        jexl.config
+    ).evaluate(parsed_expression, Context(context))
+
+
+def test_compiled_evaluation_missing_transform():
+    compiled_expression = Compiler().compile(JEXL().parse("'foo'|missing"))
+
+    with pytest.raises(MissingTransformError):
+        compiled_expression(Context(), {})
+
+
+def test_compile_unknown_node():
+    with pytest.raises(ValueError):
+        Compiler().compile(object())
+
+
+def test_jexl_evaluate_compiles_once(mocker):
+    compile_spy = mocker.spy(Compiler, "compile")
+
+    expr = jexl.JEXL()
+    assert expr.evaluate("value * 2", {"value": 2}) == 4
+    num_compile_calls = compile_spy.call_count
+
+    assert expr.evaluate("value * 2", {"value": 3}) == 6
+    assert compile_spy.call_count == num_compile_calls
+
+
+@pytest.mark.parametrize(
+    "expression,is_constant",
+    [
+        ("true", True),
+        ("1 + 2 > 2 ? 'yes' : 'no'", True),
+        ("[1, {a: 'b'}]|pure", True),
+        ("foo", False),
+        ("'foo'|impure", False),
+        ("[1, foo]", False),
+        ("{a: foo}", False),
+        ("items[.value > 1]", False),
+    ],
+)
+def test_jexl_is_constant(expression, is_constant, mocker):
+    mocker.patch.object(jexl.JEXL, "pure_transforms", frozenset(["pure"]))
+    assert jexl.JEXL().is_constant(expression) == is_constant
+
+
+def test_jexl_constant_folding(mocker):
+    mocker.patch.object(jexl.JEXL, "constant_cache", Cache())
+    mocker.patch.object(jexl.JEXL, "constant_stats", Counter())
+    compile_spy = mocker.spy(Compiler, "compile")
+
+    expr = jexl.JEXL()
+    assert expr.evaluate("1 > 0") is True
+    num_compile_calls = compile_spy.call_count
+
+    assert expr.evaluate("1 > 0") is True
+    assert expr.evaluate("[1, 2]") == [1, 2]
+    assert expr.evaluate("value", {"value": 2}) == 2
+
+    assert compile_spy.call_count > num_compile_calls
+    assert expr.constant_stats == {"folded": 2, "evaluated": 2}
+
+
+@pytest.mark.parametrize(
+    "expression,expected",
+    [
+        ("'v'|row > 1 && 'v'|row < 4", [False, True, True, False]),
+        ("!('v'|row == 2)", [True, False, True, True]),
+        ("-1", [-1, -1, -1, -1]),
+        ("'v'|row * 2", [2, 4, 6, 8]),
+        ("foo", ["bar", "bar", "bar", "bar"]),
+        ("{value: 'v'|row}.value", [1, 2, 3, 4]),
+        ("['v'|row, 'x']", [[1, "x"], [2, "x"], [3, "x"], [4, "x"]]),
+        ("[]", [[], [], [], []]),
+        ("{a: 'v'|row, b: {}}", [{"a": value, "b": {}} for value in [1, 2, 3, 4]]),
+        ("'v'|row|double|add(1)", [3, 5, 7, 9]),
+        ("'v'|row > 2 ? 'big' : 'v'|row|double", [2, 4, "big", "big"]),
+    ],
+)
+def test_batch_evaluation(expression, expected):
+    values = [1, 2, 3, 4]
+    expr = jexl.JEXL(context={"foo": "bar"})
+    expr.add_transform("double", lambda value: value * 2)
+    expr.add_transform("add", lambda value, other: value + other)
+    expr.add_batch_transform(
+        "row", lambda subjects, rows: [values[row] for row in rows]
+    )
+
+    assert expr.evaluate_batch(expression, len(values)) == expected
+
+
+def test_batch_evaluation_empty():
+    assert jexl.JEXL().evaluate_batch("1 + 1", 0) == []
+
+
+def test_batch_evaluation_missing_transform():
+    with pytest.raises(MissingTransformError):
+        jexl.JEXL().evaluate_batch("'foo'|missing", 1)
 
-    # now make sure the right entries were evicted
-    for x in range(10):
-        assert x not in cache._cache
-        assert x not in cache._mru
 
-    # validate invariants
-    assert cache._cache.keys() == cache._mru.keys()
+@pytest.mark.parametrize("expression", ["items[.value > 1]", "items[0]", ".value"])
+def test_batch_evaluation_unsupported(expression):
+    with pytest.raises(ValueError):
+        jexl.JEXL().evaluate_batch(expression, 1)
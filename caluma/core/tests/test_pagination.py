@@ -1,4 +1,16 @@
 import pytest
+from django.db import connection
+from graphql_relay.utils import base64
+
+from ...form.models import Answer, Document, Form, Question
+from .. import pagination
+from ..pagination import (
+    connection_from_list,
+    get_keyset,
+    is_keyset_cursor,
+    iterate_chunks,
+)
+from ..relay import extract_global_id
 
 
 @pytest.mark.parametrize(
@@ -9,6 +21,10 @@ import pytest
         (None, None, None, None, False, False),
         (None, None, None, "YXJyYXljb25uZWN0aW9uOjI=", False, True),
         (None, None, "YXJyYXljb25uZWN0aW9uOjI=", None, True, False),
+        (2, None, None, "YXJyYXljb25uZWN0aW9uOjI=", False, True),
+        (1, None, "YXJyYXljb25uZWN0aW9uOjI=", None, True, False),
+        (None, 1, "YXJyYXljb25uZWN0aW9uOjI=", None, True, True),
+        (0, None, None, None, True, False),
     ],
 )
 def test_has_next_previous(
@@ -47,3 +63,403 @@ def test_has_next_previous(
     assert not result.errors
     assert result.data["allDocuments"]["pageInfo"]["hasNextPage"] == has_next
     assert result.data["allDocuments"]["pageInfo"]["hasPreviousPage"] == has_previous
+
+
+@pytest.mark.parametrize(
+    "args,total_count,num_queries",
+    [
+        ("first: 2", "", 1),
+        ("first: 2", "totalCount", 2),
+        ("last: 2", "totalCount", 2),
+        ("", "totalCount", 1),
+    ],
+)
+def test_total_count_only_when_selected(
+    db,
+    args,
+    total_count,
+    num_queries,
+    schema_executor,
+    document_factory,
+    django_assert_num_queries,
+):
+    document_factory.create_batch(5)
+
+    query = f"""
+        query {{
+          allDocuments{f"({args})" if args else ""} {{
+            {total_count}
+            edges {{
+              node {{
+                id
+              }}
+            }}
+          }}
+        }}
+    """
+
+    with django_assert_num_queries(num_queries):
+        result = schema_executor(query)
+
+    assert not result.errors
+    assert len(result.data["allDocuments"]["edges"]) == (2 if args else 5)
+    if total_count:
+        assert result.data["allDocuments"]["totalCount"] == 5
+
+
+def test_connection_from_list_last():
+    connection = connection_from_list(["a", "b", "c"], {"last": 2})
+
+    assert [edge.node for edge in connection.edges] == ["b", "c"]
+    assert connection.page_info.hasPreviousPage
+    assert not connection.page_info.hasNextPage
+
+
+@pytest.mark.parametrize("analyze", [False, True])
+def test_total_count_estimate(db, analyze, schema_executor, document_factory, form):
+    document_factory.create_batch(3)
+    document_factory.create_batch(2, form=form)
+    if analyze:
+        with connection.cursor() as cursor:
+            cursor.execute(f"ANALYZE {Document._meta.db_table}")
+
+    query = """
+        query ($form: ID) {
+          allDocuments(first: 1, form: $form) {
+            totalCountEstimate
+          }
+          allForms {
+            totalCountEstimate
+          }
+        }
+    """
+
+    result = schema_executor(query, variables={"form": form.slug})
+    assert not result.errors
+    assert result.data["allDocuments"]["totalCountEstimate"] >= 0
+    # the whole list is loaded already, so it's known exactly
+    assert result.data["allForms"]["totalCountEstimate"] == Form.objects.count()
+
+    result = schema_executor(query)
+    assert not result.errors
+    estimate = result.data["allDocuments"]["totalCountEstimate"]
+    assert estimate == 5 if analyze else estimate >= 0
+
+
+ALL_DOCUMENTS_QUERY = """
+    query AllDocumentsQuery ($first: Int, $last: Int, $before: String, $after: String) {
+      allDocuments(first: $first, last: $last, before: $before, after: $after) {
+        pageInfo {
+          hasNextPage
+          hasPreviousPage
+          startCursor
+          endCursor
+        }
+        edges {
+          node {
+            id
+          }
+        }
+      }
+    }
+"""
+
+
+def _get_ids(result, connection="allDocuments"):
+    return [
+        extract_global_id(edge["node"]["id"])
+        for edge in result.data[connection]["edges"]
+    ]
+
+
+def test_keyset_pagination(
+    db, settings, schema_executor, document_factory, django_assert_num_queries
+):
+    settings.KEYSET_PAGINATION = True
+    documents = [str(document.pk) for document in document_factory.create_batch(5)]
+
+    with django_assert_num_queries(1):
+        result = schema_executor(ALL_DOCUMENTS_QUERY, variables={"first": 2})
+    assert not result.errors
+    assert _get_ids(result) == documents[:2]
+    page_info = result.data["allDocuments"]["pageInfo"]
+    assert page_info["hasNextPage"]
+    assert not page_info["hasPreviousPage"]
+
+    # pages don't shift when rows are inserted before the cursor
+    Document.objects.filter(pk=document_factory().pk).update(
+        created_at=Document.objects.get(pk=documents[0]).created_at
+    )
+
+    result = schema_executor(
+        ALL_DOCUMENTS_QUERY, variables={"first": 3, "after": page_info["endCursor"]}
+    )
+    assert not result.errors
+    assert _get_ids(result) == documents[2:]
+    page_info = result.data["allDocuments"]["pageInfo"]
+    assert not page_info["hasNextPage"]
+    assert page_info["hasPreviousPage"]
+
+    result = schema_executor(
+        ALL_DOCUMENTS_QUERY, variables={"last": 1, "before": page_info["startCursor"]}
+    )
+    assert not result.errors
+    assert _get_ids(result) == documents[1:2]
+    page_info = result.data["allDocuments"]["pageInfo"]
+    assert page_info["hasNextPage"]
+    assert page_info["hasPreviousPage"]
+
+    result = schema_executor(
+        ALL_DOCUMENTS_QUERY,
+        variables={"first": 2, "last": 1, "after": page_info["startCursor"]},
+    )
+    assert not result.errors
+    assert _get_ids(result) == documents[3:4]
+    assert result.data["allDocuments"]["pageInfo"]["hasPreviousPage"]
+
+    result = schema_executor(ALL_DOCUMENTS_QUERY, variables={"last": 0})
+    assert not result.errors
+    assert _get_ids(result) == []
+    assert result.data["allDocuments"]["pageInfo"]["hasPreviousPage"]
+
+
+@pytest.mark.parametrize(
+    "order_by,keyset", [("STATUS_DESC", True), ("DEADLINE_ASC", False)]
+)
+def test_keyset_pagination_ordering(
+    db, settings, order_by, keyset, schema_executor, work_item_factory
+):
+    settings.KEYSET_PAGINATION = True
+    work_items = sorted(
+        work_item_factory.create_batch(4, child_case=None),
+        key=lambda work_item: str(work_item.pk),
+    )
+    work_items.sort(key=lambda work_item: work_item.status, reverse=True)
+
+    query = """
+        query AllWorkItems ($after: String, $orderBy: [WorkItemOrdering]) {
+          allWorkItems(first: 2, after: $after, orderBy: $orderBy) {
+            totalCount
+            pageInfo {
+              endCursor
+            }
+            edges {
+              node {
+                id
+              }
+            }
+          }
+        }
+    """
+    result = schema_executor(query, variables={"orderBy": [order_by]})
+    assert not result.errors
+    end_cursor = result.data["allWorkItems"]["pageInfo"]["endCursor"]
+    assert is_keyset_cursor(end_cursor) == keyset
+
+    result = schema_executor(
+        query, variables={"orderBy": [order_by], "after": end_cursor}
+    )
+    assert not result.errors
+    assert result.data["allWorkItems"]["totalCount"] == 4
+    if keyset:
+        assert _get_ids(result, "allWorkItems") == [
+            str(work_item.pk) for work_item in work_items[2:]
+        ]
+
+
+@pytest.mark.parametrize("keyset_pagination", [True, False])
+def test_keyset_pagination_unusable_cursor(
+    db, settings, schema_executor, work_item_factory, keyset_pagination
+):
+    settings.KEYSET_PAGINATION = True
+    work_item_factory.create_batch(3, child_case=None)
+
+    query = """
+        query AllWorkItems ($after: String, $before: String, $orderBy: [WorkItemOrdering]) {
+          allWorkItems(first: 1, after: $after, before: $before, orderBy: $orderBy) {
+            pageInfo {
+              endCursor
+            }
+          }
+        }
+    """
+    result = schema_executor(query, variables={"orderBy": ["STATUS_DESC"]})
+    assert not result.errors
+    end_cursor = result.data["allWorkItems"]["pageInfo"]["endCursor"]
+    settings.KEYSET_PAGINATION = keyset_pagination
+
+    # nullable fields can't be paginated by keyset
+    for variables in [
+        {"orderBy": ["DEADLINE_ASC"], "after": end_cursor},
+        {"after": end_cursor, "before": "YXJyYXljb25uZWN0aW9uOjA="},
+    ]:
+        result = schema_executor(query, variables=variables)
+        assert "query from the first page" in str(result.errors[0])
+
+
+def test_keyset_pagination_other_cursors(
+    db, settings, schema_executor, document_factory
+):
+    settings.KEYSET_PAGINATION = True
+    document_factory.create_batch(3)
+
+    # offset cursor
+    result = schema_executor(
+        ALL_DOCUMENTS_QUERY, variables={"after": "YXJyYXljb25uZWN0aW9uOjA="}
+    )
+    assert not result.errors
+    assert len(result.data["allDocuments"]["edges"]) == 2
+
+    # keyset cursor without a page size
+    result = schema_executor(ALL_DOCUMENTS_QUERY, variables={"first": 1})
+    end_cursor = result.data["allDocuments"]["pageInfo"]["endCursor"]
+    result = schema_executor(ALL_DOCUMENTS_QUERY, variables={"after": end_cursor})
+    assert not result.errors
+    assert len(result.data["allDocuments"]["edges"]) == 2
+
+    # invalid keyset cursors and those of other orderings are rejected
+    ordering = '["form.document.created_at", "form.document.id"]'
+    for cursor in [
+        "keyset:invalid",
+        "keyset:[1]",
+        f'keyset:{{"ordering": {ordering}, "values": [1]}}',
+        f'keyset:{{"ordering": {ordering[:-1]}, "form.document.form"], '
+        '"values": [1, 2]}',
+    ]:
+        result = schema_executor(
+            ALL_DOCUMENTS_QUERY, variables={"after": base64(cursor)}
+        )
+        assert "query from the first page" in str(result.errors[0])
+
+
+def test_keyset_pagination_cursor_of_other_ordering(
+    db, settings, schema_executor, work_item_factory, document
+):
+    settings.KEYSET_PAGINATION = True
+    work_item_factory.create_batch(3, child_case=None)
+
+    result = schema_executor(ALL_DOCUMENTS_QUERY, variables={"first": 1})
+    assert not result.errors
+    document_cursor = result.data["allDocuments"]["pageInfo"]["endCursor"]
+
+    query = """
+        query AllWorkItems ($after: String, $orderBy: [WorkItemOrdering]) {
+          allWorkItems(first: 1, after: $after, orderBy: $orderBy) {
+            pageInfo {
+              endCursor
+            }
+          }
+        }
+    """
+    result = schema_executor(query, variables={"orderBy": ["STATUS_DESC"]})
+    assert not result.errors
+    end_cursor = result.data["allWorkItems"]["pageInfo"]["endCursor"]
+
+    # cursors of the same length are rejected for other orderings or nodes
+    for cursor, order_by in [(end_cursor, ["STATUS_ASC"]), (document_cursor, None)]:
+        result = schema_executor(
+            query, variables={"orderBy": order_by, "after": cursor}
+        )
+        assert "query from the first page" in str(result.errors[0])
+
+
+@pytest.mark.parametrize(
+    "model,ordering,keyset",
+    [
+        (Document, ["-pk"], [("id", True)]),
+        (Document, ["form_id"], None),
+        (Document, ["form__name"], None),
+        (Document, ["?"], None),
+        (Question, [], [("created_at", False), ("slug", False)]),
+        (Answer, ["-created_at", "id"], [("created_at", True), ("id", False)]),
+    ],
+)
+def test_get_keyset(model, ordering, keyset):
+    queryset = model.objects.order_by(*ordering)
+    if keyset is not None:
+        keyset = [
+            (model._meta.get_field(name), descending) for name, descending in keyset
+        ]
+    assert get_keyset(queryset) == keyset
+    assert get_keyset(queryset[:5]) is None
+
+
+@pytest.mark.parametrize(
+    "default,maximum,args,count,stats",
+    [
+        (0, 0, {}, 5, {"defaulted": 0, "capped": 0}),
+        (2, 0, {}, 2, {"defaulted": 1, "capped": 0}),
+        (2, 3, {"first": 4}, 3, {"defaulted": 0, "capped": 1}),
+        (0, 3, {}, 3, {"defaulted": 1, "capped": 0}),
+        (4, 3, {}, 3, {"defaulted": 1, "capped": 0}),
+        (0, 3, {"last": 2}, 2, {"defaulted": 0, "capped": 0}),
+        (
+            2,
+            0,
+            {"before": "YXJyYXljb25uZWN0aW9uOjQ="},
+            2,
+            {"defaulted": 1, "capped": 0},
+        ),
+    ],
+)
+def test_page_size(
+    db,
+    default,
+    maximum,
+    args,
+    count,
+    stats,
+    schema_executor,
+    document_factory,
+    settings,
+):
+    settings.PAGINATION_DEFAULT_PAGE_SIZE = default
+    settings.PAGINATION_MAX_PAGE_SIZE = maximum
+    pagination.reset_page_size_stats()
+    document_factory.create_batch(5)
+
+    inp = {"first": None, "last": None, "before": None, "after": None, **args}
+    result = schema_executor(ALL_DOCUMENTS_QUERY, variables=inp)
+
+    assert not result.errors
+    assert len(result.data["allDocuments"]["edges"]) == count
+    assert pagination.get_page_size_stats() == stats
+
+
+def test_page_size_list(db, schema_executor, settings):
+    settings.PAGINATION_MAX_PAGE_SIZE = 1
+    pagination.reset_page_size_stats()
+
+    query = """
+        query {
+          allFormatValidators {
+            pageInfo {
+              hasNextPage
+            }
+            edges {
+              node {
+                slug
+              }
+            }
+          }
+        }
+    """
+
+    result = schema_executor(query)
+    assert not result.errors
+    assert len(result.data["allFormatValidators"]["edges"]) == 1
+    assert result.data["allFormatValidators"]["pageInfo"]["hasNextPage"]
+    assert pagination.get_page_size_stats()["defaulted"] == 1
+
+
+def test_iterate_chunks(db, document_factory, django_assert_num_queries):
+    documents = document_factory.create_batch(5)
+    queryset = Document.objects.filter(pk__in=[doc.pk for doc in documents])
+
+    with django_assert_num_queries(1):
+        chunks = list(iterate_chunks(queryset.order_by("created_at"), 2))
+    assert [[doc.pk for doc in chunk] for chunk in chunks] == [
+        [doc.pk for doc in documents[start : start + 2]] for start in (0, 2, 4)
+    ]
+    assert list(iterate_chunks(range(3), 2)) == [[0, 1], [2]]
+    assert list(iterate_chunks([], 2)) == []
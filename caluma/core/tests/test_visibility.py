@@ -4,7 +4,7 @@ from django.db.models import CharField
 
 from .. import models
 from ..types import DjangoObjectType, Node
-from ..visibilities import BaseVisibility, Union, filter_queryset_for
+from ..visibilities import BaseVisibility, Union, filter_queryset_for, get_visibility
 from .fake_model import get_fake_model
 
 
@@ -165,3 +165,36 @@ def test_union_visibility_none(db, history_mock):
     assert result.count() == 0
     queryset = ConfiguredUnion().filter_queryset(CustomNode, queryset, None)
     assert queryset.count() == 0
+
+
+def test_visibility_memoized_per_request(db, history_mock, info, admin_info):
+    FakeModel = get_fake_model(
+        dict(name=CharField(max_length=255)), model_base=models.UUIDModel
+    )
+    FakeModel.objects.create(name="Name1")
+    FakeModel.objects.create(name="Name2")
+    calls = []
+
+    class CustomNode(DjangoObjectType):
+        class Meta:
+            model = FakeModel
+
+    class CustomVisibility(BaseVisibility):
+        @filter_queryset_for(CustomNode)
+        def filter_queryset_for_custom_node(self, node, queryset, info):
+            calls.append(info)
+            return queryset.filter(name="Name1")
+
+    CustomNode.visibility_classes = [CustomVisibility]
+    assert get_visibility(CustomVisibility) is get_visibility(CustomVisibility)
+
+    for _ in range(2):
+        assert CustomNode.get_queryset(FakeModel.objects, info).count() == 1
+    assert calls == [info]
+
+    assert CustomNode.get_queryset(FakeModel.objects, admin_info).count() == 1
+    assert CustomNode.get_queryset(FakeModel.objects, None).count() == 1
+    # querysets which are filtered already aren't memoized
+    queryset = FakeModel.objects.filter(name="Name2")
+    assert CustomNode.get_queryset(queryset, info).count() == 0
+    assert calls == [info, admin_info, None, info]
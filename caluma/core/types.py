@@ -1,15 +1,31 @@
 from collections import Iterable
 
 import graphene
-from django.core.exceptions import ImproperlyConfigured
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist, ImproperlyConfigured
+from django.db.models import Model, Prefetch, prefetch_related_objects
 from django.db.models.query import QuerySet
 from graphene.relay import PageInfo
 from graphene.relay.connection import ConnectionField
+from graphene.types.structures import Structure
+from graphene.utils.str_converters import to_snake_case
 from graphene_django import types
 from graphene_django.fields import DjangoConnectionField
 from graphene_django.utils import maybe_queryset
+from graphql import GraphQLError
+from graphql.language import ast
 
-from .pagination import connection_from_list, connection_from_list_slice
+from .pagination import (
+    UNUSABLE_CURSOR_MESSAGE,
+    connection_from_keyset,
+    connection_from_list,
+    connection_from_queryset,
+    estimate_count,
+    get_keyset,
+    is_keyset_cursor,
+    limit_page_size,
+)
+from .visibilities import get_visibility
 
 
 class Node(object):
@@ -27,10 +43,36 @@ class Node(object):
                 "or custom node has `visibility_classes` properly assigned."
             )
 
+        if queryset is queryset.model._default_manager:
+            # all rows of the model are filtered the same way for the whole
+            # request, e.g. in every nested connection of the same type
+            return cls._get_visible_queryset(queryset, info).select_related()
+
+        return cls._filter_visible(queryset, info).select_related()
+
+    @classmethod
+    def _filter_visible(cls, queryset, info):
         for visibility_class in cls.visibility_classes:
-            queryset = visibility_class().filter_queryset(cls, queryset, info)
+            queryset = get_visibility(visibility_class).filter_queryset(
+                cls, queryset, info
+            )
+        return queryset
+
+    @classmethod
+    def _get_visible_queryset(cls, manager, info):
+        context = getattr(info, "context", None)
+        if context is None:
+            return cls._filter_visible(manager, info)
 
-        return queryset.select_related()
+        try:
+            visible_querysets = context._visible_querysets
+        except AttributeError:
+            visible_querysets = context._visible_querysets = {}
+
+        key = (cls, manager.model, tuple(cls.visibility_classes))
+        if key not in visible_querysets:
+            visible_querysets[key] = cls._filter_visible(manager, info)
+        return visible_querysets[key]
 
 
 class DjangoObjectType(Node, types.DjangoObjectType):
@@ -40,6 +82,214 @@ class DjangoObjectType(Node, types.DjangoObjectType):
         abstract = True
 
 
+def prefetch(instances, name, queryset):
+    """Load relation `name` of all given instances with one query.
+
+    The related objects can be accessed with `get_prefetched`.
+    """
+    prefetch_related_objects(
+        instances, Prefetch(name, queryset=queryset, to_attr=f"_prefetched_{name}")
+    )
+
+
+def get_prefetched(instance, name):
+    """Get related objects loaded with `prefetch` or `None` if not loaded."""
+    return getattr(instance, f"_prefetched_{name}", None)
+
+
+def _selected_fields(info, selection_set, graphene_type):
+    """Yield all fields of a selection set with the type they are selected on."""
+    for selection in selection_set.selections:
+        if isinstance(selection, ast.Field):
+            yield graphene_type, selection
+            continue
+
+        if isinstance(selection, ast.FragmentSpread):
+            selection = info.fragments[selection.name.value]
+        selection_type = graphene_type
+        if selection.type_condition:
+            selection_type = info.schema.get_type(
+                selection.type_condition.name.value
+            ).graphene_type
+        yield from _selected_fields(info, selection.selection_set, selection_type)
+
+
+def _get_edge_node_selections(info, selection_set):
+    """Yield the selection sets of nodes selected in edges of a connection."""
+    for _, node in _selected_fields(info, selection_set, None):
+        if node.name.value == "node" and node.selection_set:
+            yield node.selection_set
+
+
+def _get_node_selections(info, selection_set):
+    """Yield the selection sets of nodes selected in a connection."""
+    for _, edges in _selected_fields(info, selection_set, None):
+        if edges.name.value == "edges" and edges.selection_set:
+            yield from _get_edge_node_selections(info, edges.selection_set)
+
+
+def _get_field(graphene_type, name):
+    field = graphene_type._meta.fields.get(name)
+    if isinstance(field, graphene.Dynamic):
+        return field.get_type()
+    return field
+
+
+def _unwrap(graphene_type):
+    while isinstance(graphene_type, Structure):
+        graphene_type = graphene_type.of_type
+    return graphene_type
+
+
+def _resolves_attribute(graphene_type, name, field):
+    """Check whether a field resolves to the model attribute of the same name."""
+    return not (getattr(graphene_type, f"resolve_{name}", None) or field.resolver)
+
+
+def _get_selected_relations(info, model, graphene_type, selection_set, prefix=""):
+    """Yield lookups of the single relations selected in a selection set."""
+    for selected_type, field_ast in _selected_fields(
+        info, selection_set, graphene_type
+    ):
+        name = to_snake_case(field_ast.name.value)
+        field = _get_field(selected_type, name)
+        if (
+            field is None
+            or not field_ast.selection_set
+            or not _resolves_attribute(selected_type, name, field)
+        ):
+            continue
+
+        try:
+            relation = model._meta.get_field(name)
+        except FieldDoesNotExist:
+            continue
+
+        if relation.concrete and (relation.many_to_one or relation.one_to_one):
+            lookup = f"{prefix}{name}"
+            yield lookup
+            yield from _get_selected_relations(
+                info,
+                relation.related_model,
+                _unwrap(field.type),
+                field_ast.selection_set,
+                f"{lookup}__",
+            )
+
+
+def _get_default_relations(model, prefix="", depth=5):
+    """Yield lookups `select_related()` without arguments follows."""
+    for field in model._meta.concrete_fields:
+        if field.is_relation and not field.null and depth:
+            lookup = f"{prefix}{field.name}"
+            yield lookup
+            yield from _get_default_relations(
+                field.related_model, f"{lookup}__", depth - 1
+            )
+
+
+def _get_lookups(select_related, prefix=""):
+    for name, nested in select_related.items():
+        yield f"{prefix}{name}"
+        yield from _get_lookups(nested, f"{prefix}{name}__")
+
+
+def select_selected_relations(queryset, info, graphene_type, selection_sets):
+    """Join the single relations selected on the nodes of a queryset.
+
+    Relations which are already selected by `select_related` are kept, so
+    resolvers depending on them (e.g. `resolve_type`) still find them.
+    """
+    lookups = {
+        lookup
+        for selection_set in selection_sets
+        for lookup in _get_selected_relations(
+            info, queryset.model, graphene_type, selection_set
+        )
+    }
+
+    select_related = queryset.query.select_related
+    if select_related is True:
+        selected = set(_get_default_relations(queryset.model))
+    else:
+        selected = set(_get_lookups(select_related or {}))
+
+    if lookups <= selected:
+        return queryset
+    return queryset.select_related(*sorted(selected | lookups))
+
+
+def _get_related(info, instances, graphene_type, name, field, selection_sets):
+    """Load relation `name` of instances at once and return the related objects.
+
+    Fields with custom resolvers are only loaded if the type defines a
+    classmethod `prefetch_<name>(instances, info)` doing so.
+    """
+    hook = getattr(graphene_type, f"prefetch_{name}", None)
+    if hook:
+        return hook(instances, info)
+    if not _resolves_attribute(graphene_type, name, field):
+        return None
+
+    classes = {type(instance) for instance in instances}
+    model = classes.pop()
+    if classes or not issubclass(model, Model):
+        return None
+    try:
+        relation = model._meta.get_field(name)
+    except FieldDoesNotExist:
+        return None
+
+    if isinstance(field, DjangoConnectionField) and (
+        relation.one_to_many or relation.many_to_many
+    ):
+        queryset = field.node_type.get_queryset(field.get_manager(), info)
+        queryset = select_selected_relations(
+            queryset, info, field.node_type, selection_sets
+        )
+        prefetch(instances, name, queryset)
+        return [
+            node for instance in instances for node in get_prefetched(instance, name)
+        ]
+
+    if relation.many_to_one or relation.one_to_one:
+        prefetch_related_objects(instances, name)
+        related = (getattr(instance, name) for instance in instances)
+        return [instance for instance in related if instance is not None]
+
+    return None
+
+
+def prefetch_selection(info, instances, graphene_type, selection_set):
+    """Load the relations selected on given instances with one query each.
+
+    Connections are loaded respecting `get_queryset` of their node and are
+    picked up by `DjangoFilterConnectionField` when resolving the connection
+    of a single instance. This way nested connections are resolved with a
+    bounded number of queries instead of one query per instance.
+    """
+    for selected_type, field_ast in _selected_fields(
+        info, selection_set, graphene_type
+    ):
+        name = to_snake_case(field_ast.name.value)
+        field = _get_field(selected_type, name)
+        if field is None or not field_ast.selection_set:
+            continue
+
+        if isinstance(field, DjangoConnectionField):
+            related_type = field.node_type
+            selection_sets = list(_get_node_selections(info, field_ast.selection_set))
+        else:
+            related_type = _unwrap(field.type)
+            selection_sets = [field_ast.selection_set]
+
+        related = _get_related(
+            info, instances, selected_type, name, field, selection_sets
+        )
+        for related_selection in selection_sets if related else []:
+            prefetch_selection(info, related, related_type, related_selection)
+
+
 class CountableConnectionBase(graphene.Connection):
     """Connection subclass that supports totalCount."""
 
@@ -47,16 +297,37 @@ class CountableConnectionBase(graphene.Connection):
         abstract = True
 
     total_count = graphene.Int()
+    total_count_estimate = graphene.Int(
+        description=(
+            "Estimated count of all nodes, which is cheaper than `totalCount` "
+            "on large connections"
+        )
+    )
+
+    def resolve_edges(self, info, **kwargs):
+        nodes = [edge.node for edge in self.edges]
+        if nodes:
+            for field_ast in info.field_asts:
+                for selection_set in _get_edge_node_selections(
+                    info, field_ast.selection_set
+                ):
+                    prefetch_selection(info, nodes, self._meta.node, selection_set)
+        return self.edges
 
     def resolve_total_count(self, info, **kwargs):
         try:
-            # DjangoConnectionField sets the length already
+            # length is set when it is known already
             return self.length
         except AttributeError:
-            if isinstance(self.iterable, QuerySet):  # pragma: no cover
+            if isinstance(self.iterable, QuerySet):
                 return self.iterable.count()
             return len(self.iterable)
 
+    def resolve_total_count_estimate(self, info, **kwargs):
+        if not hasattr(self, "length") and isinstance(self.iterable, QuerySet):
+            return estimate_count(self.iterable)
+        return self.resolve_total_count(info)
+
 
 class DjangoConnectionField(DjangoConnectionField):
     """
@@ -67,8 +338,44 @@ class DjangoConnectionField(DjangoConnectionField):
     is resolved.
     """
 
+    @classmethod
+    def resolve_queryset(cls, connection, queryset, info, args):
+        queryset = super().resolve_queryset(connection, queryset, info, args)
+        selection_sets = [
+            selection_set
+            for field_ast in info.field_asts
+            for selection_set in _get_node_selections(info, field_ast.selection_set)
+        ]
+        return select_selected_relations(
+            queryset, info, connection._meta.node, selection_sets
+        )
+
+    @classmethod
+    def get_keyset(cls, queryset, args):
+        """Get the keyset to paginate by or `None` to paginate by offset.
+
+        Keyset cursors which can't be used, e.g. because the ordering changed
+        since they were issued, raise an error instead of being treated as
+        offset cursors.
+        """
+        cursors = [args[arg] for arg in ("after", "before") if args.get(arg)]
+        keyset_cursors = [is_keyset_cursor(cursor) for cursor in cursors]
+        if not any(keyset_cursors):
+            if cursors or not settings.KEYSET_PAGINATION:
+                # offset cursors are still accepted, e.g. of prefetched connections
+                return None
+            return get_keyset(queryset)
+
+        keyset = None
+        if settings.KEYSET_PAGINATION and all(keyset_cursors):
+            keyset = get_keyset(queryset)
+        if keyset is None:
+            raise GraphQLError(UNUSABLE_CURSOR_MESSAGE)
+        return keyset
+
     @classmethod
     def resolve_connection(cls, connection, default_manager, args, iterable):
+        args = limit_page_size(args)
         if iterable is None:
             iterable = default_manager
         iterable = maybe_queryset(iterable)
@@ -77,27 +384,37 @@ class DjangoConnectionField(DjangoConnectionField):
                 default_queryset = maybe_queryset(default_manager)
                 iterable = cls.merge_querysets(default_queryset, iterable)
 
-            # only query count on database when pagination is needed
-            # resolve_connection may be removed again once following issue is fixed:
-            # https://github.com/graphql-python/graphene-django/issues/177
-            if "before" in args or "after" in args or "first" in args or "last" in args:
-                _len = iterable.count()
+            keyset = cls.get_keyset(iterable, args)
+            if keyset:
+                connection = connection_from_keyset(
+                    iterable,
+                    keyset,
+                    args,
+                    connection_type=connection,
+                    edge_type=connection.Edge,
+                    pageinfo_type=PageInfo,
+                )
             else:
-                _len = len(iterable)
-        else:  # pragma: no cover
-            _len = len(iterable)
-        connection = connection_from_list_slice(
+                # counting is left to `totalCount`, so it's only done when selected
+                connection = connection_from_queryset(
+                    iterable,
+                    args,
+                    connection_type=connection,
+                    edge_type=connection.Edge,
+                    pageinfo_type=PageInfo,
+                )
+            connection.iterable = iterable
+            return connection
+
+        connection = connection_from_list(
             iterable,
             args,
-            slice_start=0,
-            list_length=_len,
-            list_slice_length=_len,
             connection_type=connection,
             edge_type=connection.Edge,
             pageinfo_type=PageInfo,
         )
         connection.iterable = iterable
-        connection.length = _len
+        connection.length = len(iterable)
         return connection
 
 
@@ -121,7 +438,7 @@ class ConnectionField(ConnectionField):
         ).format(connection_type, resolved)
         connection = connection_from_list(
             resolved,
-            args,
+            limit_page_size(args),
             connection_type=connection_type,
             edge_type=connection_type.Edge,
             pageinfo_type=PageInfo,
@@ -1,5 +1,5 @@
 import inspect
-from functools import wraps
+from functools import lru_cache, wraps
 
 from django.core.exceptions import ImproperlyConfigured
 
@@ -20,6 +20,12 @@ def filter_queryset_for(node):
     return decorate
 
 
+@lru_cache(maxsize=None)
+def get_visibility(visibility_class):
+    """Get the instance of a visibility class, which is only created once."""
+    return visibility_class()
+
+
 class BaseVisibility(object):
     """Basic visibility classes to be extended by any visibility implementation.
 
@@ -78,7 +84,9 @@ class Union(BaseVisibility):
     def filter_queryset(self, node, queryset, info):
         result_queryset = None
         for visibility_class in self.visibility_classes:
-            class_result = visibility_class().filter_queryset(node, queryset, info)
+            class_result = get_visibility(visibility_class).filter_queryset(
+                node, queryset, info
+            )
             if result_queryset is None:
                 result_queryset = class_result
             else:
@@ -1,10 +1,20 @@
+import threading
 from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+from functools import lru_cache
+from logging import getLogger
 
 from django.conf import settings
+from django.db import connection
+from django.utils import translation
 from django.utils.module_loading import import_string
 
 from caluma.core.utils import translate_value
 
+from .data_sources import BaseDataSource
+
+log = getLogger(__name__)
+
 DataSource = namedtuple("DataSource", ["name", "info"])
 
 
@@ -41,14 +51,21 @@ class Data:
         return str(self.data), str(self.data)
 
 
+@lru_cache(maxsize=None)
+def _load_data_sources(class_paths):
+    return tuple(import_string(cls) for cls in class_paths)
+
+
 def get_data_sources(dic=False):
     """Get all configured DataSources.
 
+    Classes are imported only once per value of `DATA_SOURCE_CLASSES`.
+
     :param dic: Should return a dict
     :return: List of DataSource-objects if dic False otherwise dict
     """
 
-    data_source_classes = [import_string(cls) for cls in settings.DATA_SOURCE_CLASSES]
+    data_source_classes = _load_data_sources(tuple(settings.DATA_SOURCE_CLASSES))
     if dic:
         return {ds.__name__: ds for ds in data_source_classes}
     return [
@@ -57,13 +74,170 @@ def get_data_sources(dic=False):
     ]
 
 
-def get_data_source_data(info, name):
-    data_sources = get_data_sources(dic=True)
-    if name not in data_sources:
-        raise DataSourceException(f"No data_source found for name: {name}")
+class LoadedData:
+    """Parsed data of a data source with a set of its slugs for lookups."""
+
+    def __init__(self, data):
+        self.data = tuple(data)
+        self.slugs = frozenset(d.slug for d in self.data)
 
-    raw_data = data_sources[name]().try_get_data_with_fallback(info)
+
+def _get_request_memo(info):
+    try:
+        return info.context.data_source_data
+    except AttributeError:
+        info.context.data_source_data = {}
+        return info.context.data_source_data
+
+
+def _load(data_source, info, name):
+    raw_data = data_source().try_get_data_with_fallback(info)
     if not is_iterable_and_no_string(raw_data):
         raise DataSourceException(f"Failed to parse data from source: {name}")
 
-    return [Data(d) for d in raw_data]
+    return LoadedData(Data(d) for d in raw_data)
+
+
+def load_data_source_data(info, name):
+    """Get the parsed data of given data source.
+
+    Data is memoized on the request (`info.context`) per language, so every
+    data source is called at most once per request.
+    """
+    memo = _get_request_memo(info)
+    key = (name, translation.get_language())
+    if key not in memo:
+        data_sources = get_data_sources(dic=True)
+        if name not in data_sources:
+            raise DataSourceException(f"No data_source found for name: {name}")
+
+        memo[key] = _load(data_sources[name], info, name)
+
+    if isinstance(memo[key], Exception):
+        raise memo[key]
+    return memo[key]
+
+
+def _fetch(data_source, info, name, language):
+    try:
+        with translation.override(language):
+            return _load(data_source, info, name)
+    finally:
+        if threading.current_thread() is not threading.main_thread():
+            # worker threads open their own connection
+            connection.close()
+
+
+def _fetch_result(future, data_source, name):
+    try:
+        return future.result(timeout=data_source.timeout)
+    except TimeoutError:
+        log.warning(f"Data source {name} timed out after {data_source.timeout}s")
+        if data_source.default is None:
+            return DataSourceException(f"Data source {name} timed out")
+        return LoadedData(Data(d) for d in data_source.default)
+    except Exception as exc:
+        # raised when the data is used, like when fetched directly
+        return exc
+
+
+def prefetch_data_source_data(info, names):
+    """Fetch the data of given data sources concurrently.
+
+    Data sources which aren't memoized on the request yet are fetched in a
+    pool of `DATA_SOURCE_WORKERS` threads. Data sources taking longer than
+    their `timeout` fall back to their `default`.
+    """
+    memo = _get_request_memo(info)
+    language = translation.get_language()
+    data_sources = get_data_sources(dic=True)
+    names = {
+        name
+        for name in names
+        if name in data_sources
+        # data sources filtering upstream are fetched per question
+        and not supports_filtering(data_sources[name]) and (name, language) not in memo
+    }
+    workers = min(len(names), settings.DATA_SOURCE_WORKERS)
+    if workers < 2:
+        # fetched when used
+        return
+
+    executor = ThreadPoolExecutor(max_workers=workers)
+    futures = {
+        name: executor.submit(_fetch, data_sources[name], info, name, language)
+        for name in names
+    }
+    # don't wait for data sources which timed out
+    executor.shutdown(wait=False)
+
+    for name, future in futures.items():
+        memo[(name, language)] = _fetch_result(future, data_sources[name], name)
+
+
+def get_data_source_data(info, name):
+    return list(load_data_source_data(info, name).data)
+
+
+def supports_filtering(data_source_class):
+    return data_source_class.get_filtered_data is not BaseDataSource.get_filtered_data
+
+
+def supports_exists(data_source_class):
+    return data_source_class.exists is not BaseDataSource.exists
+
+
+def _get_default_data(data_source, exc):
+    """Get the default data of a data source whose upstream lookup failed.
+
+    Like `BaseDataSource.try_get_data_with_fallback`, `exc` is raised again if
+    the data source has no default.
+    """
+    log.exception(
+        f"Looking up data of {data_source.__name__} failed:"
+        f"{exc}\n Using default data."
+    )
+    if data_source.default is None:
+        raise exc
+    return [Data(d) for d in data_source.default]
+
+
+def get_data_source_page(info, name, search=None, slugs=None, offset=0, limit=None):
+    """Get a page of the data of given data source matching `search` and `slugs`.
+
+    `search` matches slugs and labels containing it, ignoring case. Returns
+    the parsed data of the page and the total count of matching entries.
+    """
+    data_source = get_data_sources(dic=True).get(name)
+    if data_source is not None and supports_filtering(data_source):
+        try:
+            raw_data, total = data_source().get_filtered_data(
+                info, search=search, slugs=slugs, offset=offset, limit=limit
+            )
+            return [Data(d) for d in raw_data], total
+        except Exception as exc:
+            data = _get_default_data(data_source, exc)
+    else:
+        data = load_data_source_data(info, name).data
+    if search:
+        search = search.lower()
+        data = [
+            d for d in data if search in d.slug.lower() or search in d.label.lower()
+        ]
+    if slugs is not None:
+        slugs = set(slugs)
+        data = [d for d in data if d.slug in slugs]
+
+    end = None if limit is None else offset + limit
+    return list(data[offset:end]), len(data)
+
+
+def data_source_has_slug(info, name, slug):
+    """Check whether given data source contains an entry with given slug."""
+    data_source = get_data_sources(dic=True)[name]
+    if supports_exists(data_source):
+        try:
+            return data_source().exists(info, slug)
+        except Exception as exc:
+            return any(d.slug == slug for d in _get_default_data(data_source, exc))
+    return slug in load_data_source_data(info, name).slugs
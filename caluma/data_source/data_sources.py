@@ -23,18 +23,21 @@ class BaseDataSource:
                  If this is `None`, the Exception won't be handled. Defaults to None.
         validate: boolean that indicates if answers should be validated against the
                   current response from `get_data()`. Defaults to `True`.
+        timeout: seconds to wait for `get_data()` when data sources are fetched
+                 concurrently, before falling back to `default`. Defaults to
+                 `None` (no timeout).
 
     A custom data source class could look like this:
     ```
     >>> from caluma.data_source.data_sources import BaseDataSource
-    ... from caluma.data_source.utils import data_source_cache
+    ... from caluma.data_source.utils import data_source_cache, user_key
     ... import requests
     ...
     ...
     ... class CustomDataSource(BaseDataSource):
     ...     info = 'User choices from "someapi"'
     ...
-    ...     @data_source_cache(timeout=3600)
+    ...     @data_source_cache(timeout=3600, key=user_key)
     ...     def get_data(self, info):
     ...         response = requests.get(
     ...             f"https://someapi/?user={info.context.request.user.username}"
@@ -47,6 +50,7 @@ class BaseDataSource:
     info = None
     default = None
     validate = True
+    timeout = None
 
     def __init__(self):
         pass
@@ -54,6 +58,26 @@ class BaseDataSource:
     def get_data(self, info):  # pragma: no cover
         raise NotImplementedError()
 
+    def get_filtered_data(self, info, search=None, slugs=None, offset=0, limit=None):
+        """Get a page of the data matching `search` and `slugs`.
+
+        Data sources with lots of data can override this method to filter and
+        paginate the data upstream. It must return a tuple of the data of the
+        page (like `get_data()`) and the total count of matching entries.
+
+        If not overridden, the data of `get_data()` is filtered in memory.
+        """
+        raise NotImplementedError()  # pragma: no cover
+
+    def exists(self, info, slug):
+        """Check whether an entry with given slug exists.
+
+        Data sources with lots of data can override this method to validate
+        answers without fetching all data. If not overridden, the data of
+        `get_data()` is searched.
+        """
+        raise NotImplementedError()  # pragma: no cover
+
     def try_get_data_with_fallback(self, info):
         try:
             new_data = self.get_data(info)
@@ -1,8 +1,11 @@
-from graphene import ConnectionField, String
+from graphene import List, String
+from graphene.relay import PageInfo
 from graphene.types import ObjectType
+from graphql_relay.connection.arrayconnection import get_offset_with_default
 
-from ..core.types import CountableConnectionBase
-from .data_source_handlers import get_data_source_data, get_data_sources
+from ..core.pagination import connection_from_list_slice, limit_page_size
+from ..core.types import ConnectionField, CountableConnectionBase
+from .data_source_handlers import get_data_source_page, get_data_sources
 
 
 class DataSource(ObjectType):
@@ -25,12 +28,48 @@ class DataSourceDataConnection(CountableConnectionBase):
         node = DataSourceData
 
 
+class DataSourceDataConnectionField(ConnectionField):
+    """Connection of data source data, which can be searched.
+
+    Only `search`, `slugs`, `first` and `after` are passed to the data source,
+    so data sources supporting it can filter and paginate upstream.
+    """
+
+    def __init__(self, *args, **kwargs):
+        kwargs.setdefault("search", String())
+        kwargs.setdefault("slugs", List(String))
+        super().__init__(DataSourceDataConnection, *args, **kwargs)
+
+
+def resolve_data_source_data(info, name, search=None, slugs=None, **args):
+    args = limit_page_size(args)
+    offset, limit = 0, None
+    if args.get("last") is None and args.get("before") is None:
+        offset = get_offset_with_default(args.get("after"), -1) + 1
+        limit = args.get("first")
+
+    data, total = get_data_source_page(
+        info, name, search=search, slugs=slugs, offset=offset, limit=limit
+    )
+    connection = connection_from_list_slice(
+        data,
+        args,
+        connection_type=DataSourceDataConnection,
+        edge_type=DataSourceDataConnection.Edge,
+        pageinfo_type=PageInfo,
+        slice_start=offset,
+        list_length=total,
+    )
+    connection.length = total
+    return connection
+
+
 class Query(object):
     all_data_sources = ConnectionField(DataSourceConnection)
-    data_source = ConnectionField(DataSourceDataConnection, name=String())
+    data_source = DataSourceDataConnectionField(name=String())
 
     def resolve_all_data_sources(self, info):
         return get_data_sources()
 
-    def resolve_data_source(self, info, name):
-        return get_data_source_data(info, name)
+    def resolve_data_source(self, info, name, **args):
+        return resolve_data_source_data(info, name, **args)
@@ -1,3 +1,4 @@
+from time import sleep
 from uuid import uuid4
 
 from caluma.data_source.data_sources import BaseDataSource
@@ -74,3 +75,54 @@ class MyOtherBrokenDataSource(BaseDataSource):
     @data_source_cache(timeout=3600)
     def get_data(self, info):
         raise Exception()
+
+
+class MySlowDataSource(BaseDataSource):
+    info = "Slow test data source"
+    default = [1, 2, 3]
+    timeout = 0.05
+
+    def get_data(self, info):  # pragma: no cover
+        # finishes in the background after the test
+        sleep(0.5)
+        return [4, 5, 6]
+
+
+class MyOtherSlowDataSource(MySlowDataSource):
+    default = None
+
+
+class MyFilteringDataSource(BaseDataSource):
+    info = "Filtering test data source"
+    entries = [[f"parcel-{number}", f"Parcel {number}"] for number in range(1000)]
+
+    def get_data(self, info):  # pragma: no cover
+        raise AssertionError("Data is filtered upstream")
+
+    def get_filtered_data(self, info, search=None, slugs=None, offset=0, limit=None):
+        entries = [
+            entry
+            for entry in self.entries
+            if (not search or search in entry[0])
+            and (slugs is None or entry[0] in slugs)
+        ]
+        end = None if limit is None else offset + limit
+        return entries[offset:end], len(entries)
+
+    def exists(self, info, slug):
+        return any(entry[0] == slug for entry in self.entries)
+
+
+class MyBrokenFilteringDataSource(MyFilteringDataSource):
+    info = "Broken filtering test data source"
+    default = ["parcel-1", "parcel-2"]
+
+    def get_filtered_data(self, info, search=None, slugs=None, offset=0, limit=None):
+        raise Exception()
+
+    def exists(self, info, slug):
+        raise Exception()
+
+
+class MyOtherBrokenFilteringDataSource(MyBrokenFilteringDataSource):
+    default = None
@@ -1,7 +1,13 @@
 from time import sleep
+from uuid import uuid4
 
+import pytest
 from django.core.cache import cache
+from django.utils import translation
 
+from ..data_source_handlers import DataSourceException
+from ..data_sources import BaseDataSource
+from ..utils import _start_refresh, data_source_cache, group_key, language_key, user_key
 from .data_sources import MyDataSource
 
 
@@ -32,3 +38,161 @@ def test_expired_cache(info):
     new_result = ds.get_data_uuid(info)
 
     assert not cached_result == new_result
+
+
+class CountingDataSource(BaseDataSource):
+    def __init__(self):
+        self.calls = 0
+
+    def get_data(self, info):
+        self.calls += 1
+        if self.calls > 1 and getattr(self, "fail", False):
+            raise ValueError("upstream down")
+        return [str(uuid4())]
+
+    def get_request_data(self, info):
+        return [translation.get_language(), str(info.context.user)]
+
+    per_user = data_source_cache(timeout=60, key=user_key)(get_data)
+    per_group = data_source_cache(timeout=60, key=group_key)(get_data)
+    per_language = data_source_cache(timeout=60, key=language_key)(get_data)
+    stale = data_source_cache(timeout=60, stale_timeout=60)(get_data)
+    failing = data_source_cache(timeout=60, failure_timeout=60)(get_data)
+    locked = data_source_cache(timeout=60, lock_timeout=1)(get_data)
+    stale_request = data_source_cache(timeout=60, stale_timeout=60)(get_request_data)
+
+
+def test_cache_key_functions(info, admin_info):
+    ds = CountingDataSource()
+
+    assert ds.per_user(info) == ds.per_user(info)
+    assert ds.per_user(info) != ds.per_user(admin_info)
+    cache.clear()
+    assert ds.per_group(info) != ds.per_group(admin_info)
+
+    with translation.override("de"):
+        german = ds.per_language(info)
+    assert german != ds.per_language(info)
+    assert ds.calls == 6
+
+
+def test_stale_while_revalidate(info, mocker):
+    start_refresh = mocker.patch(
+        "caluma.data_source.utils._start_refresh", side_effect=lambda refresh: refresh()
+    )
+    ds = CountingDataSource()
+    data = ds.stale(info)
+
+    cache.delete("data_source_CountingDataSource_fresh")
+    # stale data is returned while it is refreshed
+    assert ds.stale(info) == data
+    assert start_refresh.call_count == 1
+    refreshed = ds.stale(info)
+    assert refreshed != data
+    assert ds.stale(info) == refreshed
+    assert ds.calls == 2
+
+    ds.fail = True
+    cache.delete("data_source_CountingDataSource_fresh")
+    assert ds.stale(info) == refreshed
+    assert ds.stale(info) == refreshed
+    assert not cache.get("data_source_CountingDataSource_lock")
+
+
+def test_stale_refresh_detached(admin_info, mocker):
+    refreshes = []
+    mocker.patch("caluma.data_source.utils._start_refresh", refreshes.append)
+    ds = CountingDataSource()
+    user = str(admin_info.context.user)
+
+    with translation.override("en"):
+        assert ds.stale_request(admin_info) == ["en", user]
+    cache.delete("data_source_CountingDataSource_fresh")
+    with translation.override("de"):
+        assert ds.stale_request(admin_info) == ["en", user]
+
+    # the request finished before the data is refreshed
+    admin_info.context.user = None
+    with translation.override("en"):
+        refreshes[0]()
+    assert cache.get("data_source_CountingDataSource") == ["de", user]
+
+
+def test_stale_refresh_in_background(info, mocker):
+    threads = []
+
+    def start_refresh(refresh):
+        threads.append(_start_refresh(refresh))
+
+    mocker.patch("caluma.data_source.utils._start_refresh", start_refresh)
+    ds = CountingDataSource()
+    data = ds.stale(info)
+
+    cache.delete("data_source_CountingDataSource_fresh")
+    assert ds.stale(info) == data
+    threads[0].join()
+    assert ds.stale(info) != data
+
+
+def test_failure_cache(info):
+    ds = CountingDataSource()
+    ds.calls = 1
+    ds.fail = True
+
+    with pytest.raises(ValueError):
+        ds.failing(info)
+    with pytest.raises(DataSourceException, match="failed recently"):
+        ds.failing(info)
+    assert ds.calls == 2
+
+    # data sources fall back to their default
+    ds.default = ["default"]
+    ds.get_data = ds.failing
+    assert ds.try_get_data_with_fallback(info) == ["default"]
+
+
+def test_single_flight(info, mocker):
+    ds = CountingDataSource()
+    # the lock is released once the data is computed
+    ds.locked(info)
+    assert not cache.get("data_source_CountingDataSource_lock")
+
+    cache.clear()
+    ds.calls = 0
+    cache.add("data_source_CountingDataSource_lock", True)
+
+    # another caller finishes computing while waiting
+    sleep = mocker.patch(
+        "caluma.data_source.utils.time.sleep",
+        side_effect=lambda seconds: cache.set(
+            "data_source_CountingDataSource", ["computed"]
+        ),
+    )
+    assert ds.locked(info) == ["computed"]
+    assert ds.calls == 0
+
+    # another caller fails while waiting
+    cache.delete("data_source_CountingDataSource")
+    sleep.side_effect = lambda seconds: cache.set(
+        "data_source_CountingDataSource_failed", "error"
+    )
+    with pytest.raises(DataSourceException):
+        ds.locked(info)
+
+    # lock isn't released in time
+    cache.delete("data_source_CountingDataSource_failed")
+    sleep.side_effect = None
+    mocker.patch("caluma.data_source.utils.time.monotonic", side_effect=[0, 0, 2])
+    assert ds.locked(info) != ["computed"]
+    assert ds.calls == 1
+
+
+def test_no_single_flight(info, mocker):
+    ds = CountingDataSource()
+    cache.add("data_source_CountingDataSource_lock", True)
+    sleep = mocker.patch("caluma.data_source.utils.time.sleep")
+
+    # without a lock timeout, callers don't wait for each other
+    assert ds.per_user(info) == ds.per_user(info)
+    assert ds.calls == 1
+    assert not sleep.called
@@ -1,6 +1,14 @@
 import pytest
 from django.core.cache import cache
 from django.utils import translation
+from graphql_relay.connection.arrayconnection import offset_to_cursor
+
+from ...form.models import Question
+from ...form.validators import CustomValidationError, DocumentValidator
+from .. import data_source_handlers
+from ..data_sources import BaseDataSource
+from ..schema import resolve_data_source_data
+from .data_sources import MyFilteringDataSource
 
 
 def test_fetch_data_sources(snapshot, schema_executor, settings):
@@ -198,3 +206,313 @@ def test_fetch_data_from_non_existing_data_source(schema_executor, settings, con
 
     result = schema_executor(query)
     assert result.errors
+
+
+def test_data_sources_imported_once(settings, mocker):
+    settings.DATA_SOURCE_CLASSES = [
+        "caluma.data_source.tests.data_sources.MyOtherDataSource"
+    ]
+    data_source_handlers._load_data_sources.cache_clear()
+    import_spy = mocker.spy(data_source_handlers, "import_string")
+
+    data_source_handlers.get_data_sources()
+    assert list(data_source_handlers.get_data_sources(dic=True)) == [
+        "MyOtherDataSource"
+    ]
+    assert import_spy.call_count == 1
+
+
+def test_data_source_data_memoized_per_request(
+    db,
+    form,
+    form_question_factory,
+    document_factory,
+    answer_factory,
+    info,
+    data_source_settings,
+    mocker,
+):
+    document = document_factory(form=form)
+    for _ in range(3):
+        question = form_question_factory(
+            form=form,
+            question__type=Question.TYPE_DYNAMIC_CHOICE,
+            question__data_source="MyDataSource",
+        ).question
+        answer_factory(document=document, question=question, value="5.5")
+    get_data_spy = mocker.spy(BaseDataSource, "try_get_data_with_fallback")
+
+    DocumentValidator().validate(document, info)
+    assert get_data_spy.call_count == 1
+
+    data = data_source_handlers.load_data_source_data(info, "MyDataSource")
+    assert "5.5" in data.slugs
+    assert get_data_spy.call_count == 1
+
+    # labels are translated, so they are memoized per language
+    with translation.override("de"):
+        data_source_handlers.load_data_source_data(info, "MyDataSource")
+    assert get_data_spy.call_count == 2
+
+
+@pytest.mark.parametrize(
+    "fragment,prefetched",
+    [
+        ("... on DynamicChoiceQuestion { options { edges { node { slug } } } }", 2),
+        ("...Options", 2),
+        ("... on DynamicChoiceQuestion { dataSource }", 0),
+    ],
+)
+def test_prefetch_data_sources(
+    db,
+    form,
+    form_question_factory,
+    schema_executor,
+    settings,
+    mocker,
+    fragment,
+    prefetched,
+):
+    settings.DATA_SOURCE_CLASSES = [
+        "caluma.data_source.tests.data_sources.MyDataSource",
+        "caluma.data_source.tests.data_sources.MyOtherDataSource",
+    ]
+    for data_source in ["MyDataSource", "MyOtherDataSource", "MyOtherDataSource"]:
+        form_question_factory(
+            form=form,
+            question__type=Question.TYPE_DYNAMIC_CHOICE,
+            question__data_source=data_source,
+        )
+    form_question_factory(form=form, question__type=Question.TYPE_TEXT)
+    fetch_spy = mocker.spy(data_source_handlers, "_fetch")
+
+    query = (
+        """
+        query Form($slug: String!) {
+          allForms(slug: $slug) {
+            edges {
+              node {
+                questions {
+                  edges {
+                    node {
+                      slug
+                      %s
+                    }
+                  }
+                }
+              }
+            }
+          }
+        }
+        """
+        % fragment
+    )
+    if fragment == "...Options":
+        query += """
+            fragment Options on DynamicChoiceQuestion {
+              options {
+                edges {
+                  node {
+                    slug
+                  }
+                }
+              }
+            }
+        """
+
+    result = schema_executor(query, variables={"slug": form.slug})
+
+    assert not result.errors
+    assert fetch_spy.call_count == prefetched
+    questions = result.data["allForms"]["edges"][0]["node"]["questions"]["edges"]
+    if prefetched:
+        assert all(
+            len(question["node"]["options"]["edges"]) == 6
+            for question in questions
+            if "options" in question["node"]
+        )
+
+
+def test_prefetch_data_sources_failures(info, settings):
+    settings.DATA_SOURCE_CLASSES = [
+        "caluma.data_source.tests.data_sources.MySlowDataSource",
+        "caluma.data_source.tests.data_sources.MyOtherSlowDataSource",
+        "caluma.data_source.tests.data_sources.MyOtherBrokenDataSource",
+    ]
+
+    data_source_handlers.prefetch_data_source_data(
+        info, ["MySlowDataSource", "MyOtherSlowDataSource", "MyOtherBrokenDataSource"]
+    )
+
+    # memoized data sources aren't fetched again
+    data_source_handlers.prefetch_data_source_data(info, ["MySlowDataSource"])
+
+    # slow data sources fall back to their default
+    assert [
+        d.slug
+        for d in data_source_handlers.get_data_source_data(info, "MySlowDataSource")
+    ] == ["1", "2", "3"]
+    with pytest.raises(data_source_handlers.DataSourceException, match="timed out"):
+        data_source_handlers.get_data_source_data(info, "MyOtherSlowDataSource")
+    with pytest.raises(Exception):
+        data_source_handlers.get_data_source_data(info, "MyOtherBrokenDataSource")
+
+
+@pytest.mark.parametrize(
+    "data_source,variables,slugs,total,has_next_page",
+    [
+        ("MyDataSource", {"search": "S"}, ["sdkj", "something"], 3, True),
+        (
+            "MyDataSource",
+            {"search": "english", "first": 5},
+            ["translated_value"],
+            1,
+            False,
+        ),
+        ("MyDataSource", {"slugs": ["1", "value", "x"]}, ["1", "value"], 2, False),
+        ("MyDataSource", {"last": 2}, ["something", "translated_value"], 6, False),
+        (
+            "MyFilteringDataSource",
+            {"search": "99"},
+            ["parcel-99", "parcel-199"],
+            19,
+            True,
+        ),
+        (
+            "MyFilteringDataSource",
+            {"slugs": ["parcel-1", "parcel-5000"]},
+            ["parcel-1"],
+            1,
+            False,
+        ),
+    ],
+)
+def test_search_data_source(
+    schema_executor, settings, data_source, variables, slugs, total, has_next_page
+):
+    settings.DATA_SOURCE_CLASSES = [
+        f"caluma.data_source.tests.data_sources.{data_source}"
+    ]
+    variables.setdefault("first", 2 if "last" not in variables else None)
+
+    query = """
+        query DataSource(
+          $name: String!
+          $search: String
+          $slugs: [String]
+          $first: Int
+          $last: Int
+        ) {
+          dataSource(
+            name: $name
+            search: $search
+            slugs: $slugs
+            first: $first
+            last: $last
+          ) {
+            totalCount
+            pageInfo {
+              hasNextPage
+            }
+            edges {
+              node {
+                slug
+              }
+            }
+          }
+        }
+    """
+
+    result = schema_executor(query, variables={"name": data_source, **variables})
+
+    assert not result.errors
+    assert [
+        edge["node"]["slug"] for edge in result.data["dataSource"]["edges"]
+    ] == slugs
+    assert result.data["dataSource"]["totalCount"] == total
+    assert result.data["dataSource"]["pageInfo"]["hasNextPage"] == has_next_page
+
+
+def test_search_data_source_after(info, settings, mocker):
+    settings.DATA_SOURCE_CLASSES = [
+        "caluma.data_source.tests.data_sources.MyFilteringDataSource"
+    ]
+    filter_spy = mocker.spy(MyFilteringDataSource, "get_filtered_data")
+
+    connection = resolve_data_source_data(
+        info, "MyFilteringDataSource", first=2, after=offset_to_cursor(9)
+    )
+
+    assert [edge.node.slug for edge in connection.edges] == ["parcel-10", "parcel-11"]
+    assert connection.page_info.has_next_page
+    filter_spy.assert_called_once_with(
+        mocker.ANY, info, search=None, slugs=None, offset=10, limit=2
+    )
+
+
+def test_search_data_source_page_size(info, settings, mocker):
+    settings.DATA_SOURCE_CLASSES = [
+        "caluma.data_source.tests.data_sources.MyFilteringDataSource"
+    ]
+    settings.PAGINATION_DEFAULT_PAGE_SIZE = 3
+    filter_spy = mocker.spy(MyFilteringDataSource, "get_filtered_data")
+
+    connection = resolve_data_source_data(info, "MyFilteringDataSource")
+
+    assert len(connection.edges) == 3
+    assert connection.page_info.has_next_page
+    filter_spy.assert_called_once_with(
+        mocker.ANY, info, search=None, slugs=None, offset=0, limit=3
+    )
+
+
+def test_search_data_source_default(info, settings):
+    settings.DATA_SOURCE_CLASSES = [
+        "caluma.data_source.tests.data_sources.MyBrokenFilteringDataSource",
+        "caluma.data_source.tests.data_sources.MyOtherBrokenFilteringDataSource",
+    ]
+
+    connection = resolve_data_source_data(
+        info, "MyBrokenFilteringDataSource", search="2", first=10
+    )
+    assert [edge.node.slug for edge in connection.edges] == ["parcel-2"]
+    assert data_source_handlers.data_source_has_slug(
+        info, "MyBrokenFilteringDataSource", "parcel-1"
+    )
+    assert not data_source_handlers.data_source_has_slug(
+        info, "MyBrokenFilteringDataSource", "parcel-3"
+    )
+
+    with pytest.raises(Exception):
+        resolve_data_source_data(info, "MyOtherBrokenFilteringDataSource", first=10)
+    with pytest.raises(Exception):
+        data_source_handlers.data_source_has_slug(
+            info, "MyOtherBrokenFilteringDataSource", "parcel-1"
+        )
+
+
+@pytest.mark.parametrize(
+    "question__type,value",
+    [
+        (Question.TYPE_DYNAMIC_CHOICE, "parcel-5000"),
+        (Question.TYPE_DYNAMIC_MULTIPLE_CHOICE, ["parcel-1", "parcel-5000"]),
+    ],
+)
+@pytest.mark.parametrize("question__data_source", ["MyFilteringDataSource"])
+def test_validate_with_exists(
+    db, form_question, question, document_factory, answer_factory, info, settings, value
+):
+    settings.DATA_SOURCE_CLASSES = [
+        "caluma.data_source.tests.data_sources.MyFilteringDataSource"
+    ]
+    document = document_factory(form=form_question.form)
+    answer = answer_factory(document=document, question=question, value=value)
+
+    with pytest.raises(
+        CustomValidationError, match="an entry of data source MyFilteringDataSource"
+    ):
+        DocumentValidator().validate(document, info)
+
+    answer.value = "parcel-1" if isinstance(value, str) else ["parcel-1"]
+    answer.save()
+    DocumentValidator().validate(document, info)
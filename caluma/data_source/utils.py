@@ -1,19 +1,182 @@
 import functools
+import hashlib
 import logging
+import threading
+import time
+from copy import copy
 
 from django.core.cache import cache
+from django.db import connection
+from django.utils import translation
+
+from .data_source_handlers import DataSourceException
 
 logger = logging.getLogger(__name__)
 
 
-def data_source_cache(timeout=None):
+def user_key(data_source, info):
+    """Cache data per user."""
+    return str(info.context.user)
+
+
+def group_key(data_source, info):
+    """Cache data per group of the user."""
+    return str(info.context.user.group)
+
+
+def language_key(data_source, info):
+    """Cache data per language of the request."""
+    return translation.get_language()
+
+
+def _start_refresh(refresh):
+    def run():
+        try:
+            refresh()
+        finally:
+            # background threads open their own connection
+            connection.close()
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    return thread
+
+
+class _CachedData:
+    """Data of one data source call in the cache and the keys around it."""
+
+    def __init__(self, method, data_source, info, options):
+        self.method = method
+        self.data_source = data_source
+        self.info = info
+        self.options = options
+        self.language = translation.get_language()
+
+        self.key = f"data_source_{type(data_source).__name__}"
+        if options["key"] is not None:
+            suffix = options["key"](data_source, info)
+            self.key = f"{self.key}_{hashlib.md5(str(suffix).encode()).hexdigest()}"
+        self.fresh_key = f"{self.key}_fresh"
+        self.failed_key = f"{self.key}_failed"
+        self.lock_key = f"{self.key}_lock"
+
+    def compute(self):
+        timeout = self.options["timeout"]
+        stale_timeout = self.options["stale_timeout"]
+
+        try:
+            data = self.method(self.data_source, self.info)
+        except Exception as exc:
+            if self.options["failure_timeout"]:
+                cache.set(self.failed_key, repr(exc), self.options["failure_timeout"])
+            raise
+
+        if timeout is not None and stale_timeout:
+            cache.set(self.fresh_key, True, timeout)
+            timeout += stale_timeout
+        cache.set(self.key, data, timeout)
+        return data
+
+    def detach(self):
+        """Copy this call, so it can be refreshed after the request finished.
+
+        The request and its user are copied at this time, so the data is
+        refreshed for the same language, user and groups as the cache key.
+        """
+        detached = copy(self)
+        detached.info = copy(self.info)
+        detached.info.context = copy(self.info.context)
+        detached.info.context.user = copy(self.info.context.user)
+        return detached
+
+    def refresh(self):
+        try:
+            with translation.override(self.language):
+                self.compute()
+        except Exception:
+            logger.exception(f"Refreshing {self.key} failed")
+        finally:
+            cache.delete(self.lock_key)
+
+    def lock(self, timeout):
+        return cache.add(self.lock_key, True, timeout)
+
+    def raise_failure(self, entries):
+        if self.failed_key in entries:
+            raise DataSourceException(
+                f"{type(self.data_source).__name__}.{self.method.__name__}() "
+                f"failed recently: {entries[self.failed_key]}"
+            )
+
+    def get(self):
+        entries = cache.get_many([self.key, self.fresh_key, self.failed_key])
+
+        if self.key in entries:
+            is_stale = (
+                self.options["timeout"] is not None
+                and self.options["stale_timeout"]
+                and self.fresh_key not in entries
+            )
+            # stale data is returned for at most `stale_timeout`, so a refresh
+            # taking longer may be started again
+            if (
+                is_stale
+                and self.failed_key not in entries
+                and self.lock(self.options["stale_timeout"])
+            ):
+                _start_refresh(self.detach().refresh)
+            return entries[self.key]
+
+        self.raise_failure(entries)
+        lock_timeout = self.options["lock_timeout"]
+        if not lock_timeout:
+            return self.compute()
+
+        # only one caller computes missing data, others wait for it
+        deadline = time.monotonic() + lock_timeout
+        while not self.lock(lock_timeout):
+            if time.monotonic() > deadline:
+                return self.compute()
+
+            time.sleep(0.05)
+            entries = cache.get_many([self.key, self.failed_key])
+            if self.key in entries:
+                return entries[self.key]
+            self.raise_failure(entries)
+
+        try:
+            return self.compute()
+        finally:
+            cache.delete(self.lock_key)
+
+
+def data_source_cache(
+    timeout=None, key=None, stale_timeout=0, failure_timeout=0, lock_timeout=0
+):
+    """Cache the data of a data source in django's cache.
+
+    :param timeout: Seconds the data is fresh, `None` to keep it forever
+    :param key: Function taking the data source and info, which returns the
+                part of the cache key to cache the data by, e.g. `user_key`
+    :param stale_timeout: Seconds expired data is still returned while it is
+                          refreshed in the background
+    :param failure_timeout: Seconds a failure of the data source is cached, so
+                            the upstream isn't called again in the meantime
+    :param lock_timeout: Seconds to wait for another caller computing the same
+                         data, before computing it anyway. `0` doesn't wait
+    """
+    options = {
+        "timeout": timeout,
+        "key": key,
+        "stale_timeout": stale_timeout,
+        "failure_timeout": failure_timeout,
+        "lock_timeout": lock_timeout,
+    }
+
     def decorator(method):
         @functools.wraps(method)
         def handle_cache(self, info):
-            key = f"data_source_{type(self).__name__}"
-
-            get_data_method = functools.partial(method, self, info)
-            return cache.get_or_set(key, get_data_method, timeout)
+            return _CachedData(method, self, info, options).get()
 
         return handle_cache
 
@@ -3,3 +3,10 @@ from django.apps import AppConfig
 
 class DefaultConfig(AppConfig):
     name = "caluma.form"
+
+    def ready(self):
+        from . import signals  # noqa: F401
+        from .format_validators import load_format_validators
+
+        # import and compile configured format validators only once
+        load_format_validators()
@@ -0,0 +1,102 @@
+"""Track which `is_hidden` and `is_required` expressions depend on which answers.
+
+Both the dependency graph of a form and the evaluated question states of a
+document are kept in django's cache. Workers only share them with a shared
+cache backend like memcached, otherwise every worker evaluates its own.
+Cache keys contain a form structure version which changes whenever a question
+or the questions of a form change.
+
+Question states are cached together with the revision of the whole document
+family (the root document and its table rows, see `FamilyRevision`), so any
+change in the family makes the states of all its documents stale. States are only
+written once the transaction is committed, so answers which are rolled back
+never leave their states behind.
+"""
+
+from collections import defaultdict
+
+from django.core.cache import cache
+from django.db import transaction
+
+from .jexl import QuestionJexl
+from .structure import get_form_structure, get_structure_version
+
+
+def _build_form_dependencies(form, version):
+    questions = [
+        {
+            "slug": question.slug,
+            "is_required": question.is_required,
+            "is_hidden": question.is_hidden,
+        }
+        for question in get_form_structure(form, version).tree.all_questions()
+    ]
+
+    jexl = QuestionJexl()
+    dependents = defaultdict(set)
+    for question in questions:
+        for expr in (question["is_hidden"], question["is_required"]):
+            for slug in jexl.extract_referenced_questions(expr):
+                dependents[slug].add(question["slug"])
+
+    return {"questions": questions, "dependents": dict(dependents)}
+
+
+def get_form_dependencies(form, version=None):
+    """Get all questions of given form (or slug) and the questions depending on them.
+
+    Returns a dict with `questions`, the values of all questions of the form
+    including its sub forms, and `dependents`, mapping a question slug to the
+    slugs of all questions whose `is_hidden` or `is_required` expression
+    references its answer.
+    """
+    form_slug = getattr(form, "pk", form)
+    version = version or get_structure_version()
+    key = f"form_dependencies_{form_slug}_{version}"
+    return cache.get_or_set(key, lambda: _build_form_dependencies(form, version))
+
+
+def _question_states_key(document_id, version=None):
+    version = version or get_structure_version()
+    return f"question_states_{document_id}_{version}"
+
+
+def get_question_states_revision(document, family_revision):
+    """Get the revision of the question states of given document.
+
+    `family_revision` is the revision of the document family as returned by
+    `FamilyRevision.objects.get_revisions`.
+    """
+    return (document.form_id, family_revision)
+
+
+def get_cached_question_states(document_id, revision, version=None):
+    """Get the cached question states of a document still at given revision."""
+    entry = cache.get(_question_states_key(document_id, version))
+    if entry is not None and entry["revision"] == revision:
+        return entry["states"]
+    return None
+
+
+def get_many_cached_question_states(revisions, version=None):
+    """Get the cached question states of many documents at once.
+
+    `revisions` maps the document id to the revision its states need to be at.
+    """
+    version = version or get_structure_version()
+    keys = {
+        _question_states_key(document_id, version): document_id
+        for document_id in revisions
+    }
+    return {
+        keys[key]: entry["states"]
+        for key, entry in cache.get_many(keys).items()
+        if entry["revision"] == revisions[keys[key]]
+    }
+
+
+def set_cached_question_states(document_id, states, revision, version=None):
+    """Cache the question states of a document once the transaction is committed."""
+    key = _question_states_key(document_id, version)
+    entry = {"revision": revision, "states": dict(states)}
+    transaction.on_commit(lambda: cache.set(key, entry))
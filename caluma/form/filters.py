@@ -9,6 +9,7 @@ from django_filters.rest_framework import CharFilter, Filter
 from graphene import Enum, InputObjectType, List
 from graphene_django.forms.converter import convert_form_field
 from graphene_django.registry import get_global_registry
+from pyjexl.exceptions import ParseError
 
 from ..core.filters import (
     CompositeFieldClass,
@@ -21,6 +22,7 @@ from ..core.filters import (
 )
 from ..form.models import Answer, Question
 from . import models
+from .jexl import QuestionJexl, QuestionMissing
 
 
 class FormFilterSet(MetaFilterSet):
@@ -311,6 +313,55 @@ class SearchAnswersFilter(Filter):
         return converted
 
 
+class JexlFilter(CharFilter):
+    """Filter documents by a JEXL expression on their answers.
+
+    Expressions are translated into a query and evaluated by the database.
+    Others are rejected, as they would have to be evaluated in python for all
+    documents of the queryset.
+    """
+
+    def __init__(self, *args, **kwargs):
+        self.document_id = kwargs.pop("document_id")
+        super().__init__(*args, **kwargs)
+
+    def filter(self, qs, value):
+        if value in EMPTY_VALUES:
+            return qs
+
+        return qs.filter(self.build_query(value))
+
+    def build_query(self, expression):
+        try:
+            return QuestionJexl().build_query(expression, self.document_id)
+        except (ParseError, QuestionMissing) as exc:
+            raise exceptions.ValidationError(f"Invalid expression {expression}: {exc}")
+        except ValueError as exc:
+            raise exceptions.ValidationError(
+                f"Expression {expression} can't be used to filter documents: {exc}"
+            )
+
+
+class QuestionJexlFilter(JexlFilter):
+    """Filter documents by the `is_hidden` or `is_required` expression of a question."""
+
+    def __init__(self, *args, **kwargs):
+        self.attribute = kwargs.pop("attribute")
+        self.negate = kwargs.pop("negate", False)
+        super().__init__(*args, **kwargs)
+
+    def filter(self, qs, value):
+        if value in EMPTY_VALUES:
+            return qs
+
+        question = models.Question.objects.filter(pk=value).first()
+        if question is None:
+            raise exceptions.ValidationError(f"Question {value} does not exist")
+
+        query = self.build_query(getattr(question, self.attribute))
+        return qs.filter(~query if self.negate else query)
+
+
 class DocumentFilterSet(MetaFilterSet):
     id = GlobalIDFilter()
     search = SearchFilter(
@@ -328,6 +379,11 @@ class DocumentFilterSet(MetaFilterSet):
 
     has_answer = HasAnswerFilter(document_id="pk")
     search_answers = SearchAnswersFilter(document_id="pk")
+    jexl = JexlFilter(document_id="pk")
+    visible_question = QuestionJexlFilter(
+        document_id="pk", attribute="is_hidden", negate=True
+    )
+    required_question = QuestionJexlFilter(document_id="pk", attribute="is_required")
 
     class Meta:
         model = models.Document
@@ -1,7 +1,9 @@
 import re
 from collections import namedtuple
+from functools import lru_cache
 
 from django.conf import settings
+from django.utils.functional import cached_property
 from django.utils.module_loading import import_string
 from rest_framework.exceptions import ValidationError
 
@@ -31,8 +33,28 @@ class BaseFormatValidator:
         ):  # pragma: no cover
             raise NotImplementedError("Missing properties!")
 
+    @cached_property
+    def pattern(self):
+        return re.compile(self.regex)
+
     def validate(self, value, document):
-        if not re.match(self.regex, value):
+        if not self.pattern.match(value):
+            raise ValidationError(translate_value(self.error_msg))
+
+    def validate_many(self, values):
+        """Validate many values at once, e.g. a column of table rows.
+
+        `values` are tuples of a value and the document it belongs to. Raises
+        a `ValidationError` for the first invalid value. Validators overriding
+        `validate` are called for each value, others only match their regex.
+        """
+        if type(self).validate is not BaseFormatValidator.validate:
+            for value, document in values:
+                self.validate(value, document)
+            return
+
+        match = self.pattern.match
+        if not all(match(value) for value, _ in values):
             raise ValidationError(translate_value(self.error_msg))
 
 
@@ -64,6 +86,37 @@ base_format_validators = [EMailFormatValidator, PhoneNumberFormatValidator]
 FormatValidator = namedtuple("FormatValidator", ["slug", "name", "regex", "error_msg"])
 
 
+@lru_cache(maxsize=None)
+def _load_format_validators(class_paths):
+    format_validators = tuple(
+        cls()
+        for cls in [import_string(path) for path in class_paths]
+        + base_format_validators
+    )
+    for format_validator in format_validators:
+        # compile all patterns up front
+        format_validator.pattern
+    return format_validators
+
+
+def load_format_validators():
+    """Get instances of all configured format validators.
+
+    Classes are imported and instantiated once per value of
+    `FORMAT_VALIDATOR_CLASSES`, so instances are shared and must not keep any
+    state.
+    """
+    return _load_format_validators(tuple(settings.FORMAT_VALIDATOR_CLASSES))
+
+
+def get_format_validator_instances():
+    """Get instances of all format validators mapped by slug."""
+    return {
+        format_validator.slug: format_validator
+        for format_validator in load_format_validators()
+    }
+
+
 def get_format_validators(include=None, dic=False):
     """Get all FormatValidators.
 
@@ -73,8 +126,8 @@ def get_format_validators(include=None, dic=False):
     """
 
     format_validator_classes = [
-        import_string(cls) for cls in settings.FORMAT_VALIDATOR_CLASSES
-    ] + base_format_validators
+        type(format_validator) for format_validator in load_format_validators()
+    ]
     if include is not None:
         format_validator_classes = [
             fvc for fvc in format_validator_classes if fvc.slug in include
@@ -179,6 +179,9 @@ class HistoricalTableAnswer(TableAnswer):
         as_of=graphene.types.datetime.DateTime(required=True),
     )
 
+    # rows depend on `as_of`, so they can't be loaded upfront
+    prefetch_value = None
+
     def resolve_value(self, info, as_of, *args):
         answerdocuments = [
             ad
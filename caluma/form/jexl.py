@@ -1,7 +1,13 @@
+from contextlib import contextmanager
+from functools import partial
+
+from django.db.models import Q
 from pyjexl.analysis import ValidatingAnalyzer
 from pyjexl.evaluator import Context
+from pyjexl.parser import ArrayLiteral, Literal, Transform
 
-from ..core.jexl import JEXL
+from ..core.jexl import JEXL, ExtractTransformSubjectAnalyzer
+from .models import Answer, Question
 
 
 class QuestionMissing(Exception):
@@ -16,19 +22,183 @@ class QuestionValidatingAnalyzer(ValidatingAnalyzer):
         yield from super().visit_Transform(transform)
 
 
+class QuestionQueryCompiler:
+    """Translate answer-only JEXL expressions into a `Q` object on documents.
+
+    Supported are comparisons of an answer with literals combined with `&&`,
+    `||` and `!`. The comparisons are translated into lookups on
+    `Answer.value`, so the expression is evaluated by the database.
+
+    Only comparisons which yield the same result as the python evaluation
+    are translated, anything else raises a `ValueError`. In SQL, answers of
+    questions which are not part of the document's form count as not
+    answered instead of raising `QuestionMissing`, and comparing an
+    unanswered question with a number is false instead of a `TypeError`.
+    """
+
+    ORDERING_LOOKUPS = {"<": "lt", "<=": "lte", ">": "gt", ">=": "gte"}
+    FLIPPED_OPERATORS = {"<": ">", "<=": ">=", ">": "<", ">=": "<=", "==": "=="}
+
+    COMPARABLE_TYPES = (
+        Question.TYPE_TEXT,
+        Question.TYPE_TEXTAREA,
+        Question.TYPE_INTEGER,
+        Question.TYPE_FLOAT,
+        Question.TYPE_CHOICE,
+        Question.TYPE_DYNAMIC_CHOICE,
+    )
+    NUMERIC_TYPES = (Question.TYPE_INTEGER, Question.TYPE_FLOAT)
+    MULTIPLE_CHOICE_TYPES = (
+        Question.TYPE_MULTIPLE_CHOICE,
+        Question.TYPE_DYNAMIC_MULTIPLE_CHOICE,
+    )
+
+    def __init__(self, question_types, document_id="pk"):
+        self.question_types = question_types
+        self.document_id = document_id
+
+    def compile(self, expression):
+        method = getattr(
+            self, "compile_" + type(expression).__name__, self.generic_compile
+        )
+        return method(expression)
+
+    def compile_BinaryExpression(self, exp):
+        symbol = exp.operator.symbol
+        if symbol == "&&":
+            return self.compile(exp.left) & self.compile(exp.right)
+        if symbol == "||":
+            return self.compile(exp.left) | self.compile(exp.right)
+
+        if self._is_answer(exp.left) and symbol in ("in", "intersects"):
+            return self._compile_membership(symbol, exp.left, exp.right)
+        if self._is_answer(exp.right) and symbol == "in":
+            return self._compile_contains(exp.right, exp.left)
+
+        if self._is_answer(exp.right) and not self._is_answer(exp.left):
+            if symbol not in self.FLIPPED_OPERATORS and symbol != "!=":
+                return self.generic_compile(exp)
+            return self._compile_comparison(
+                self.FLIPPED_OPERATORS.get(symbol, symbol), exp.right, exp.left
+            )
+
+        return self._compile_comparison(symbol, exp.left, exp.right)
+
+    def compile_UnaryExpression(self, exp):
+        if exp.operator.symbol != "!":  # pragma: no cover
+            # pyjexl's default grammar knows no other unary operator
+            return self.generic_compile(exp)
+        return ~self.compile(exp.right)
+
+    def compile_Literal(self, literal):
+        # an explicit condition, as django drops a negated empty `Q()`
+        return Q(**{f"{self.document_id}__isnull": not literal.value})
+
+    def generic_compile(self, expression):
+        raise ValueError(f"Can't translate {expression} into a query")
+
+    def _is_answer(self, node):
+        return (
+            isinstance(node, Transform)
+            and node.name == "answer"
+            and not node.args
+            and isinstance(node.subject, Literal)
+        )
+
+    def _question_type(self, transform, types):
+        question_type = self.question_types.get(transform.subject.value)
+        if question_type not in types:
+            raise ValueError(
+                f"Can't translate answer of question {transform.subject.value} "
+                f"of type {question_type} into a query"
+            )
+        return question_type
+
+    def _scalar(self, node, numeric=False):
+        if not isinstance(node, Literal):
+            return self.generic_compile(node)
+
+        # booleans compare equal to numbers in python but not in postgres
+        types = (int, float) if numeric else (str, int, float)
+        if isinstance(node.value, bool) or not isinstance(node.value, types):
+            return self.generic_compile(node)
+        return node.value
+
+    def _answers(self, transform, **lookup):
+        answers = Answer.objects.filter(question_id=transform.subject.value, **lookup)
+        return Q(**{f"{self.document_id}__in": answers.values("document")})
+
+    def _compile_comparison(self, symbol, answer, other):
+        if not self._is_answer(answer):
+            return self.generic_compile(answer)
+
+        if symbol in ("==", "!="):
+            self._question_type(answer, self.COMPARABLE_TYPES)
+            equal = self._answers(answer, value=self._scalar(other))
+            return equal if symbol == "==" else ~equal
+
+        if symbol in self.ORDERING_LOOKUPS:
+            self._question_type(answer, self.NUMERIC_TYPES)
+            lookup = self.ORDERING_LOOKUPS[symbol]
+            return self._answers(
+                answer, **{f"value__{lookup}": self._scalar(other, numeric=True)}
+            )
+
+        return self.generic_compile(answer)
+
+    def _compile_membership(self, symbol, answer, other):
+        if not isinstance(other, ArrayLiteral):
+            return self.generic_compile(other)
+        values = [self._scalar(value) for value in other.value]
+
+        if symbol == "in":
+            self._question_type(answer, self.COMPARABLE_TYPES)
+            return self._answers(answer, value__in=values)
+
+        self._question_type(answer, self.MULTIPLE_CHOICE_TYPES)
+        query = Q(**{f"{self.document_id}__in": []})
+        for value in values:
+            query |= self._answers(answer, value__contains=[value])
+        return query
+
+    def _compile_contains(self, answer, other):
+        self._question_type(answer, self.MULTIPLE_CHOICE_TYPES)
+        return self._answers(answer, value__contains=[self._scalar(other)])
+
+
 class QuestionJexl(JEXL):
+    pure_transforms = frozenset(["mapby"])
+
     def __init__(self, answer_by_question={}, form=None, **kwargs):
         super().__init__(**kwargs)
 
         self.context = Context({"form": form})
         self.answer_by_question = answer_by_question
+        self.answer_columns = {}
 
         self.add_transform("answer", self.answer_transform)
+        self.add_batch_transform("answer", self.answer_batch_transform)
         self.add_transform("mapby", lambda arr, key: [obj[key] for obj in arr])
         self.add_binary_operator(
             "intersects", 20, lambda left, right: any(x in right for x in left)
         )
 
+    @contextmanager
+    def use_answers(self, answer_by_question, form=None):
+        """Evaluate expressions against given answers within this context.
+
+        This allows to bind one instance per validation run and reuse it for
+        every document involved (e.g. table rows), instead of registering the
+        transforms and operators again for every evaluation.
+        """
+        previous = self.answer_by_question, self.context["form"]
+        self.answer_by_question = answer_by_question
+        self.context["form"] = form
+        try:
+            yield self
+        finally:
+            self.answer_by_question, self.context["form"] = previous
+
     def answer_transform(self, question):
         try:
             return self.answer_by_question[question]
@@ -37,5 +207,69 @@ class QuestionJexl(JEXL):
                 f"Question `{question}` could not be found in form {self.context['form']}"
             )
 
+    def answer_batch_transform(self, questions, rows):
+        try:
+            return [
+                self.answer_columns[question][row]
+                for question, row in zip(questions, rows)
+            ]
+        except KeyError as exc:
+            raise QuestionMissing(
+                f"Question `{exc.args[0]}` could not be found in form {self.context['form']}"
+            )
+
+    def evaluate_many(self, expression, answer_columns, size, form=None):
+        """Evaluate expression against the answers of `size` documents at once.
+
+        `answer_columns` maps question slugs to a sequence (e.g. a list or a
+        numpy array) holding the answer of every document. Returns a list
+        with the result of every document.
+
+        Expressions which can't be evaluated in a batch are evaluated for
+        one document after another.
+        """
+        try:
+            self.compile_batch(expression)
+        except ValueError:
+            results = []
+            for row in range(size):
+                answers = {slug: column[row] for slug, column in answer_columns.items()}
+                with self.use_answers(answers, form):
+                    results.append(self.evaluate(expression))
+            return results
+
+        previous = self.answer_columns, self.context["form"]
+        self.answer_columns = answer_columns
+        self.context["form"] = form
+        try:
+            return self.evaluate_batch(expression, size)
+        finally:
+            self.answer_columns, self.context["form"] = previous
+
+    def build_query(self, expression, document_id="pk"):
+        """Translate expression into a `Q` object filtering documents.
+
+        Raises a `ValueError` if the expression can't be evaluated by the
+        database (see `QuestionQueryCompiler`) and `QuestionMissing` if it
+        references questions which don't exist.
+        """
+        referenced_questions = set(self.extract_referenced_questions(expression))
+        question_types = dict(
+            Question.objects.filter(pk__in=referenced_questions).values_list(
+                "slug", "type"
+            )
+        )
+        missing = sorted(referenced_questions.difference(question_types))
+        if missing:
+            raise QuestionMissing(f"Question `{missing[0]}` could not be found")
+        compiler = QuestionQueryCompiler(question_types, document_id)
+        return compiler.compile(self.parse(expression))
+
     def validate(self, expression, **kwargs):
         return super().validate(expression, QuestionValidatingAnalyzer)
+
+    def extract_referenced_questions(self, expr):
+        transforms = ["answer"]
+        yield from self.analyze(
+            expr, partial(ExtractTransformSubjectAnalyzer, transforms=transforms)
+        )
@@ -0,0 +1,62 @@
+from types import SimpleNamespace
+
+from django.core.management.base import BaseCommand
+from django.db.models import F
+
+from ....user.models import AnonymousUser
+from ...models import Document
+from ...validators import get_documents_validity
+
+
+class Command(BaseCommand):
+    """Validate documents outside of a request."""
+
+    help = "Validate documents and print their validity."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "-f", "--form", dest="form", help="Only validate documents of given form"
+        )
+        parser.add_argument(
+            "-w",
+            "--workers",
+            dest="workers",
+            type=int,
+            help="Number of threads (defaults to DOCUMENT_VALIDITY_WORKERS)",
+        )
+        parser.add_argument(
+            "-c",
+            "--chunk-size",
+            dest="chunk_size",
+            type=int,
+            help="Documents per thread (defaults to DOCUMENT_VALIDITY_CHUNK_SIZE)",
+        )
+
+    def handle(self, *args, **options):
+        # families are validated through their root documents
+        documents = Document.objects.filter(pk=F("family")).order_by("pk")
+        if options["form"]:
+            documents = documents.filter(form_id=options["form"])
+
+        # data sources expect the graphql info of a request
+        info = SimpleNamespace(context=SimpleNamespace(user=AnonymousUser()))
+
+        invalid = 0
+        results = get_documents_validity(
+            documents.select_related("form"),
+            info,
+            workers=options["workers"],
+            chunk_size=options["chunk_size"],
+        )
+        for result in results:
+            if not result["is_valid"]:
+                invalid += 1
+            errors = ", ".join(
+                f'{error["slug"]}: {error["error_msg"]}' for error in result["errors"]
+            )
+            self.stdout.write(
+                f'{result["id"]} {"valid" if result["is_valid"] else "invalid"} '
+                f'({result["duration"]:.3f}s){" " + errors if errors else ""}'
+            )
+
+        self.stdout.write(f"{invalid} invalid document(s)")
@@ -0,0 +1,18 @@
+# Generated by Django 2.2.6 on 2026-10-17 13:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [("form", "0024_auto_20190919_1244")]
+
+    operations = [
+        migrations.CreateModel(
+            name="FamilyRevision",
+            fields=[
+                ("family", models.UUIDField(primary_key=True, serialize=False)),
+                ("revision", models.PositiveIntegerField(default=0)),
+            ],
+        )
+    ]
@@ -1,6 +1,6 @@
 from django.contrib.postgres.fields import ArrayField, JSONField
 from django.contrib.postgres.indexes import GinIndex
-from django.db import models, transaction
+from django.db import connections, models, transaction
 from django.db.models.signals import post_init
 from django.dispatch import receiver
 from localized_fields.fields import LocalizedField, LocalizedTextField
@@ -28,11 +28,11 @@ class Form(SlugModel):
     )
 
     def all_questions(self):
-        questions = self.questions.all()
-        for q in self.questions.filter(type=Question.TYPE_FORM):
-            questions = questions.union(q.sub_form.all_questions())
+        # imported here as the form structure is built from these models
+        from .structure import load_form_tree
 
-        return questions
+        slugs = [question.slug for question in load_form_tree(self).all_questions()]
+        return Question.objects.filter(pk__in=slugs)
 
     class Meta:
         indexes = [GinIndex(fields=["meta"])]
@@ -211,6 +211,50 @@ class Document(UUIDModel):
         indexes = [GinIndex(fields=["meta"])]
 
 
+class FamilyRevisionManager(models.Manager):
+    def bump(self, family):
+        """Increment the revision of given document family and return it.
+
+        The row stays locked until the transaction is committed, so concurrent
+        changes of a family are counted one after another.
+        """
+        table = self.model._meta.db_table
+        with connections[self.db].cursor() as cursor:
+            cursor.execute(
+                f"INSERT INTO {table} (family, revision) VALUES (%s, 1) "
+                f"ON CONFLICT (family) DO UPDATE SET revision = {table}.revision + 1 "
+                "RETURNING revision",
+                [family],
+            )
+            return cursor.fetchone()[0]
+
+    def get_revisions(self, families):
+        """Get the revisions of given document families with one query.
+
+        Families which never changed are at revision 0.
+        """
+        revisions = dict.fromkeys(families, 0)
+        revisions.update(
+            self.filter(family__in=revisions.keys()).values_list("family", "revision")
+        )
+        return revisions
+
+
+class FamilyRevision(models.Model):
+    """
+    Revision of a document family, incremented on every change of its documents.
+
+    Documents, their answers and table rows bump the revision of their family
+    when they are saved or deleted, so anything derived from the answers of a
+    family can be cached together with it.
+    """
+
+    objects = FamilyRevisionManager()
+
+    family = models.UUIDField(primary_key=True)
+    revision = models.PositiveIntegerField(default=0)
+
+
 class Answer(UUIDModel):
     question = models.ForeignKey(
         "form.Question", on_delete=models.DO_NOTHING, related_name="answers"
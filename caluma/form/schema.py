@@ -2,7 +2,9 @@ import graphene
 from django.shortcuts import get_object_or_404
 from graphene import relay
 from graphene.types import ObjectType, generic
+from graphene_django.forms.converter import convert_form_field
 from graphene_django.rest_framework import serializer_converter
+from graphql.language import ast
 
 from ..core.filters import (
     CollectionFilterSetFactory,
@@ -16,12 +18,18 @@ from ..core.types import (
     CountableConnectionBase,
     DjangoObjectType,
     Node,
+    get_prefetched,
+    prefetch,
 )
-from ..data_source.data_source_handlers import get_data_source_data
-from ..data_source.schema import DataSourceDataConnection
+from ..data_source.data_source_handlers import prefetch_data_source_data
+from ..data_source.schema import DataSourceDataConnectionField, resolve_data_source_data
 from . import filters, models, serializers
 from .format_validators import get_format_validators
-from .validators import get_document_validity
+from .validators import (
+    DocumentValidityResults,
+    get_document_validity,
+    get_documents_visibility,
+)
 
 
 def resolve_answer(answer):
@@ -160,10 +168,43 @@ class Option(FormDjangoObjectType):
         return queryset.order_by("-questionoption__sort")
 
 
+def selects_field(info, name):
+    """Check whether the selection of the resolved field includes a field."""
+
+    def selects(selection_set):
+        for selection in selection_set.selections if selection_set else []:
+            if isinstance(selection, ast.FragmentSpread):
+                selection = info.fragments[selection.name.value]
+            elif isinstance(selection, ast.Field) and selection.name.value == name:
+                return True
+            if selects(selection.selection_set):
+                return True
+        return False
+
+    return any(selects(field.selection_set) for field in info.field_asts)
+
+
 class QuestionConnection(CountableConnectionBase):
     class Meta:
         node = Question
 
+    def resolve_edges(self, info, **kwargs):
+        if selects_field(info, "options"):
+            # fetch the options of all dynamic questions at once
+            prefetch_data_source_data(
+                info,
+                {
+                    edge.node.data_source
+                    for edge in self.edges
+                    if edge.node.type
+                    in (
+                        models.Question.TYPE_DYNAMIC_CHOICE,
+                        models.Question.TYPE_DYNAMIC_MULTIPLE_CHOICE,
+                    )
+                },
+            )
+        return super().resolve_edges(info, **kwargs)
+
 
 class QuestionQuerysetMixin(object):
     """Mixin to combine all different question types into one queryset."""
@@ -296,11 +337,11 @@ class MultipleChoiceQuestion(QuestionQuerysetMixin, FormDjangoObjectType):
 
 
 class DynamicChoiceQuestion(QuestionQuerysetMixin, FormDjangoObjectType):
-    options = ConnectionField(DataSourceDataConnection)
+    options = DataSourceDataConnectionField()
     data_source = graphene.String(required=True)
 
-    def resolve_options(self, info, *args):
-        return get_data_source_data(info, self.data_source)
+    def resolve_options(self, info, **args):
+        return resolve_data_source_data(info, self.data_source, **args)
 
     class Meta:
         model = models.Question
@@ -319,11 +360,11 @@ class DynamicChoiceQuestion(QuestionQuerysetMixin, FormDjangoObjectType):
 
 
 class DynamicMultipleChoiceQuestion(QuestionQuerysetMixin, FormDjangoObjectType):
-    options = ConnectionField(DataSourceDataConnection)
+    options = DataSourceDataConnectionField()
     data_source = graphene.String(required=True)
 
-    def resolve_options(self, info, *args):
-        return get_data_source_data(info, self.data_source)
+    def resolve_options(self, info, **args):
+        return resolve_data_source_data(info, self.data_source, **args)
 
     class Meta:
         model = models.Question
@@ -708,7 +749,26 @@ class Document(FormDjangoObjectType):
 class TableAnswer(AnswerQuerysetMixin, FormDjangoObjectType):
     value = graphene.List(Document, required=True)
 
+    @classmethod
+    def prefetch_value(cls, instances, info):
+        answers = [
+            answer
+            for answer in instances
+            if answer.question.type == models.Question.TYPE_TABLE
+        ]
+        prefetch(
+            answers,
+            "documents",
+            models.Document.objects.order_by("-answerdocument__sort"),
+        )
+        return [
+            row for answer in answers for row in get_prefetched(answer, "documents")
+        ]
+
     def resolve_value(self, info, **args):
+        rows = get_prefetched(self, "documents")
+        if rows is not None:
+            return rows
         return self.documents.order_by("-answerdocument__sort")
 
     class Meta:
@@ -866,6 +926,7 @@ class ValidationResult(ObjectType):
 
     is_valid = graphene.Boolean()
     errors = graphene.List(ValidationEntry)
+    duration = graphene.Float(description="Time taken to validate in seconds")
 
 
 class DocumentValidityConnection(CountableConnectionBase):
@@ -880,14 +941,33 @@ def validate_document(info, document_global_id):
     document_qs = Document.get_queryset(models.Document.objects.all(), info)
 
     document = get_object_or_404(document_qs, pk=document_id)
-    result = get_document_validity(document, info)
+    return [to_validation_result(get_document_validity(document, info))]
+
 
+def to_validation_result(result):
     errors = result.pop("errors")
-    result = ValidationResult(
-        **result, errors=[ValidationEntry(**err) for err in errors]
-    )
+    return ValidationResult(**result, errors=[ValidationEntry(**err) for err in errors])
+
+
+class ValidationResults(DocumentValidityResults):
+    def __getitem__(self, index):
+        results = super().__getitem__(index)
+        # single items are sliced from the list as well
+        if isinstance(index, slice):
+            results = [to_validation_result(result) for result in results]
+        return results
 
-    return [result]
+
+class DocumentVisibility(ObjectType):
+    id = graphene.ID()
+    id.__doc__ = "References the document ID"
+
+    is_hidden = graphene.Boolean()
+
+
+class DocumentVisibilityConnection(CountableConnectionBase):
+    class Meta:
+        node = DocumentVisibility
 
 
 class Query:
@@ -906,9 +986,60 @@ class Query:
     document_validity = ConnectionField(
         DocumentValidityConnection, id=graphene.ID(required=True)
     )
+    documents_validity = ConnectionField(
+        DocumentValidityConnection,
+        ids=graphene.List(graphene.ID),
+        # same filter type as allDocuments, converted when the schema is built
+        filter=graphene.List(
+            lambda: convert_form_field(
+                CollectionFilterSetFactory(filters.DocumentFilterSet)
+                .base_filters["filter"]
+                .field
+            ).of_type
+        ),
+        description=(
+            "Validate many documents. Only the documents of the requested page "
+            "are validated."
+        ),
+    )
+    documents_visibility = ConnectionField(
+        DocumentVisibilityConnection,
+        ids=graphene.List(graphene.ID, required=True),
+        question=graphene.ID(required=True),
+        description="Evaluate whether a question is hidden for many documents.",
+    )
 
     def resolve_all_format_validators(self, info):
         return get_format_validators()
 
     def resolve_document_validity(self, info, id):
         return validate_document(info, id)
+
+    def resolve_documents_validity(self, info, ids=None, filter=None, **kwargs):
+        documents = Document.get_queryset(models.Document.objects.all(), info)
+        if ids is not None:
+            documents = documents.filter(
+                pk__in=[extract_global_id(document_id) for document_id in ids]
+            )
+        filterset_class = CollectionFilterSetFactory(filters.DocumentFilterSet)
+        documents = filterset_class(
+            data={"filter": filter}, queryset=documents, request=info.context
+        ).qs
+
+        return ValidationResults(documents.order_by("pk"), info)
+
+    def resolve_documents_visibility(self, info, ids, question):
+        question = get_object_or_404(
+            models.Question.objects, pk=extract_global_id(question)
+        )
+        documents = Document.get_queryset(
+            models.Document.objects.filter(
+                pk__in=[extract_global_id(document_id) for document_id in ids]
+            ),
+            info,
+        )
+
+        return [
+            DocumentVisibility(**result)
+            for result in get_documents_visibility(documents, question)
+        ]
@@ -10,7 +10,7 @@ from rest_framework.serializers import (
 )
 
 from ..core import serializers
-from . import models, validators
+from . import models, structure, validators
 from .jexl import QuestionJexl
 
 
@@ -77,6 +77,7 @@ class AddFormQuestionSerializer(serializers.ModelSerializer):
                 models.FormQuestion.objects.filter(
                     form=instance, question=question
                 ).update(sort=sort)
+            structure.bump_structure_version()
 
         return instance
 
@@ -127,6 +128,8 @@ class ReorderFormQuestionsSerializer(serializers.ModelSerializer):
             models.FormQuestion.objects.filter(form=instance, question=question).update(
                 sort=sort
             )
+        # bulk updates don't send any signals
+        structure.bump_structure_version()
 
         return instance
 
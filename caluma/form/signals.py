@@ -0,0 +1,70 @@
+from logging import getLogger
+
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import dependencies, models, structure
+from .jexl import QuestionMissing
+from .validators import DocumentValidator
+
+log = getLogger(__name__)
+
+
+@receiver(post_save, sender=models.Form)
+@receiver(post_delete, sender=models.Form)
+@receiver(post_save, sender=models.Question)
+@receiver(post_delete, sender=models.Question)
+@receiver(post_save, sender=models.FormQuestion)
+@receiver(post_delete, sender=models.FormQuestion)
+@receiver(post_save, sender=models.QuestionOption)
+@receiver(post_delete, sender=models.QuestionOption)
+@receiver(post_save, sender=models.Option)
+@receiver(post_delete, sender=models.Option)
+def update_structure_version(sender, instance, **kwargs):
+    structure.bump_structure_version()
+
+
+@receiver(post_save, sender=models.Document)
+@receiver(post_delete, sender=models.Document)
+def bump_document_family_revision(sender, instance, **kwargs):
+    models.FamilyRevision.objects.bump(instance.family)
+
+
+@receiver(post_delete, sender=models.Answer)
+def bump_answer_family_revision(sender, instance, **kwargs):
+    models.FamilyRevision.objects.bump(instance.document.family)
+
+
+@receiver(post_save, sender=models.AnswerDocument)
+@receiver(post_delete, sender=models.AnswerDocument)
+def bump_answer_document_family_revision(sender, instance, **kwargs):
+    models.FamilyRevision.objects.bump(instance.answer.document.family)
+
+
+# Question states are cached with the revision of the whole document family,
+# so changed or deleted answers make the states of all documents of the family
+# stale, including parents of table rows.
+
+
+@receiver(post_save, sender=models.Answer)
+def update_question_states(sender, instance, **kwargs):
+    document = instance.document
+    revision = models.FamilyRevision.objects.bump(document.family)
+
+    validator = DocumentValidator()
+    validator.family_revisions[document.family] = revision
+    try:
+        # the family stays locked until the transaction is committed, so the
+        # states to update are the ones of the revision before this change
+        validator.update_question_states(
+            document,
+            instance.question_id,
+            dependencies.get_question_states_revision(document, revision - 1),
+        )
+    except (QuestionMissing, RuntimeError) as exc:
+        # broken expressions must not prevent answers from being saved, they
+        # will be reported when validating the document. The cached states
+        # are stale by now, so they are evaluated again when needed.
+        log.warning(
+            f"Could not update question states of document {document.pk}: {exc}"
+        )
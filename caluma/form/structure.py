@@ -0,0 +1,244 @@
+"""Load the structure of a form including all nested sub forms at once.
+
+`Form.all_questions()` used to descend into every form question with a
+separate query. `load_form_tree` fetches all questions of a form and its sub
+forms with a single recursive query and joins them into an immutable tree in
+memory, so it can be shared between validation, resolvers and mutations.
+
+As the configuration of forms rarely changes, `get_form_structure` keeps
+compiled form structures in memory of every process. They are keyed by a
+structure version stored in django's cache, which is changed whenever the
+configuration changes, so all workers pick up changes without polling the
+database. Workers only share the version with a shared cache backend like
+memcached, see `CACHE_BACKEND`.
+"""
+
+from types import MappingProxyType
+from uuid import uuid4
+
+from django.core.cache import cache
+from django.db import transaction
+
+from ..core.jexl import Cache
+from .format_validators import get_format_validator_instances
+from .jexl import QuestionJexl
+from .models import Form, FormQuestion, Question, QuestionOption
+
+STRUCTURE_VERSION_KEY = "form_structure_version"
+
+
+def get_structure_version():
+    return cache.get_or_set(STRUCTURE_VERSION_KEY, lambda: uuid4().hex, None)
+
+
+def _set_structure_version():
+    # a random token instead of a counter, so an evicted version can never be
+    # reused with stale entries
+    cache.set(STRUCTURE_VERSION_KEY, uuid4().hex, None)
+
+
+def bump_structure_version():
+    """Change the structure version now and once the transaction is committed.
+
+    The current transaction sees its own changes right away. Other workers
+    may build structures from the configuration committed before in the
+    meantime, which are left behind by changing the version again on commit.
+    """
+    _set_structure_version()
+    transaction.on_commit(_set_structure_version)
+
+
+class _Immutable:
+    __slots__ = ()
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def __delattr__(self, name):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+
+class QuestionNode(_Immutable):
+    """Question of a form tree.
+
+    `sub_form` is the tree of the referenced form for questions of type
+    form, `None` otherwise.
+    """
+
+    __slots__ = ("question", "sub_form")
+
+    def __init__(self, question, sub_form=None):
+        object.__setattr__(self, "question", question)
+        object.__setattr__(self, "sub_form", sub_form)
+
+    @property
+    def slug(self):
+        return self.question.slug
+
+    @property
+    def type(self):
+        return self.question.type
+
+    def __repr__(self):
+        return f"QuestionNode({self.slug})"
+
+
+class FormTree(_Immutable):
+    """Questions of a form in their configured order."""
+
+    __slots__ = ("slug", "questions")
+
+    def __init__(self, slug, questions):
+        object.__setattr__(self, "slug", slug)
+        object.__setattr__(self, "questions", tuple(questions))
+
+    def all_questions(self):
+        """Get all questions of the form and its sub forms.
+
+        Questions are returned depth first in the order of the form and only
+        once, even if a sub form is used multiple times.
+        """
+        seen = set()
+        stack = [iter(self.questions)]
+        while stack:
+            for node in stack[-1]:
+                if node.slug in seen:
+                    continue
+                seen.add(node.slug)
+                yield node.question
+                if node.sub_form is not None:
+                    stack.append(iter(node.sub_form.questions))
+                    break
+            else:
+                stack.pop()
+
+    def get(self, slug, default=None):
+        return next(
+            (question for question in self.all_questions() if question.slug == slug),
+            default,
+        )
+
+    def __repr__(self):
+        return f"FormTree({self.slug})"
+
+
+def _tree_query():
+    form_question = FormQuestion._meta.db_table
+    question = Question._meta.db_table
+
+    return f"""
+        WITH RECURSIVE tree(form_id, question_id, sort) AS (
+            SELECT form_id, question_id, sort
+            FROM {form_question}
+            WHERE form_id = %s
+          UNION
+            SELECT fq.form_id, fq.question_id, fq.sort
+            FROM tree
+            JOIN {question} q ON q.slug = tree.question_id
+            JOIN {form_question} fq ON fq.form_id = q.sub_form_id
+            WHERE q.type = %s
+        )
+        SELECT q.*, tree.form_id AS tree_form_id
+        FROM tree
+        JOIN {question} q ON q.slug = tree.question_id
+        ORDER BY tree.form_id, tree.sort DESC
+    """
+
+
+def load_form_tree(form):
+    """Load the tree of given form (a `Form` or its slug) with one query."""
+    slug = form.pk if isinstance(form, Form) else form
+
+    questions_by_form = {}
+    for question in Question.objects.raw(_tree_query(), [slug, Question.TYPE_FORM]):
+        questions_by_form.setdefault(question.tree_form_id, []).append(question)
+
+    trees = {}
+
+    def build(form_slug, ancestors):
+        if form_slug in trees:
+            return trees[form_slug]
+
+        ancestors = ancestors | {form_slug}
+        nodes = []
+        for question in questions_by_form.get(form_slug, []):
+            sub_form = None
+            # a form including one of its ancestors would never end
+            if question.sub_form_id and question.sub_form_id not in ancestors:
+                sub_form = build(question.sub_form_id, ancestors)
+            nodes.append(QuestionNode(question, sub_form))
+
+        trees[form_slug] = FormTree(form_slug, nodes)
+        return trees[form_slug]
+
+    return build(slug, frozenset())
+
+
+class FormStructure(_Immutable):
+    """Compiled configuration of a form.
+
+    Besides the tree of the form, it holds the option slugs and the format
+    validator instances of every question, mapped by question slug.
+    """
+
+    __slots__ = ("tree", "version", "options", "format_validators")
+
+    def __init__(self, tree, version, options, format_validators):
+        object.__setattr__(self, "tree", tree)
+        object.__setattr__(self, "version", version)
+        object.__setattr__(self, "options", MappingProxyType(options))
+        object.__setattr__(
+            self, "format_validators", MappingProxyType(format_validators)
+        )
+
+    def __repr__(self):
+        return f"FormStructure({self.tree.slug}, {self.version})"
+
+
+def _build_form_structure(slug, version):
+    tree = load_form_tree(slug)
+    questions = list(tree.all_questions())
+
+    options = {question.slug: [] for question in questions}
+    for question_id, option_id in QuestionOption.objects.filter(
+        question__in=options.keys()
+    ).values_list("question_id", "option_id"):
+        options[question_id].append(option_id)
+
+    validators = get_format_validator_instances()
+    format_validators = {
+        question.slug: tuple(
+            validators[validator_slug] for validator_slug in question.format_validators
+        )
+        for question in questions
+    }
+
+    # parsed expressions are kept in the process wide JEXL cache
+    QuestionJexl().warm_up(
+        expression
+        for question in questions
+        for expression in (question.is_hidden, question.is_required)
+    )
+
+    return FormStructure(
+        tree,
+        version,
+        {slug: tuple(option_slugs) for slug, option_slugs in options.items()},
+        format_validators,
+    )
+
+
+structure_cache = Cache(max_size=500)
+
+
+def get_form_structure(form, version=None):
+    """Get the compiled structure of given form (a `Form` or its slug).
+
+    Structures are built once per process and structure version. Pass the
+    `version` when it is already known to spare the cache lookup.
+    """
+    slug = form.pk if isinstance(form, Form) else form
+    version = version or get_structure_version()
+    return structure_cache.get_or_set(
+        (slug, version), lambda: _build_form_structure(slug, version)
+    )
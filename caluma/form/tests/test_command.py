@@ -9,7 +9,7 @@ from simple_history.models import registered_models
 
 from caluma.core.management.commands import cleanup_history
 
-from ..models import Form
+from ..models import Form, Question
 
 
 def test_create_bucket_command(mocker):
@@ -49,3 +49,25 @@ def test_cleanup_history_command(db, force, keep, kept):
     call_command("cleanup_history", **kwargs, stdout=open(os.devnull, "w"))
 
     assert Form.history.count() == kept
+
+
+@pytest.mark.parametrize("workers", [None, 2])
+def test_validate_documents_command(
+    transactional_db, workers, form_question_factory, document_factory, capsys
+):
+    form_question = form_question_factory(
+        question__type=Question.TYPE_TEXT, question__is_required="true"
+    )
+    document = document_factory(form=form_question.form)
+    document_factory()
+
+    call_command("validate_documents", form=form_question.form.pk, workers=workers)
+
+    out = capsys.readouterr().out.splitlines()
+    slug = form_question.question.slug
+    assert len(out) == 2
+    assert out[0].startswith(f"{document.pk} invalid (")
+    assert out[0].endswith(
+        f"s) {slug}: Questions {slug} are required but not provided."
+    )
+    assert out[1] == "1 invalid document(s)"
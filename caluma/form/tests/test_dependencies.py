@@ -0,0 +1,205 @@
+import pytest
+from django.db import DatabaseError, transaction
+
+from .. import dependencies
+from ..jexl import QuestionJexl
+from ..models import Question
+from ..validators import DocumentValidator
+
+
+@pytest.fixture
+def dependent_form(form, form_question_factory):
+    form_question_factory(
+        form=form,
+        question__slug="q1",
+        question__type=Question.TYPE_TEXT,
+        question__is_required="false",
+        question__is_hidden="false",
+    )
+    form_question_factory(
+        form=form,
+        question__slug="q2",
+        question__type=Question.TYPE_TEXT,
+        question__is_required="true",
+        question__is_hidden="'q1'|answer == 'hide'",
+    )
+    form_question_factory(
+        form=form,
+        question__slug="q3",
+        question__type=Question.TYPE_TEXT,
+        question__is_required="['q1'|answer] == ['require']",
+        question__is_hidden="false",
+    )
+    return form
+
+
+def get_cached_states(document):
+    revision = DocumentValidator().get_question_states_revision(document)
+    return dependencies.get_cached_question_states(document.pk, revision)
+
+
+def test_form_dependencies(db, dependent_form):
+    form_dependencies = dependencies.get_form_dependencies(dependent_form)
+
+    assert {q["slug"] for q in form_dependencies["questions"]} == {"q1", "q2", "q3"}
+    assert form_dependencies["dependents"] == {"q1": {"q2", "q3"}}
+
+
+def test_form_dependencies_structure_version(db, dependent_form):
+    dependencies.get_form_dependencies(dependent_form)
+
+    question = Question.objects.get(pk="q1")
+    question.is_hidden = "'q2'|answer == 'hide'"
+    question.save()
+
+    form_dependencies = dependencies.get_form_dependencies(dependent_form)
+    assert form_dependencies["dependents"] == {"q1": {"q2", "q3"}, "q2": {"q1"}}
+
+
+def test_update_question_states(
+    transactional_db, dependent_form, document_factory, answer_factory, mocker
+):
+    document = document_factory(form=dependent_form)
+    answer = answer_factory(
+        document=document, question=Question.objects.get(pk="q1"), value="foo"
+    )
+
+    validator = DocumentValidator()
+    states = validator.get_question_states(
+        document, validator.get_document_answers(document)
+    )
+    assert states["q2"] == {"is_hidden": False, "is_required": True}
+    assert states["q3"] == {"is_hidden": False, "is_required": False}
+
+    evaluate_spy = mocker.spy(QuestionJexl, "evaluate")
+    answer.value = "hide"
+    answer.save()
+
+    # only expressions of dependent questions are evaluated
+    assert evaluate_spy.call_count == 3
+    states = get_cached_states(document)
+    assert states["q2"] == {"is_hidden": True, "is_required": False}
+
+    answer_factory(
+        document=document, question=Question.objects.get(pk="q2"), value="bar"
+    )
+    assert evaluate_spy.call_count == 3
+
+
+def test_update_question_states_not_cached(
+    db, dependent_form, document_factory, answer_factory
+):
+    document = document_factory(form=dependent_form)
+    answer_factory(
+        document=document, question=Question.objects.get(pk="q1"), value="hide"
+    )
+
+    assert get_cached_states(document) is None
+
+
+def test_update_question_states_rollback(
+    transactional_db, dependent_form, document_factory, answer_factory
+):
+    document = document_factory(form=dependent_form)
+    answer = answer_factory(
+        document=document, question=Question.objects.get(pk="q1"), value="foo"
+    )
+    validator = DocumentValidator()
+    validator.get_question_states(document, validator.get_document_answers(document))
+
+    with pytest.raises(RuntimeError):
+        with transaction.atomic():
+            answer.value = "hide"
+            answer.save()
+            raise RuntimeError()
+
+    assert not get_cached_states(document)["q2"]["is_hidden"]
+
+
+def test_update_question_states_invalid_jexl(
+    transactional_db, dependent_form, document_factory, answer_factory, caplog
+):
+    question = Question.objects.get(pk="q2")
+    question.is_hidden = "'q1'|answer > 1"
+    question.save()
+
+    document = document_factory(form=dependent_form)
+    answer = answer_factory(
+        document=document, question=Question.objects.get(pk="q1"), value=0
+    )
+    validator = DocumentValidator()
+    validator.get_question_states(document, validator.get_document_answers(document))
+
+    # comparing str with int fails
+    answer.value = "bar"
+    answer.save()
+
+    assert get_cached_states(document) is None
+    assert f"Could not update question states of document {document.pk}" in (
+        caplog.text
+    )
+
+
+def test_update_question_states_error(
+    db, dependent_form, document_factory, answer_factory, mocker
+):
+    document = document_factory(form=dependent_form)
+    mocker.patch.object(
+        DocumentValidator, "update_question_states", side_effect=DatabaseError
+    )
+
+    # other errors than the ones of expressions are not swallowed
+    with pytest.raises(DatabaseError):
+        answer_factory(document=document, question=Question.objects.get(pk="q1"))
+
+
+def test_table_question_states(
+    transactional_db,
+    form,
+    form_question_factory,
+    document_factory,
+    answer_factory,
+    answer_document_factory,
+):
+    table = form_question_factory(
+        form=form, question__type=Question.TYPE_TABLE, question__is_required="false"
+    ).question
+    form_question_factory(
+        form=form,
+        question__slug="depending",
+        question__type=Question.TYPE_TEXT,
+        question__is_hidden=f"'hide' in '{table.slug}'|answer|mapby('column')",
+    )
+    form_question_factory(
+        form=table.row_form, question__slug="column", question__type="text"
+    )
+
+    document = document_factory(form=form)
+    table_answer = answer_factory(document=document, question=table, value=None)
+
+    def get_states():
+        validator = DocumentValidator()
+        return validator.get_question_states(
+            document, validator.get_document_answers(document)
+        )
+
+    assert not get_states()["depending"]["is_hidden"]
+
+    row = document_factory(form=table.row_form, family=document.family)
+    answer_document_factory(answer=table_answer, document=row)
+    column_answer = answer_factory(
+        document=row, question=Question.objects.get(pk="column"), value="hide"
+    )
+    assert get_states()["depending"]["is_hidden"]
+
+    # answers of rows change the revision of the whole family
+    column_answer.value = "show"
+    column_answer.save()
+    assert not get_states()["depending"]["is_hidden"]
+
+    column_answer.value = "hide"
+    column_answer.save()
+    assert get_states()["depending"]["is_hidden"]
+
+    column_answer.delete()
+    assert not get_states()["depending"]["is_hidden"]
@@ -264,7 +264,7 @@ def test_complex_document_query_performance(
         }
     """
 
-    with django_assert_num_queries(8):
+    with django_assert_num_queries(7):
         result = schema_executor(query, variables={"id": str(document.pk)})
     assert not result.errors
 
@@ -936,6 +936,104 @@ def test_validity_with_visibility(
         assert len(result.data["documentValidity"]["edges"]) == 1
 
 
+@pytest.mark.parametrize("question__is_required", ["true"])
+@pytest.mark.parametrize("question__type", [Question.TYPE_TEXT])
+def test_documents_validity_query(
+    db, form_question, document_factory, answer_factory, schema_executor
+):
+    documents = sorted(
+        document_factory.create_batch(4, form=form_question.form),
+        key=lambda document: document.pk,
+    )
+    for document in documents[::2]:
+        answer_factory(document=document, question=form_question.question)
+    other_document = document_factory()
+
+    query = """
+        query DocumentsValidity ($ids: [ID], $filter: [DocumentFilterSetType]) {
+          documentsValidity(ids: $ids, filter: $filter, first: 3) {
+            totalCount
+            edges {
+              node {
+                id
+                isValid
+                duration
+              }
+            }
+          }
+        }
+    """
+
+    result = schema_executor(
+        query,
+        variables={
+            "ids": [str(document.pk) for document in documents + [other_document]],
+            "filter": [{"form": form_question.form.pk}],
+        },
+    )
+
+    assert not result.errors
+    assert result.data["documentsValidity"]["totalCount"] == 4
+    nodes = [edge["node"] for edge in result.data["documentsValidity"]["edges"]]
+    assert [(node["id"], node["isValid"]) for node in nodes] == [
+        (str(documents[0].pk), True),
+        (str(documents[1].pk), False),
+        (str(documents[2].pk), True),
+    ]
+    assert all(node["duration"] >= 0 for node in nodes)
+
+
+def test_documents_visibility_query(
+    db,
+    form_factory,
+    question_factory,
+    document_factory,
+    answer_factory,
+    schema_executor,
+):
+    trigger = question_factory(slug="trigger", type=Question.TYPE_TEXT)
+    question = question_factory(
+        type=Question.TYPE_TEXT, is_hidden="'trigger'|answer == 'hide'"
+    )
+    forms = form_factory.create_batch(2)
+    documents = [document_factory(form=form) for form in forms for _ in range(2)]
+    answer_factory(document=documents[0], question=trigger, value="hide")
+    answer_factory(document=documents[2], question=trigger, value="show")
+    answer_factory(document=documents[3], question=trigger, value="hide")
+
+    query = """
+        query DocumentsVisibility ($ids: [ID]!, $question: ID!) {
+          documentsVisibility(ids: $ids, question: $question) {
+            edges {
+              node {
+                id
+                isHidden
+              }
+            }
+          }
+        }
+    """
+
+    result = schema_executor(
+        query,
+        variables={
+            "ids": [str(document.pk) for document in documents],
+            "question": question.slug,
+        },
+    )
+
+    assert not result.errors
+    assert {
+        edge["node"]["id"]: edge["node"]["isHidden"]
+        for edge in result.data["documentsVisibility"]["edges"]
+    } == {
+        str(documents[0].pk): True,
+        str(documents[1].pk): False,
+        str(documents[2].pk): False,
+        str(documents[3].pk): True,
+    }
+
+
 def test_remove_document_without_case(db, document, answer, schema_executor):
     query = """
         mutation RemoveDocument($input: RemoveDocumentInput!) {
@@ -198,3 +198,174 @@ def test_has_answer_intersect(
     expect_count = 1 if expect_find else 0
 
     assert len(result.data["allDocuments"]["edges"]) == expect_count
+
+
+@pytest.mark.parametrize(
+    "expression,expect_find",
+    [
+        ("'jexl-question'|answer == 'foo'", True),
+        ("'jexl-question'|answer != 'foo'", False),
+        ("true", True),
+        ("!true", False),
+        ("!(true || 'jexl-question'|answer == 'bar')", False),
+        ("!false", True),
+    ],
+)
+def test_jexl_filter(
+    schema_executor,
+    db,
+    question_factory,
+    document_factory,
+    answer_factory,
+    expression,
+    expect_find,
+):
+    question = question_factory(slug="jexl-question", type=models.Question.TYPE_TEXT)
+    answer_factory(document=document_factory(), question=question, value="foo")
+
+    query = """
+        query asdf ($jexl: String!) {
+          allDocuments(jexl: $jexl) {
+            edges {
+              node {
+                id
+              }
+            }
+          }
+        }
+    """
+
+    result = schema_executor(query, variables={"jexl": expression})
+    assert not result.errors
+    assert len(result.data["allDocuments"]["edges"]) == int(expect_find)
+
+
+@pytest.mark.parametrize(
+    "expression,error",
+    [
+        ("'jexl-question'|answer ==", "Invalid expression"),
+        ("'missing'|answer ? 1 : 0", "Invalid expression"),
+        # not translatable into a query
+        ("'jexl-question'|answer", "can't be used to filter documents"),
+        (
+            "'jexl-question'|answer == 'foo' ? false : true",
+            "can't be used to filter documents",
+        ),
+    ],
+)
+def test_jexl_filter_invalid(
+    schema_executor, db, question_factory, document, expression, error
+):
+    question_factory(slug="jexl-question", type=models.Question.TYPE_TEXT)
+    query = """
+        query asdf ($jexl: String!) {
+          allDocuments(jexl: $jexl) {
+            edges {
+              node {
+                id
+              }
+            }
+          }
+        }
+    """
+
+    result = schema_executor(query, variables={"jexl": expression})
+    assert error in str(result.errors[0])
+
+
+@pytest.mark.parametrize(
+    "filter_name,value,expect_find",
+    [
+        ("visibleQuestion", "foo", False),
+        ("visibleQuestion", "bar", True),
+        ("requiredQuestion", "foo", True),
+        ("requiredQuestion", "bar", False),
+    ],
+)
+def test_question_jexl_filter(
+    schema_executor,
+    db,
+    question_factory,
+    document_factory,
+    answer_factory,
+    filter_name,
+    value,
+    expect_find,
+):
+    trigger = question_factory(slug="trigger", type=models.Question.TYPE_TEXT)
+    question_factory(
+        slug="dependent",
+        is_hidden="'trigger'|answer == 'foo'",
+        is_required="'trigger'|answer == 'foo'",
+    )
+    answer_factory(document=document_factory(), question=trigger, value=value)
+
+    query = f"""
+        query asdf ($question: String!) {{
+          allDocuments({filter_name}: $question) {{
+            edges {{
+              node {{
+                id
+              }}
+            }}
+          }}
+        }}
+    """
+
+    result = schema_executor(query, variables={"question": "dependent"})
+    assert not result.errors
+    assert len(result.data["allDocuments"]["edges"]) == int(expect_find)
+
+
+@pytest.mark.parametrize(
+    "filter_name,expression,expect_find",
+    [
+        ("visibleQuestion", "true", False),
+        ("visibleQuestion", "false", True),
+        ("requiredQuestion", "true", True),
+        ("requiredQuestion", "false", False),
+    ],
+)
+def test_question_jexl_filter_literal(
+    schema_executor,
+    db,
+    question_factory,
+    document,
+    filter_name,
+    expression,
+    expect_find,
+):
+    question_factory(slug="literal", is_hidden=expression, is_required=expression)
+
+    query = f"""
+        query asdf ($question: String!) {{
+          allDocuments({filter_name}: $question) {{
+            edges {{
+              node {{
+                id
+              }}
+            }}
+          }}
+        }}
+    """
+
+    result = schema_executor(query, variables={"question": "literal"})
+    assert not result.errors
+    assert len(result.data["allDocuments"]["edges"]) == int(expect_find)
+
+
+def test_question_jexl_filter_missing_question(schema_executor, db, document):
+    query = """
+        query asdf {
+          allDocuments(visibleQuestion: "missing") {
+            edges {
+              node {
+                id
+              }
+            }
+          }
+        }
+    """
+
+    result = schema_executor(query)
+    assert result.errors
@@ -5,6 +5,7 @@ from graphql_relay import to_global_id
 from ...core.tests import extract_serializer_input_fields
 from .. import models
 from ..serializers import SaveFormSerializer
+from ..structure import get_form_structure
 
 
 @pytest.mark.parametrize(
@@ -234,6 +235,7 @@ def test_reorder_form_questions(db, form, form_question_factory, schema_executor
     question_ids = (
         form.questions.order_by("slug").reverse().values_list("slug", flat=True)
     )
+    get_form_structure(form)
     result = schema_executor(
         query,
         variables={
@@ -256,6 +258,9 @@ def test_reorder_form_questions(db, form, form_question_factory, schema_executor
     ]
 
     assert result_questions == list(question_ids)
+    assert [
+        node.slug for node in get_form_structure(form).tree.questions
+    ] == result_questions
 
 
 def test_reorder_form_questions_invalid_question(
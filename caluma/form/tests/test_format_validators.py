@@ -1,10 +1,14 @@
 import pytest
 from django.utils import translation
+from rest_framework.exceptions import ValidationError
 
 from ...core.tests import extract_serializer_input_fields
+from ...core.utils import translate_value
+from .. import format_validators
 from ..format_validators import BaseFormatValidator, base_format_validators
 from ..models import Question
 from ..serializers import SaveAnswerSerializer
+from ..validators import DocumentValidator
 
 
 class MyFormatValidator(BaseFormatValidator):
@@ -99,3 +103,143 @@ def test_base_format_validators(
             str(result.errors[0].original_error.detail["non_field_errors"][0])
             in error_msgs
         )
+
+
+def test_load_format_validators(settings, mocker):
+    settings.FORMAT_VALIDATOR_CLASSES = [
+        "caluma.form.tests.test_format_validators.MyFormatValidator"
+    ]
+    format_validators._load_format_validators.cache_clear()
+    import_spy = mocker.spy(format_validators, "import_string")
+
+    validators = format_validators.load_format_validators()
+    assert format_validators.load_format_validators() is validators
+    assert import_spy.call_count == 1
+    assert [validator.slug for validator in validators] == [
+        "test-validator",
+        "email",
+        "phone-number",
+    ]
+    assert validators[0].pattern.pattern == MyFormatValidator.regex
+
+    settings.FORMAT_VALIDATOR_CLASSES = []
+    assert list(format_validators.get_format_validator_instances()) == [
+        "email",
+        "phone-number",
+    ]
+
+
+@pytest.mark.parametrize(
+    "values,valid",
+    [
+        (["test@example.com", "other@example.com"], True),
+        (["test@example.com", "some text"], False),
+        ([], True),
+    ],
+)
+def test_validate_many(values, valid):
+    validator = format_validators.get_format_validator_instances()["email"]
+
+    if valid:
+        validator.validate_many([(value, None) for value in values])
+    else:
+        with pytest.raises(ValidationError):
+            validator.validate_many([(value, None) for value in values])
+
+
+@pytest.mark.parametrize("value,valid", [("test@example.com", True), ("foo", False)])
+def test_validate_table_column(
+    db,
+    form,
+    form_question_factory,
+    document_factory,
+    answer_factory,
+    answer_document_factory,
+    info,
+    mocker,
+    value,
+    valid,
+):
+    table_question = form_question_factory(
+        form=form, question__type=Question.TYPE_TABLE, question__is_required="false"
+    ).question
+    row_question = form_question_factory(
+        form=table_question.row_form,
+        question__type=Question.TYPE_TEXT,
+        question__format_validators=["email"],
+        question__is_required="false",
+    ).question
+    document = document_factory(form=form)
+    table_answer = answer_factory(document=document, question=table_question)
+    rows = []
+    for row_value in ["row@example.com", value]:
+        row = document_factory(form=table_question.row_form)
+        answer_factory(document=row, question=row_question, value=row_value)
+        answer_document_factory(answer=table_answer, document=row)
+        rows.append(row)
+
+    validate_many_spy = mocker.spy(BaseFormatValidator, "validate_many")
+
+    if valid:
+        DocumentValidator().validate(document, info)
+    else:
+        with pytest.raises(ValidationError):
+            DocumentValidator().validate(document, info)
+
+    # all rows are validated in one call
+    assert validate_many_spy.call_count == 1
+    assert sorted(validate_many_spy.call_args[0][1]) == sorted(
+        zip(["row@example.com", value], rows)
+    )
+
+
+class CustomValidateFormatValidator(BaseFormatValidator):
+    slug = "custom-validate"
+    name = {"en": "custom validate"}
+    regex = r".*"
+    error_msg = {"en": "Not valid"}
+
+    def validate(self, value, document):
+        if value != str(document.pk):
+            raise ValidationError(translate_value(self.error_msg))
+
+
+@pytest.mark.parametrize("valid", [True, False])
+def test_validate_many_custom_validate(
+    db,
+    form,
+    form_question_factory,
+    document_factory,
+    answer_factory,
+    answer_document_factory,
+    info,
+    settings,
+    valid,
+):
+    settings.FORMAT_VALIDATOR_CLASSES = [
+        "caluma.form.tests.test_format_validators.CustomValidateFormatValidator"
+    ]
+    table_question = form_question_factory(
+        form=form, question__type=Question.TYPE_TABLE, question__is_required="false"
+    ).question
+    row_question = form_question_factory(
+        form=table_question.row_form,
+        question__type=Question.TYPE_TEXT,
+        question__format_validators=["custom-validate"],
+        question__is_required="false",
+    ).question
+    document = document_factory(form=form)
+    table_answer = answer_factory(document=document, question=table_question)
+    row = document_factory(form=table_question.row_form)
+    answer_factory(
+        document=row,
+        question=row_question,
+        value=str(row.pk) if valid else str(document.pk),
+    )
+    answer_document_factory(answer=table_answer, document=row)
+
+    if valid:
+        DocumentValidator().validate(document, info)
+    else:
+        with pytest.raises(ValidationError):
+            DocumentValidator().validate(document, info)
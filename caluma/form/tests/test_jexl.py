@@ -1,6 +1,8 @@
 import pytest
 
-from ..jexl import QuestionJexl
+from ..jexl import QuestionJexl, QuestionMissing
+from ..models import Document, Question
+from ..validators import evaluate_documents
 
 
 @pytest.mark.parametrize(
@@ -48,3 +50,131 @@ def test_jexl_form():
         QuestionJexl(answer_by_question, "f-main-slug").evaluate("form")
         == "f-main-slug"
     )
+
+
+def test_question_jexl_use_answers():
+    jexl = QuestionJexl({"q1": "outer"}, "outer-form")
+
+    with jexl.use_answers({"q1": "inner"}, "inner-form"):
+        assert jexl.evaluate("'q1'|answer") == "inner"
+        assert jexl.evaluate("form") == "inner-form"
+
+    assert jexl.evaluate("'q1'|answer") == "outer"
+    assert jexl.evaluate("form") == "outer-form"
+
+
+@pytest.mark.parametrize(
+    "expression,result",
+    [
+        ("'q1'|answer > 1 && 'q2'|answer == 'yes'", [False, True, False]),
+        ("'q2'|answer in ['yes'] ? 'q1'|answer : form", [1, 2, "form-slug"]),
+        ("'q1'|answer intersects [1, 3]", "error"),
+        ("[{value: 'q1'|answer}][.value > 1]|mapby('value')", [[], [2], [3]]),
+    ],
+)
+def test_question_jexl_evaluate_many(expression, result):
+    answer_columns = {"q1": [1, 2, 3], "q2": ["yes", "yes", "no"]}
+    jexl = QuestionJexl()
+
+    if result == "error":
+        with pytest.raises(TypeError):
+            jexl.evaluate_many(expression, answer_columns, 3, "form-slug")
+        return
+
+    assert jexl.evaluate_many(expression, answer_columns, 3, "form-slug") == result
+    assert [
+        QuestionJexl(
+            {slug: column[row] for slug, column in answer_columns.items()}, "form-slug"
+        ).evaluate(expression)
+        for row in range(3)
+    ] == result
+
+
+def test_question_jexl_evaluate_many_missing_question():
+    with pytest.raises(QuestionMissing):
+        QuestionJexl().evaluate_many("'q1'|answer", {}, 1)
+
+
+@pytest.fixture
+def query_documents(db, form, form_question_factory, document_factory, answer_factory):
+    questions = {
+        question_type: form_question_factory(
+            form=form, question__slug=question_type, question__type=question_type
+        ).question
+        for question_type in (
+            Question.TYPE_TEXT,
+            Question.TYPE_INTEGER,
+            Question.TYPE_MULTIPLE_CHOICE,
+            Question.TYPE_DATE,
+        )
+    }
+
+    values = [
+        {"text": "yes", "integer": 5, "multiple_choice": ["a", "b"]},
+        {"text": "no", "integer": 1, "multiple_choice": ["c"]},
+        {"text": "yes", "integer": 3},
+        {"integer": 0},
+    ]
+    documents = []
+    for document_values in values:
+        document = document_factory(form=form)
+        for slug, value in document_values.items():
+            answer_factory(document=document, question=questions[slug], value=value)
+        documents.append(document)
+    return documents
+
+
+@pytest.mark.parametrize(
+    "expression",
+    [
+        "'text'|answer == 'yes'",
+        "'yes' == 'text'|answer",
+        "'text'|answer != 'yes'",
+        "'integer'|answer > 3",
+        "'integer'|answer <= 1",
+        "3 < 'integer'|answer",
+        "'text'|answer == 'yes' && 'integer'|answer >= 5",
+        "'text'|answer == 'no' || !('integer'|answer > 3)",
+        "'a' in 'multiple_choice'|answer",
+        "'text'|answer in ['no', 'maybe']",
+        "'multiple_choice'|answer intersects ['c', 'd']",
+        "true",
+        "false",
+    ],
+)
+def test_question_jexl_build_query(query_documents, expression):
+    documents = Document.objects.filter(
+        pk__in=[document.pk for document in query_documents]
+    )
+    expected = {
+        document.pk
+        for document, result in evaluate_documents(documents, expression)
+        if result
+    }
+
+    query = QuestionJexl().build_query(expression)
+    assert set(documents.filter(query).values_list("pk", flat=True)) == expected
+
+
+@pytest.mark.parametrize(
+    "expression",
+    [
+        "'text'|answer",
+        "'text'|answer == 'yes' ? true : false",
+        "'text'|answer == 'integer'|answer",
+        "'text'|answer > 'a'",
+        "'integer'|answer == true",
+        "'integer'|answer + 1 == 2",
+        "'integer'|answer in 'multiple_choice'|answer",
+        "'a' in 'text'|answer",
+        "'text'|answer intersects ['a']",
+        "'date'|answer == '2019-01-01'",
+        "'text'|answer == null",
+        "1 == 1",
+        "'text'|answer + 'x'",
+        "'x' + 'text'|answer",
+    ],
+)
+def test_question_jexl_build_query_unsupported(query_documents, expression):
+    with pytest.raises(ValueError):
+        QuestionJexl().build_query(expression)
@@ -6,6 +6,14 @@ from django.db.migrations.executor import MigrationExecutor
 from django.db.utils import DataError
 
 
+@pytest.fixture(autouse=True)
+def migrate_to_latest(transactional_db):
+    yield
+    # leave the schema as the other tests expect it
+    executor = MigrationExecutor(connection)
+    executor.migrate(executor.loader.graph.leaf_nodes())
+
+
 def test_migrate_to_flat_answers(transactional_db):
     executor = MigrationExecutor(connection)
     app = "form"
@@ -0,0 +1,149 @@
+import pytest
+from django.db import transaction
+
+from ..models import Question
+from ..structure import get_form_structure, get_structure_version, load_form_tree
+
+
+@pytest.fixture
+def nested_form(form_factory, form_question_factory):
+    top_form = form_factory(slug="top")
+    sub_form = form_factory(slug="sub")
+    sub_sub_form = form_factory(slug="sub-sub")
+
+    form_question_factory(
+        form=top_form, question__slug="top-text", question__type="text", sort=3
+    )
+    form_question_factory(
+        form=top_form,
+        question__slug="top-sub",
+        question__type=Question.TYPE_FORM,
+        question__sub_form=sub_form,
+        sort=2,
+    )
+    form_question_factory(
+        form=sub_form,
+        question__slug="sub-sub",
+        question__type=Question.TYPE_FORM,
+        question__sub_form=sub_sub_form,
+    )
+    form_question_factory(
+        form=sub_sub_form, question__slug="sub-sub-text", question__type="text"
+    )
+    # same sub form used twice
+    form_question_factory(
+        form=top_form,
+        question__slug="top-sub-again",
+        question__type=Question.TYPE_FORM,
+        question__sub_form=sub_form,
+        sort=1,
+    )
+    return top_form
+
+
+def test_load_form_tree(db, nested_form, django_assert_num_queries):
+    with django_assert_num_queries(1):
+        tree = load_form_tree(nested_form)
+        questions = [question.slug for question in tree.all_questions()]
+
+    assert tree.slug == "top"
+    assert [node.slug for node in tree.questions] == [
+        "top-text",
+        "top-sub",
+        "top-sub-again",
+    ]
+    assert tree.questions[1].type == Question.TYPE_FORM
+    assert tree.questions[1].sub_form is tree.questions[2].sub_form
+    assert questions == [
+        "top-text",
+        "top-sub",
+        "sub-sub",
+        "sub-sub-text",
+        "top-sub-again",
+    ]
+    assert tree.get("sub-sub-text").slug == "sub-sub-text"
+    assert tree.get("missing") is None
+    assert repr(tree) == "FormTree(top)"
+    assert repr(tree.questions[0]) == "QuestionNode(top-text)"
+    assert set(nested_form.all_questions().values_list("slug", flat=True)) == set(
+        questions
+    )
+
+
+def test_load_form_tree_immutable(db, nested_form):
+    tree = load_form_tree(nested_form.slug)
+
+    with pytest.raises(AttributeError):
+        tree.slug = "foo"
+    with pytest.raises(AttributeError):
+        del tree.questions[0].sub_form
+
+
+def test_load_form_tree_recursive(db, form, form_question_factory):
+    form_question_factory(
+        form=form, question__type=Question.TYPE_FORM, question__sub_form=form
+    )
+
+    tree = load_form_tree(form)
+    assert tree.questions[0].sub_form is None
+    assert len(list(tree.all_questions())) == 1
+
+
+def test_get_form_structure(
+    db, form, form_question_factory, question_option_factory, django_assert_num_queries
+):
+    question = form_question_factory(
+        form=form,
+        question__type=Question.TYPE_TEXT,
+        question__format_validators=["email"],
+        sort=2,
+    ).question
+    choice_question = form_question_factory(
+        form=form, question__type=Question.TYPE_CHOICE, sort=1
+    ).question
+    question_option_factory(question=choice_question, option__slug="first", sort=2)
+    question_option_factory(question=choice_question, option__slug="second", sort=1)
+
+    structure = get_form_structure(form)
+    assert [node.slug for node in structure.tree.questions] == [
+        question.slug,
+        choice_question.slug,
+    ]
+    assert structure.options[choice_question.slug] == ("first", "second")
+    assert structure.options[question.slug] == ()
+    assert [
+        validator.slug for validator in structure.format_validators[question.slug]
+    ] == ["email"]
+    assert repr(structure) == f"FormStructure({form.slug}, {structure.version})"
+
+    with django_assert_num_queries(0):
+        assert get_form_structure(form.slug) is structure
+
+    with pytest.raises(TypeError):
+        structure.options["foo"] = ()
+
+
+def test_get_form_structure_changed(db, form, form_question_factory, option):
+    form_question = form_question_factory(form=form)
+    structure = get_form_structure(form)
+
+    form_question.question.label = "changed"
+    form_question.question.save()
+
+    changed = get_form_structure(form)
+    assert changed is not structure
+    assert changed.version != structure.version
+    assert changed.tree.questions[0].question.label == "changed"
+
+
+def test_structure_version_on_commit(transactional_db, question):
+    version = get_structure_version()
+
+    with transaction.atomic():
+        question.label = "changed"
+        question.save()
+        changed = get_structure_version()
+        assert changed != version
+
+    # structures built by others before the commit are left behind
+    assert get_structure_version() not in (version, changed)
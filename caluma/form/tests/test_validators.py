@@ -2,10 +2,15 @@ import pytest
 from rest_framework.exceptions import ValidationError
 
 from ...core.tests import extract_serializer_input_fields
-from ...form.models import Question
+from ...form.models import Answer, FormQuestion, Question, QuestionOption
 from .. import serializers
-from ..jexl import QuestionMissing
-from ..validators import DocumentValidator, QuestionValidator
+from ..jexl import QuestionJexl, QuestionMissing
+from ..validators import (
+    DocumentValidator,
+    DocumentValidityResults,
+    QuestionValidator,
+    get_documents_validity,
+)
 
 
 @pytest.mark.parametrize(
@@ -34,6 +39,163 @@ def test_validate_hidden_required_field(
         DocumentValidator().validate(document, info)
 
 
+def test_validate_required_single_jexl_instance(
+    db, form, form_question_factory, document_factory, info, mocker
+):
+    form_question_factory.create_batch(
+        50,
+        form=form,
+        question__type=Question.TYPE_TEXT,
+        question__is_required="false",
+        question__is_hidden="false",
+    )
+    document = document_factory(form=form)
+    init_spy = mocker.spy(QuestionJexl, "__init__")
+
+    DocumentValidator().validate(document, info)
+
+    # one instance for the whole document instead of two per question, plus
+    # one each to build the structure and the dependency graph of the form
+    assert init_spy.call_count == 3
+
+
+def test_validate_query_budget(
+    db, form, document_factory, option_factory, info, django_assert_num_queries
+):
+    option = option_factory(slug="option")
+    questions = Question.objects.bulk_create(
+        Question(
+            slug=f"question-{i}",
+            type=Question.TYPE_CHOICE if i % 2 else Question.TYPE_TEXT,
+            format_validators=[] if i % 2 else ["email"],
+        )
+        for i in range(1000)
+    )
+    FormQuestion.objects.bulk_create(
+        FormQuestion(
+            id=f"{form.pk}.{question.pk}", form=form, question=question, sort=i
+        )
+        for i, question in enumerate(questions)
+    )
+    QuestionOption.objects.bulk_create(
+        QuestionOption(
+            id=f"{question.pk}.{option.pk}", question=question, option=option
+        )
+        for question in questions
+        if question.type == Question.TYPE_CHOICE
+    )
+    document = document_factory(form=form)
+    Answer.objects.bulk_create(
+        Answer(
+            document=document,
+            question=question,
+            value="option"
+            if question.type == Question.TYPE_CHOICE
+            else "foo@example.com",
+        )
+        for question in questions
+    )
+
+    # warm form structure and question states, which are shared between
+    # validations
+    DocumentValidator().validate(document, info)
+
+    # revision of the document family, answers of the document and the table
+    # rows of these answers
+    with django_assert_num_queries(3):
+        DocumentValidator().validate(document, info)
+
+
+@pytest.mark.parametrize("num_rows", [1, 50])
+def test_validate_table_query_budget(
+    db,
+    num_rows,
+    form,
+    form_question_factory,
+    document_factory,
+    answer_factory,
+    answer_document_factory,
+    info,
+    django_assert_num_queries,
+):
+    table_question = form_question_factory(
+        form=form, question__type=Question.TYPE_TABLE, question__is_required="false"
+    ).question
+    row_question = form_question_factory(
+        form=table_question.row_form,
+        question__type=Question.TYPE_TEXT,
+        question__is_required="true",
+    ).question
+
+    document = document_factory(form=form)
+    table_answer = answer_factory(document=document, question=table_question)
+    for _ in range(num_rows):
+        row = document_factory(form=table_question.row_form, family=document.family)
+        answer_factory(document=row, question=row_question, value="foo")
+        answer_document_factory(answer=table_answer, document=row)
+
+    DocumentValidator().validate(document, info)
+
+    # revision of the document family, answers and table rows of the document,
+    # then of all rows at once
+    with django_assert_num_queries(5):
+        DocumentValidator().validate(document, info)
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_get_documents_validity(
+    transactional_db,
+    workers,
+    form,
+    form_question_factory,
+    document_factory,
+    answer_factory,
+    info,
+    mocker,
+):
+    question = form_question_factory(
+        form=form, question__type=Question.TYPE_TEXT, question__is_required="true"
+    ).question
+    documents = document_factory.create_batch(5, form=form)
+    for document in documents[::2]:
+        answer_factory(document=document, question=question)
+    connection = mocker.patch("caluma.form.validators.connection")
+
+    results = get_documents_validity(documents, info, workers=workers, chunk_size=2)
+
+    assert [(result["id"], result["is_valid"]) for result in results] == [
+        (document.pk, index % 2 == 0) for index, document in enumerate(documents)
+    ]
+    # only connections of threads of the pool are closed, one per chunk
+    assert connection.close.call_count == (0 if workers == 1 else 3)
+
+
+def test_document_validity_results(
+    transactional_db,
+    form,
+    form_question_factory,
+    document_factory,
+    info,
+    mocker,
+    settings,
+):
+    settings.DOCUMENT_VALIDITY_CACHE_TIMEOUT = 3600
+    form_question_factory(
+        form=form, question__type=Question.TYPE_TEXT, question__is_required="true"
+    )
+    document_factory.create_batch(3, form=form)
+    validate_spy = mocker.spy(DocumentValidator, "validate")
+
+    results = DocumentValidityResults(form.documents.order_by("pk"), info)
+
+    assert len(results) == 3
+    assert validate_spy.call_count == 0
+    assert not results[1]["is_valid"]
+    assert [result["is_valid"] for result in results[:2]] == [False, False]
+    # the second document is cached already
+    assert validate_spy.call_count == 2
+
+
 @pytest.mark.parametrize(
     "question__type,question__is_required",
     [(Question.TYPE_FILE, "false"), (Question.TYPE_DATE, "false")],
@@ -0,0 +1,149 @@
+import pytest
+from django.db import DatabaseError, transaction
+
+from .. import validity_cache
+from ..models import Document, Question
+from ..validators import DocumentValidator, get_document_validity
+
+
+@pytest.fixture(autouse=True)
+def reset_stats(settings):
+    settings.DOCUMENT_VALIDITY_CACHE_TIMEOUT = 3600
+    validity_cache.reset_validity_cache_stats()
+
+
+@pytest.fixture
+def required_question(form_question_factory, form):
+    return form_question_factory(
+        form=form, question__type=Question.TYPE_TEXT, question__is_required="true"
+    ).question
+
+
+def test_validity_cache(
+    transactional_db,
+    form,
+    required_question,
+    document_factory,
+    answer_factory,
+    info,
+    mocker,
+):
+    document = document_factory(form=form)
+    validate_spy = mocker.spy(DocumentValidator, "validate")
+
+    assert not get_document_validity(document, info)["is_valid"]
+    assert not get_document_validity(document, info)["is_valid"]
+    assert validate_spy.call_count == 1
+
+    answer = answer_factory(document=document, question=required_question)
+    assert get_document_validity(document, info)["is_valid"]
+    assert validate_spy.call_count == 2
+
+    answer.delete()
+    assert not get_document_validity(document, info)["is_valid"]
+    assert validate_spy.call_count == 3
+
+    required_question.is_required = "false"
+    required_question.save()
+    assert get_document_validity(document, info)["is_valid"]
+    assert validate_spy.call_count == 4
+
+    # results of transactions which are rolled back are never cached
+    with pytest.raises(DatabaseError), transaction.atomic():
+        answer_factory(document=document, question=required_question)
+        get_document_validity(document, info)
+        raise DatabaseError()
+    answer = answer_factory(document=document, question=required_question)
+    get_document_validity(document, info)
+    assert validate_spy.call_count == 6
+
+    assert validity_cache.get_validity_cache_stats() == {
+        "hits": 1,
+        "misses": 6,
+        "uncacheable": 0,
+        "hit_rate": 1 / 7,
+    }
+
+
+def test_validity_cache_table_rows(
+    db,
+    form,
+    form_question_factory,
+    document_factory,
+    answer_factory,
+    answer_document_factory,
+    info,
+):
+    table_question = form_question_factory(
+        form=form, question__type=Question.TYPE_TABLE, question__is_required="false"
+    ).question
+    row_question = form_question_factory(
+        form=table_question.row_form,
+        question__type=Question.TYPE_TEXT,
+        question__is_required="true",
+    ).question
+
+    document = document_factory(form=form)
+    table_answer = answer_factory(document=document, question=table_question)
+    row = document_factory(form=table_question.row_form, family=document.family)
+    answer_document_factory(answer=table_answer, document=row)
+
+    assert not get_document_validity(document, info)["is_valid"]
+
+    answer_factory(document=row, question=row_question, value="foo")
+    assert get_document_validity(document, info)["is_valid"]
+    assert validity_cache.get_validity_cache_stats()["hits"] == 0
+
+
+def test_validity_cache_dynamic_questions(
+    db, form, form_question_factory, document_factory, answer_factory, info, mocker
+):
+    question = form_question_factory(
+        form=form,
+        question__type=Question.TYPE_DYNAMIC_CHOICE,
+        question__data_source="MyDataSource",
+    ).question
+    document = document_factory(form=form)
+    answer_factory(document=document, question=question, value="5.5")
+    mocker.patch("caluma.form.validators.AnswerValidator.validate")
+
+    get_document_validity(document, info)
+    get_document_validity(document, info)
+
+    assert validity_cache.get_validity_cache_stats() == {
+        "hits": 0,
+        "misses": 0,
+        "uncacheable": 2,
+        "hit_rate": 0.0,
+    }
+
+
+def test_validity_cache_disabled(
+    db, form, required_question, document, info, mocker, settings
+):
+    settings.DOCUMENT_VALIDITY_CACHE_TIMEOUT = 0
+    validate_spy = mocker.spy(DocumentValidator, "validate")
+
+    get_document_validity(document, info)
+    get_document_validity(document, info)
+
+    assert validate_spy.call_count == 2
+    assert validity_cache.get_validity_cache_stats()["misses"] == 0
+
+
+def test_get_document_revisions(db, document_factory, answer_factory):
+    documents = document_factory.create_batch(2)
+    answers = answer_factory.create_batch(2, document=documents[0])
+
+    def get_revisions():
+        revisions = validity_cache.get_document_revisions(documents)
+        return [revisions[document.pk][1] for document in documents]
+
+    revisions = get_revisions()
+    assert revisions == [3, 1]
+
+    # changes are counted even when other answers were modified later
+    answers[0].value = "changed"
+    answers[0].save()
+    Document.objects.filter(pk=documents[1].pk).delete()
+    assert get_revisions() == [4, 2]
@@ -1,17 +1,29 @@
 import sys
+from collections import defaultdict, deque
+from collections.abc import Sequence
+from concurrent.futures import ThreadPoolExecutor
+from itertools import groupby
 from logging import getLogger
+from time import perf_counter
 
+from django.conf import settings
+from django.db import connection
+from django.utils.functional import cached_property
 from django_filters.constants import EMPTY_VALUES
 from rest_framework import exceptions
 
+from caluma.core.pagination import iterate_chunks
 from caluma.data_source.data_source_handlers import (
-    get_data_source_data,
+    data_source_has_slug,
     get_data_sources,
+    load_data_source_data,
+    supports_exists,
 )
 
-from . import jexl
-from .format_validators import get_format_validators
-from .models import Answer, Question
+from . import dependencies, jexl, validity_cache
+from .format_validators import get_format_validator_instances, get_format_validators
+from .models import Answer, FamilyRevision, Question
+from .structure import get_form_structure, get_structure_version
 
 log = getLogger()
 
@@ -29,6 +41,11 @@ class CustomValidationError(exceptions.ValidationError):
 
 
 class AnswerValidator:
+    def __init__(self, document_validator=None):
+        # rows of table answers are validated with the validator of the
+        # document, so they share what it has loaded already
+        self.document_validator = document_validator
+
     def _validate_question_text(self, question, value, **kwargs):
         max_length = (
             question.max_length if question.max_length is not None else sys.maxsize
@@ -78,8 +95,13 @@ class AnswerValidator:
     def _validate_question_date(self, question, value, **kwargs):
         pass
 
-    def _validate_question_choice(self, question, value, **kwargs):
-        options = question.options.values_list("slug", flat=True)
+    def _get_options(self, question, options=None):
+        if options is None:
+            options = question.options.values_list("slug", flat=True)
+        return options
+
+    def _validate_question_choice(self, question, value, options=None, **kwargs):
+        options = self._get_options(question, options)
         if not isinstance(value, str) or value not in options:
             raise CustomValidationError(
                 f"Invalid value {value}. "
@@ -87,8 +109,10 @@ class AnswerValidator:
                 slugs=[question.slug],
             )
 
-    def _validate_question_multiple_choice(self, question, value, **kwargs):
-        options = question.options.values_list("slug", flat=True)
+    def _validate_question_multiple_choice(
+        self, question, value, options=None, **kwargs
+    ):
+        options = self._get_options(question, options)
         invalid_options = set(value) - set(options)
         if not isinstance(value, list) or invalid_options:
             raise CustomValidationError(
@@ -97,6 +121,15 @@ class AnswerValidator:
                 slugs=[question.slug],
             )
 
+    @staticmethod
+    def _describe_data_source_options(info, name, options_format):
+        """Describe the valid options of given data source for error messages."""
+        if supports_exists(get_data_sources(dic=True)[name]):
+            # don't fetch all data of data sources checking slugs upstream
+            return f"an entry of data source {name}"
+        options = ", ".join(d.slug for d in load_data_source_data(info, name).data)
+        return options_format.format(options=options)
+
     def _validate_question_dynamic_choice(self, question, value, info, **kwargs):
         data_source = get_data_sources(dic=True)[question.data_source]
         if not data_source.validate:
@@ -107,13 +140,14 @@ class AnswerValidator:
                 )
             return
 
-        data = get_data_source_data(info, question.data_source)
-        options = [d.slug for d in data]
-
-        if not isinstance(value, str) or value not in options:
+        if not isinstance(value, str) or not data_source_has_slug(
+            info, question.data_source, value
+        ):
+            options = self._describe_data_source_options(
+                info, question.data_source, 'one of the options "{options}"'
+            )
             raise CustomValidationError(
-                f'Invalid value "{value}". '
-                f"Must be of type str and one of the options \"{', '.join(options)}\"",
+                f'Invalid value "{value}". Must be of type str and {options}',
                 slugs=[question.slug],
             )
 
@@ -134,28 +168,55 @@ class AnswerValidator:
                         slugs=[question.slug],
                     )
             return
-        data = get_data_source_data(info, question.data_source)
-        options = [d.slug for d in data]
         if not isinstance(value, list):
             raise CustomValidationError(
                 f'Invalid value: "{value}". Must be of type list', slugs=[question.slug]
             )
-        invalid_options = set(value) - set(options)
+        invalid_options = {
+            v for v in value if not data_source_has_slug(info, question.data_source, v)
+        }
         if invalid_options:
+            options = self._describe_data_source_options(
+                info, question.data_source, 'one of the options "[{options}]"'
+            )
             raise CustomValidationError(
-                f'Invalid options "{invalid_options}". '
-                f"Should be one of the options \"[{', '.join(options)}]\"",
+                f'Invalid options "{invalid_options}". Should be {options}',
                 slugs=[question.slug],
             )
 
-    def _validate_question_table(self, question, value, document, info, **kwargs):
+    def _validate_question_table(
+        self, question, value, document, info, format_values=None, **kwargs
+    ):
+        validator = self.document_validator or DocumentValidator()
+        validator.preload(value)
         for _document in value:
-            DocumentValidator().validate(_document, info=info)
+            validator.validate(_document, info=info, format_values=format_values)
 
     def _validate_question_file(self, question, value, **kwargs):
         pass
 
-    def validate(self, *, question, document, info, **kwargs):
+    def validate(
+        self,
+        *,
+        question,
+        document,
+        info,
+        options=None,
+        format_validators=None,
+        format_values=None,
+        **kwargs,
+    ):
+        """Validate the value of an answer.
+
+        `options` (option slugs) and `format_validators` (instances) of the
+        question may be passed when they are already known, e.g. from the form
+        structure, otherwise they are looked up.
+
+        When `format_values` (a dict of lists) is passed, the value and its
+        document are added to the list of each format validator instead of
+        being validated, so the caller can validate all values of a validator
+        at once.
+        """
         # Check all possible fields for value
         value = None
         for i in ["value", "file", "date", "documents"]:
@@ -167,36 +228,155 @@ class AnswerValidator:
         # required check will be done in DocumentValidator
         if value:
             validate_func = getattr(self, f"_validate_question_{question.type}")
-            validate_func(question, value, document=document, info=info)
+            validate_func(
+                question,
+                value,
+                document=document,
+                info=info,
+                options=options,
+                format_values=format_values,
+            )
 
-        format_validators = get_format_validators(dic=True)
-        for validator_slug in question.format_validators:
-            format_validators[validator_slug]().validate(value, document)
+        if format_validators is None:
+            validators = get_format_validator_instances()
+            format_validators = [
+                validators[validator_slug]
+                for validator_slug in question.format_validators
+            ]
+        for format_validator in format_validators:
+            if format_values is None:
+                format_validator.validate(value, document)
+            else:
+                format_values[format_validator].append((value, document))
 
 
 class DocumentValidator:
-    def validate(self, document, info, **kwargs):
-        answers = self.get_document_answers(document)
+    def __init__(self):
+        self.question_jexl = jexl.QuestionJexl()
+        self.form_structures = {}
+        self.document_answers = {}
+        self.question_states = {}
+        self.family_revisions = {}
+
+    @cached_property
+    def structure_version(self):
+        """Get the form structure version, looked up once per validator."""
+        return get_structure_version()
+
+    def get_form_structure(self, form_slug):
+        """Get the structure of given form, looked up once per validator."""
+        if form_slug not in self.form_structures:
+            self.form_structures[form_slug] = get_form_structure(
+                form_slug, self.structure_version
+            )
+        return self.form_structures[form_slug]
+
+    def validate(self, document, info, format_values=None, **kwargs):
+        """Validate given document including its table rows.
+
+        Values are validated per format validator at once after all answers
+        of the document and its rows are validated (see `validate_many`).
+        """
+        validate_formats = format_values is None
+        if validate_formats:
+            format_values = defaultdict(list)
+
+        doc_answers = self._load_answers(document)
+        answers = self.get_document_answers(document, doc_answers)
         self.validate_required(document, answers)
 
-        # TODO: can we iterate over the entries in answer_tree here
-        # so the loop doesn't hit the DB?
-        for answer in document.answers.all():
-            validator = AnswerValidator()
+        structure = self.get_form_structure(document.form_id)
+        validator = AnswerValidator(self)
+        for answer in doc_answers:
+            # questions which aren't part of the form (anymore) are looked up
             validator.validate(
                 document=document,
                 question=answer.question,
                 value=answer.value,
                 documents=answer.documents.all(),
                 info=info,
-                answers=answers[answer.question.slug],
+                answers=answers[answer.question_id],
+                options=structure.options.get(answer.question_id),
+                format_validators=structure.format_validators.get(answer.question_id),
+                format_values=format_values,
             )
 
-    def get_document_answers(self, document):
-        doc_answers = document.answers.select_related("question").prefetch_related(
-            "question__options"
+        if validate_formats:
+            for format_validator, values in format_values.items():
+                format_validator.validate_many(values)
+
+    def preload(self, documents):
+        """Load the answers of given documents and their table rows.
+
+        Answers are loaded with one query per level of nested tables for all
+        documents at once and kept for the lifetime of the validator. Cached
+        question states are fetched at once as well.
+        """
+        documents = [
+            document
+            for document in documents
+            if document.pk not in self.document_answers
+        ]
+        if not documents:
+            return
+
+        # revisions are loaded before the answers, so question states are
+        # never cached with a revision newer than the answers they stem from
+        self._load_family_revisions(documents)
+
+        answers = {document.pk: [] for document in documents}
+        for answer in (
+            Answer.objects.filter(document__in=answers.keys())
+            .select_related("question", "file")
+            .prefetch_related("documents")
+        ):
+            answers[answer.document_id].append(answer)
+        self.document_answers.update(answers)
+
+        self.question_states.update(
+            dependencies.get_many_cached_question_states(
+                {
+                    document.pk: self.get_question_states_revision(document)
+                    for document in documents
+                },
+                self.structure_version,
+            )
         )
 
+        self.preload(
+            [
+                row
+                for document_answers in answers.values()
+                for answer in document_answers
+                for row in answer.documents.all()
+            ]
+        )
+
+    def _load_family_revisions(self, documents):
+        families = {document.family for document in documents}.difference(
+            self.family_revisions
+        )
+        if families:
+            self.family_revisions.update(FamilyRevision.objects.get_revisions(families))
+
+    def get_question_states_revision(self, document):
+        """Get the revision of the question states of given document.
+
+        The revision of a document family is looked up once per validator.
+        """
+        self._load_family_revisions([document])
+        return dependencies.get_question_states_revision(
+            document, self.family_revisions[document.family]
+        )
+
+    def _load_answers(self, document):
+        self.preload([document])
+        return self.document_answers[document.pk]
+
+    def get_document_answers(self, document, doc_answers=None):
+        if doc_answers is None:
+            doc_answers = self._load_answers(document)
+
         answers = {
             ans.question_id: self._get_answer_value(ans, document)
             for ans in doc_answers
@@ -204,14 +384,14 @@ class DocumentValidator:
 
         # Create answer values for questions in the form that don't have
         # answers (yet)
-        questions = document.form.all_questions().values("slug", "type")
+        questions = self.get_form_structure(document.form_id).tree.all_questions()
         unanswered = {
-            q["slug"]: self._get_answer_value(
-                Answer(question_id=q["slug"], document=document), document
+            question.slug: self._get_answer_value(
+                Answer(question=question, document=document), document
             )
-            for q in questions
-            if q["slug"] not in answers
-            and q["type"] not in [Question.TYPE_FORM, Question.TYPE_STATIC]
+            for question in questions
+            if question.slug not in answers
+            and question.type not in [Question.TYPE_FORM, Question.TYPE_STATIC]
         }
 
         answers.update(unanswered)
@@ -257,39 +437,107 @@ class DocumentValidator:
         else:  # pragma: no cover
             raise Exception(f"unhandled question type mapping {answer.question.type}")
 
-    def validate_required(self, document, answers):
-        required_but_empty = []
-        for question in document.form.all_questions().values(
-            "slug", "is_required", "is_hidden"
-        ):
-            # TODO: can we iterate over questions of answers via answers?
-            try:
-                expr = "is_hidden"
-                is_hidden = jexl.QuestionJexl(answers, document.form.slug).evaluate(
-                    question["is_hidden"]
-                )
+    def get_question_states(self, document, answers):
+        """Get the evaluated `is_hidden` and `is_required` of all questions.
+
+        The states are cached per document. When an answer changes, only the
+        questions depending on it are evaluated again (see
+        `update_question_states`).
+        """
+        version = self.structure_version
+        states = self.question_states.get(document.pk)
+        if states is None:
+            revision = self.get_question_states_revision(document)
+            states = dependencies.get_cached_question_states(
+                document.pk, revision, version
+            )
+        if states is None:
+            questions = dependencies.get_form_dependencies(document.form_id, version)[
+                "questions"
+            ]
+            states = self._evaluate_question_states(document, answers, questions)
+            dependencies.set_cached_question_states(
+                document.pk, states, revision, version
+            )
 
-                if not is_hidden:
-                    expr = "is_required"
-                    is_required = jexl.QuestionJexl(
-                        answers, document.form.slug
-                    ).evaluate(question["is_required"])
-
-                    if is_required and answers.get(question["slug"]) in EMPTY_VALUES:
-                        required_but_empty.append(question["slug"])
-
-            except jexl.QuestionMissing:
-                raise
-            except Exception as exc:
-                expr_jexl = question.get(expr)
-                log.error(
-                    f"Error while evaluating {expr} expression on question {question['slug']}: "
-                    f"{expr_jexl}: {str(exc)}"
-                )
-                raise RuntimeError(
-                    f"Error while evaluating '{expr}' expression on question {question['slug']}: "
-                    f"{expr_jexl}. The system log contains more information"
-                )
+        self.question_states[document.pk] = states
+        return states
+
+    def update_question_states(self, document, question_slug, previous_revision):
+        """Evaluate questions depending on the answer of given question again.
+
+        Only states cached at the `previous_revision` of the document, before
+        the answer changed, are updated.
+        """
+        version = self.structure_version
+        states = dependencies.get_cached_question_states(
+            document.pk, previous_revision, version
+        )
+        if states is None:
+            # not evaluated yet or stale, will be done when needed
+            return
+
+        form_dependencies = dependencies.get_form_dependencies(
+            document.form_id, version
+        )
+        dependents = form_dependencies["dependents"].get(question_slug)
+        if not dependents:
+            return
+
+        questions = [
+            question
+            for question in form_dependencies["questions"]
+            if question["slug"] in dependents
+        ]
+        answers = self.get_document_answers(document)
+        states.update(self._evaluate_question_states(document, answers, questions))
+        dependencies.set_cached_question_states(
+            document.pk, states, self.get_question_states_revision(document), version
+        )
+
+    def _evaluate_question_states(self, document, answers, questions):
+        states = {}
+        with self.question_jexl.use_answers(answers, document.form_id):
+            for question in questions:
+                try:
+                    expr = "is_hidden"
+                    is_hidden = self.question_jexl.evaluate(question["is_hidden"])
+
+                    # required expression is only evaluated when not hidden
+                    is_required = False
+                    if not is_hidden:
+                        expr = "is_required"
+                        is_required = self.question_jexl.evaluate(
+                            question["is_required"]
+                        )
+
+                    states[question["slug"]] = {
+                        "is_hidden": bool(is_hidden),
+                        "is_required": bool(is_required),
+                    }
+
+                except jexl.QuestionMissing:
+                    raise
+                except Exception as exc:
+                    expr_jexl = question.get(expr)
+                    log.error(
+                        f"Error while evaluating {expr} expression on question {question['slug']}: "
+                        f"{expr_jexl}: {str(exc)}"
+                    )
+                    raise RuntimeError(
+                        f"Error while evaluating '{expr}' expression on question {question['slug']}: "
+                        f"{expr_jexl}. The system log contains more information"
+                    )
+
+        return states
+
+    def validate_required(self, document, answers):
+        states = self.get_question_states(document, answers)
+        required_but_empty = [
+            slug
+            for slug, state in states.items()
+            if state["is_required"] and answers.get(slug) in EMPTY_VALUES
+        ]
 
         if required_but_empty:
             raise CustomValidationError(
@@ -323,11 +571,11 @@ class QuestionValidator:
             self._validate_data_source(data["dataSource"])
 
 
-def get_document_validity(document, info):
-    validator = DocumentValidator()
+def _validate_document(document, info, validator):
     is_valid = True
     errors = []
 
+    start = perf_counter()
     try:
         validator.validate(document, info)
     except CustomValidationError as exc:
@@ -335,4 +583,149 @@ def get_document_validity(document, info):
         detail = str(exc.detail[0])
         errors = [{"slug": slug, "error_msg": detail} for slug in exc.slugs]
 
-    return {"id": document.id, "is_valid": is_valid, "errors": errors}
+    return {
+        "id": document.id,
+        "is_valid": is_valid,
+        "errors": errors,
+        "duration": perf_counter() - start,
+    }
+
+
+def _get_validities(documents, info, validator):
+    """Validate given documents, skipping those with a cached result.
+
+    Cached results report the duration of their original validation.
+    """
+    if not validity_cache.is_enabled():
+        validator.preload(documents)
+        return [_validate_document(document, info, validator) for document in documents]
+
+    revisions = validity_cache.get_document_revisions(documents)
+    results = validity_cache.get_cached_validities(
+        revisions, validator.structure_version
+    )
+
+    # one validator for all documents, so answers are loaded at once
+    missing = [document for document in documents if document.pk not in results]
+    validator.preload(missing)
+    validated = [_validate_document(document, info, validator) for document in missing]
+    validity_cache.set_cached_validities(
+        revisions, validated, validator.structure_version
+    )
+
+    results.update((result["id"], result) for result in validated)
+    return [results[document.pk] for document in documents]
+
+
+def get_document_validity(document, info, validator=None):
+    return _get_validities([document], info, validator or DocumentValidator())[0]
+
+
+def _get_chunk_validity(documents, info):
+    return _get_validities(documents, info, DocumentValidator())
+
+
+def _get_pooled_chunk_validity(documents, info):
+    try:
+        return _get_chunk_validity(documents, info)
+    finally:
+        # threads of the pool open their own connection
+        connection.close()
+
+
+def get_documents_validity(documents, info, workers=None, chunk_size=None):
+    """Validate many documents.
+
+    Documents are validated in chunks of `chunk_size`, which are spread over
+    a pool of `workers` threads. Results are yielded in the order of the
+    documents as soon as their chunk is validated. Querysets are streamed,
+    so only the chunks being validated are held in memory.
+    """
+    workers = workers or settings.DOCUMENT_VALIDITY_WORKERS
+    chunk_size = chunk_size or settings.DOCUMENT_VALIDITY_CHUNK_SIZE
+
+    chunks = iterate_chunks(documents, chunk_size)
+
+    if workers == 1:
+        for chunk in chunks:
+            yield from _get_chunk_validity(chunk, info)
+        return
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        for chunk in chunks:
+            pending.append(executor.submit(_get_pooled_chunk_validity, chunk, info))
+            # only read ahead as many chunks as can be validated at once
+            if len(pending) > workers:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+
+
+class DocumentValidityResults(Sequence):
+    """Lazy validity results of documents.
+
+    Only documents which are accessed are validated, so a paginated
+    connection validates only the documents of the requested page.
+    """
+
+    def __init__(self, documents, info):
+        self.documents = documents
+        self.info = info
+
+    def __len__(self):
+        return self.documents.count()
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return list(get_documents_validity(self.documents[index], self.info))
+        return self[index : index + 1][0]
+
+
+def evaluate_documents(documents, expression):
+    """Evaluate a JEXL expression against the answers of many documents at once.
+
+    Answers of all documents are loaded per referenced question and the
+    expression is evaluated once per form. Yields tuples of document and
+    result.
+    """
+    question_jexl = jexl.QuestionJexl()
+    referenced_questions = Question.objects.filter(
+        pk__in=set(question_jexl.extract_referenced_questions(expression))
+    )
+    answers = {
+        (answer.document_id, answer.question_id): answer
+        for answer in Answer.objects.filter(
+            document__in=documents, question__in=referenced_questions
+        ).select_related("question")
+    }
+
+    validator = DocumentValidator()
+    documents = sorted(documents, key=lambda document: document.form_id)
+    for form_id, form_documents in groupby(documents, lambda doc: doc.form_id):
+        form_documents = list(form_documents)
+        answer_columns = {
+            referenced_question.slug: [
+                validator._get_answer_value(
+                    answers.get(
+                        (document.pk, referenced_question.slug),
+                        Answer(question=referenced_question, document=document),
+                    ),
+                    document,
+                )
+                for document in form_documents
+            ]
+            for referenced_question in referenced_questions
+        }
+        results = question_jexl.evaluate_many(
+            expression, answer_columns, len(form_documents), form_id
+        )
+        yield from zip(form_documents, results)
+
+
+def get_documents_visibility(documents, question):
+    """Evaluate whether given question is hidden for many documents at once."""
+    return [
+        {"id": document.pk, "is_hidden": bool(is_hidden)}
+        for document, is_hidden in evaluate_documents(documents, question.is_hidden)
+    ]
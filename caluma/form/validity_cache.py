@@ -0,0 +1,125 @@
+"""Cache the validity of documents until they change.
+
+Results of `get_document_validity` are kept in django's cache together with
+the revision of the document family (the document and its table rows), which
+is incremented whenever a document of the family or one of its answers is
+saved or deleted (see `FamilyRevision`). As cache keys contain the form
+structure version, changes of the form configuration invalidate all results
+as well. Results are only written once the transaction is committed, so
+revisions which are rolled back never leave results behind.
+
+Documents with answers to dynamic questions are never cached, as their
+validity depends on data sources which may differ per user and over time.
+"""
+
+import threading
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import Answer, FamilyRevision, Question
+from .structure import get_structure_version
+
+DYNAMIC_QUESTION_TYPES = (
+    Question.TYPE_DYNAMIC_CHOICE,
+    Question.TYPE_DYNAMIC_MULTIPLE_CHOICE,
+)
+
+_stats = Counter()
+_stats_lock = threading.Lock()
+
+
+def _count(stat, amount=1):
+    with _stats_lock:
+        _stats[stat] += amount
+
+
+def get_validity_cache_stats():
+    """Get hits and misses of the validity cache in this process.
+
+    `uncacheable` counts validations of documents which can't be cached.
+    """
+    with _stats_lock:
+        stats = {stat: _stats[stat] for stat in ("hits", "misses", "uncacheable")}
+
+    lookups = stats["hits"] + stats["misses"]
+    stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+    return stats
+
+
+def reset_validity_cache_stats():
+    with _stats_lock:
+        _stats.clear()
+
+
+def is_enabled():
+    return settings.DOCUMENT_VALIDITY_CACHE_TIMEOUT > 0
+
+
+def get_document_revisions(documents):
+    """Get the revisions of given documents with two queries.
+
+    Returns a dict mapping the document id to its revision, which is `None`
+    for documents that must not be cached.
+    """
+    families = FamilyRevision.objects.get_revisions(
+        {document.family for document in documents}
+    )
+    dynamic = set(
+        Answer.objects.filter(
+            document__family__in=families.keys(),
+            question__type__in=DYNAMIC_QUESTION_TYPES,
+        )
+        .values_list("document__family", flat=True)
+        .distinct()
+    )
+
+    return {
+        document.pk: None
+        if document.family in dynamic
+        else (document.form_id, families[document.family])
+        for document in documents
+    }
+
+
+def _key(document_id, version):
+    return f"document_validity_{document_id}_{version}"
+
+
+def get_cached_validities(revisions, version=None):
+    """Get cached results of documents which are still at given revisions."""
+    version = version or get_structure_version()
+    keys = {
+        _key(document_id, version): (document_id, revision)
+        for document_id, revision in revisions.items()
+        if revision is not None
+    }
+    _count("uncacheable", len(revisions) - len(keys))
+
+    results = {}
+    for key, entry in cache.get_many(keys).items():
+        document_id, revision = keys[key]
+        if entry["revision"] == revision:
+            results[document_id] = entry["result"]
+
+    _count("hits", len(results))
+    _count("misses", len(keys) - len(results))
+    return results
+
+
+def set_cached_validities(revisions, results, version=None):
+    """Cache results of documents once the transaction is committed."""
+    version = version or get_structure_version()
+    entries = {
+        _key(result["id"], version): {
+            "revision": revisions[result["id"]],
+            "result": result,
+        }
+        for result in results
+        if revisions[result["id"]] is not None
+    }
+    transaction.on_commit(
+        lambda: cache.set_many(entries, settings.DOCUMENT_VALIDITY_CACHE_TIMEOUT)
+    )
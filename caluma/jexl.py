@@ -0,0 +1,25 @@
+from itertools import chain
+
+from .form.jexl import QuestionJexl
+from .form.models import Question
+from .workflow.jexl import FlowJexl, GroupJexl
+from .workflow.models import Flow, Task
+
+
+def warm_up_jexl_cache():
+    """Parse all expressions stored in the database into the JEXL cache.
+
+    Meant to be called once at worker start, so that the first requests after
+    a deploy don't have to pay the parsing costs.
+    """
+    QuestionJexl().warm_up(
+        set(chain(*Question.objects.values_list("is_hidden", "is_required")))
+    )
+    FlowJexl().warm_up(set(Flow.objects.values_list("next", flat=True)))
+    GroupJexl().warm_up(
+        set(
+            Task.objects.filter(address_groups__isnull=False).values_list(
+                "address_groups", flat=True
+            )
+        )
+    )
@@ -163,6 +163,15 @@ GRAPHENE = {"SCHEMA": "caluma.schema.schema", "MIDDLEWARE": []}
 if DEBUG:
     GRAPHENE["MIDDLEWARE"].append("graphene_django.debug.DjangoDebugMiddleware")
 
+# Paginate connections by the values of their ordering instead of offsets
+KEYSET_PAGINATION = env.bool("KEYSET_PAGINATION", default=False)
+
+# Page size of connections queried without `first` or `last`, 0 for all nodes
+PAGINATION_DEFAULT_PAGE_SIZE = env.int("PAGINATION_DEFAULT_PAGE_SIZE", default=0)
+
+# Maximum number of nodes a connection returns, 0 for no limit
+PAGINATION_MAX_PAGE_SIZE = env.int("PAGINATION_MAX_PAGE_SIZE", default=0)
+
 # OpenID connect
 
 OIDC_USERINFO_ENDPOINT = env.str("OIDC_USERINFO_ENDPOINT", default=None)
@@ -189,6 +198,8 @@ PERMISSION_CLASSES = env.list(
 VALIDATION_CLASSES = env.list("VALIDATION_CLASSES", default=[])
 
 DATA_SOURCE_CLASSES = env.list("DATA_SOURCE_CLASSES", default=[])
+# Number of threads to fetch the data sources of a list of questions concurrently
+DATA_SOURCE_WORKERS = env.int("DATA_SOURCE_WORKERS", default=4)
 
 FORMAT_VALIDATOR_CLASSES = env.list("FORMAT_VALIDATOR_CLASSES", default=[])
 
@@ -202,6 +213,20 @@ SIMPLE_HISTORY_HISTORY_ID_USE_UUID = True
 # Historical API
 ENABLE_HISTORICAL_API = env.bool("ENABLE_HISTORICAL_API", default=False)
 
+# JEXL
+
+# Parse all stored JEXL expressions when the application is loaded
+JEXL_CACHE_WARMUP = env.bool("JEXL_CACHE_WARMUP", default=False)
+
+# Document validation
+
+# Number of threads and documents per thread to validate many documents
+DOCUMENT_VALIDITY_WORKERS = env.int("DOCUMENT_VALIDITY_WORKERS", default=1)
+DOCUMENT_VALIDITY_CHUNK_SIZE = env.int("DOCUMENT_VALIDITY_CHUNK_SIZE", default=100)
+
+# Seconds to keep the validity of unchanged documents, 0 to disable
+DOCUMENT_VALIDITY_CACHE_TIMEOUT = env.int("DOCUMENT_VALIDITY_CACHE_TIMEOUT", default=0)
+
 # Logging
 
 LOGGING = {
@@ -51,6 +51,7 @@ type AnswerConnection {
   pageInfo: PageInfo!
   edges: [AnswerEdge]!
   totalCount: Int
+  totalCountEstimate: Int
 }
 
 type AnswerEdge {
@@ -121,6 +122,7 @@ type CaseConnection {
   pageInfo: PageInfo!
   edges: [CaseEdge]!
   totalCount: Int
+  totalCountEstimate: Int
 }
 
 type CaseEdge {
@@ -297,6 +299,7 @@ type DataSourceConnection {
   pageInfo: PageInfo!
   edges: [DataSourceEdge]!
   totalCount: Int
+  totalCountEstimate: Int
 }
 
 type DataSourceData {
@@ -308,6 +311,7 @@ type DataSourceDataConnection {
   pageInfo: PageInfo!
   edges: [DataSourceDataEdge]!
   totalCount: Int
+  totalCountEstimate: Int
 }
 
 type DataSourceDataEdge {
@@ -391,6 +395,7 @@ type DocumentConnection {
   pageInfo: PageInfo!
   edges: [DocumentEdge]!
   totalCount: Int
+  totalCountEstimate: Int
 }
 
 type DocumentEdge {
@@ -411,6 +416,9 @@ input DocumentFilterSetType {
   rootDocument: ID
   hasAnswer: [HasAnswerFilterType]
   searchAnswers: [SearchAnswersFilterType]
+  jexl: String
+  visibleQuestion: String
+  requiredQuestion: String
   invert: Boolean
 }
 
@@ -433,6 +441,7 @@ type DocumentValidityConnection {
   pageInfo: PageInfo!
   edges: [DocumentValidityEdge]!
   totalCount: Int
+  totalCountEstimate: Int
 }
 
 type DocumentValidityEdge {
@@ -440,6 +449,23 @@ type DocumentValidityEdge {
   cursor: String!
 }
 
+type DocumentVisibility {
+  id: ID
+  isHidden: Boolean
+}
+
+type DocumentVisibilityConnection {
+  pageInfo: PageInfo!
+  edges: [DocumentVisibilityEdge]!
+  totalCount: Int
+  totalCountEstimate: Int
+}
+
+type DocumentVisibilityEdge {
+  node: DocumentVisibility
+  cursor: String!
+}
+
 type DynamicChoiceQuestion implements Question, Node {
   createdAt: DateTime!
   modifiedAt: DateTime!
@@ -454,7 +480,7 @@ type DynamicChoiceQuestion implements Question, Node {
   meta: GenericScalar!
   source: Question
   forms(before: String, after: String, first: Int, last: Int, metaValue: [JSONValueFilterType], orderBy: [FormOrdering], slug: String, name: String, description: String, isPublished: Boolean, isArchived: Boolean, createdByUser: String, createdByGroup: String, metaHasKey: String, search: String, slugs: [String]): FormConnection
-  options(before: String, after: String, first: Int, last: Int): DataSourceDataConnection
+  options(search: String, slugs: [String], before: String, after: String, first: Int, last: Int): DataSourceDataConnection
   dataSource: String!
   id: ID!
 }
@@ -473,7 +499,7 @@ type DynamicMultipleChoiceQuestion implements Question, Node {
   meta: GenericScalar!
   source: Question
   forms(before: String, after: String, first: Int, last: Int, metaValue: [JSONValueFilterType], orderBy: [FormOrdering], slug: String, name: String, description: String, isPublished: Boolean, isArchived: Boolean, createdByUser: String, createdByGroup: String, metaHasKey: String, search: String, slugs: [String]): FormConnection
-  options(before: String, after: String, first: Int, last: Int): DataSourceDataConnection
+  options(search: String, slugs: [String], before: String, after: String, first: Int, last: Int): DataSourceDataConnection
   dataSource: String!
   id: ID!
 }
@@ -565,6 +591,7 @@ type FlowConnection {
   pageInfo: PageInfo!
   edges: [FlowEdge]!
   totalCount: Int
+  totalCountEstimate: Int
 }
 
 type FlowEdge {
@@ -602,6 +629,7 @@ type FormConnection {
   pageInfo: PageInfo!
   edges: [FormEdge]!
   totalCount: Int
+  totalCountEstimate: Int
 }
 
 type FormEdge {
@@ -671,6 +699,7 @@ type FormatValidatorConnection {
   pageInfo: PageInfo!
   edges: [FormatValidatorEdge]!
   totalCount: Int
+  totalCountEstimate: Int
 }
 
 type FormatValidatorEdge {
@@ -706,6 +735,7 @@ type HistoricalAnswerConnection {
   pageInfo: PageInfo!
   edges: [HistoricalAnswerEdge]!
   totalCount: Int
+  totalCountEstimate: Int
 }
 
 type HistoricalAnswerEdge {
@@ -1001,6 +1031,7 @@ type OptionConnection {
   pageInfo: PageInfo!
   edges: [OptionEdge]!
   totalCount: Int
+  totalCountEstimate: Int
 }
 
 type OptionEdge {
@@ -1035,16 +1066,18 @@ type PageInfo {
 type Query {
   documentAsOf(id: ID!, asOf: DateTime!): HistoricalDocument
   allDataSources(before: String, after: String, first: Int, last: Int): DataSourceConnection
-  dataSource(name: String, before: String, after: String, first: Int, last: Int): DataSourceDataConnection
+  dataSource(name: String, search: String, slugs: [String], before: String, after: String, first: Int, last: Int): DataSourceDataConnection
   allWorkflows(before: String, after: String, first: Int, last: Int, metaValue: [JSONValueFilterType], slug: String, name: String, description: String, isPublished: Boolean, isArchived: Boolean, orderBy: [WorkflowOrdering], filter: [WorkflowFilterSetType], createdByUser: String, createdByGroup: String, metaHasKey: String, search: String): WorkflowConnection
   allTasks(before: String, after: String, first: Int, last: Int, metaValue: [JSONValueFilterType], slug: String, name: String, description: String, type: TaskTypeArgument, isArchived: Boolean, orderBy: [TaskOrdering], filter: [TaskFilterSetType], createdByUser: String, createdByGroup: String, metaHasKey: String, search: String): TaskConnection
   allCases(before: String, after: String, first: Int, last: Int, metaValue: [JSONValueFilterType], workflow: ID, orderBy: [CaseOrdering], filter: [CaseFilterSetType], createdByUser: String, createdByGroup: String, metaHasKey: String, documentForm: String, hasAnswer: [HasAnswerFilterType], searchAnswers: [SearchAnswersFilterType], status: [CaseStatusArgument], orderByQuestionAnswerValue: String): CaseConnection
   allWorkItems(before: String, after: String, first: Int, last: Int, metaValue: [JSONValueFilterType], status: WorkItemStatusArgument, orderBy: [WorkItemOrdering], filter: [WorkItemFilterSetType], documentHasAnswer: [HasAnswerFilterType], caseDocumentHasAnswer: [HasAnswerFilterType], caseMetaValue: [JSONValueFilterType], task: ID, case: ID, createdByUser: String, createdByGroup: String, metaHasKey: String, addressedGroups: [String]): WorkItemConnection
   allForms(before: String, after: String, first: Int, last: Int, metaValue: [JSONValueFilterType], orderBy: [FormOrdering], slug: String, name: String, description: String, isPublished: Boolean, isArchived: Boolean, filter: [FormFilterSetType], createdByUser: String, createdByGroup: String, metaHasKey: String, search: String, slugs: [String]): FormConnection
   allQuestions(before: String, after: String, first: Int, last: Int, metaValue: [JSONValueFilterType], orderBy: [QuestionOrdering], slug: String, label: String, isRequired: String, isHidden: String, isArchived: Boolean, filter: [QuestionFilterSetType], createdByUser: String, createdByGroup: String, metaHasKey: String, excludeForms: [ID], search: String, slugs: [String]): QuestionConnection
-  allDocuments(before: String, after: String, first: Int, last: Int, metaValue: [JSONValueFilterType], form: ID, forms: [ID], search: String, id: ID, orderBy: [DocumentOrdering], filter: [DocumentFilterSetType], createdByUser: String, createdByGroup: String, metaHasKey: String, rootDocument: ID, hasAnswer: [HasAnswerFilterType], searchAnswers: [SearchAnswersFilterType]): DocumentConnection
+  allDocuments(before: String, after: String, first: Int, last: Int, metaValue: [JSONValueFilterType], form: ID, forms: [ID], search: String, id: ID, orderBy: [DocumentOrdering], filter: [DocumentFilterSetType], createdByUser: String, createdByGroup: String, metaHasKey: String, rootDocument: ID, hasAnswer: [HasAnswerFilterType], searchAnswers: [SearchAnswersFilterType], jexl: String, visibleQuestion: String, requiredQuestion: String): DocumentConnection
   allFormatValidators(before: String, after: String, first: Int, last: Int): FormatValidatorConnection
   documentValidity(id: ID!, before: String, after: String, first: Int, last: Int): DocumentValidityConnection
+  documentsValidity(ids: [ID], filter: [DocumentFilterSetType], before: String, after: String, first: Int, last: Int): DocumentValidityConnection
+  documentsVisibility(ids: [ID]!, question: ID!, before: String, after: String, first: Int, last: Int): DocumentVisibilityConnection
   node(id: ID!): Node
   _debug: DjangoDebug
 }
@@ -1070,6 +1103,7 @@ type QuestionConnection {
   pageInfo: PageInfo!
   edges: [QuestionEdge]!
   totalCount: Int
+  totalCountEstimate: Int
 }
 
 type QuestionEdge {
@@ -1747,6 +1781,7 @@ type TaskConnection {
   pageInfo: PageInfo!
   edges: [TaskEdge]!
   totalCount: Int
+  totalCountEstimate: Int
 }
 
 type TaskEdge {
@@ -1859,6 +1894,7 @@ type ValidationResult {
   id: ID
   isValid: Boolean
   errors: [ValidationEntry]
+  duration: Float
 }
 
 type WorkItem implements Node {
@@ -1885,6 +1921,7 @@ type WorkItemConnection {
   pageInfo: PageInfo!
   edges: [WorkItemEdge]!
   totalCount: Int
+  totalCountEstimate: Int
 }
 
 type WorkItemEdge {
@@ -1962,6 +1999,7 @@ type WorkflowConnection {
   pageInfo: PageInfo!
   edges: [WorkflowEdge]!
   totalCount: Int
+  totalCountEstimate: Int
 }
 
 type WorkflowEdge {
@@ -0,0 +1,23 @@
+from ..core.jexl import JEXL, Cache
+from ..jexl import warm_up_jexl_cache
+
+
+def test_warm_up_jexl_cache(db, mocker, question, flow, task):
+    mocker.patch.object(JEXL, "expr_cache", Cache())
+    mocker.patch.object(JEXL, "compiled_cache", Cache())
+
+    question.is_hidden = "'other-question'|answer == 'foo'"
+    question.save()
+    task.address_groups = "['group1', 'group2']|groups"
+    task.save()
+    flow.next = "'task-slug'|task"
+    flow.save()
+
+    warm_up_jexl_cache()
+
+    assert set(JEXL.expr_cache._cache) == {
+        question.is_hidden,
+        question.is_required,
+        flow.next,
+        task.address_groups,
+    }
@@ -26,6 +26,8 @@ class TaskValidatingAnalyzer(ValidatingAnalyzer):
 
 
 class GroupJexl(JEXL):
+    pure_transforms = frozenset(["groups"])
+
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
         self.add_transform("groups", lambda spec: spec)
@@ -35,6 +37,8 @@ class GroupJexl(JEXL):
 
 
 class FlowJexl(JEXL):
+    pure_transforms = frozenset(["task", "tasks"])
+
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
         self.add_transform("task", lambda spec: spec)
@@ -0,0 +1,68 @@
+# Generated by Django 2.2.6 on 2026-10-17 11:44
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+import caluma.workflow.models
+
+
+def refresh_visibilities(apps, schema_editor):
+    WorkItem = apps.get_model("workflow", "WorkItem")
+    WorkItemVisibility = apps.get_model("workflow", "WorkItemVisibility")
+    WorkItemVisibility.objects.refresh(WorkItem.objects.all())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [("workflow", "0014_add_gin_index_to_jsonfields")]
+
+    operations = [
+        migrations.CreateModel(
+            name="WorkItemVisibility",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("group", models.CharField(max_length=150)),
+                ("family", models.UUIDField(blank=True, null=True)),
+                (
+                    "case",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="workflow.Case",
+                    ),
+                ),
+                (
+                    "work_item",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="visibilities",
+                        to="workflow.WorkItem",
+                    ),
+                ),
+            ],
+            managers=[("objects", caluma.workflow.models.WorkItemVisibilityManager())],
+        ),
+        migrations.AddIndex(
+            model_name="workitemvisibility",
+            index=models.Index(
+                fields=["group", "case"], name="workflow_wo_group_10f94c_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="workitemvisibility",
+            index=models.Index(
+                fields=["group", "family"], name="workflow_wo_group_64bf29_idx"
+            ),
+        ),
+        migrations.RunPython(refresh_visibilities, migrations.RunPython.noop),
+    ]
@@ -7,6 +7,7 @@ from django.utils import timezone
 from localized_fields.fields import LocalizedField
 
 from ..core.models import ChoicesCharField, SlugModel, UUIDModel
+from ..core.pagination import iterate_chunks
 
 
 class Task(SlugModel):
@@ -202,3 +203,59 @@ class WorkItem(UUIDModel):
             GinIndex(fields=["assigned_users"]),
             GinIndex(fields=["meta"]),
         ]
+
+
+class WorkItemVisibilityManager(models.Manager):
+    use_in_migrations = True
+
+    def _get_visibilities(self, work_item):
+        cases = [case for case in (work_item.case, work_item.child_case) if case]
+        documents = [work_item.document] + [case.document for case in cases]
+        families = {document.family for document in documents if document}
+
+        for group in set(work_item.addressed_groups):
+            for case in cases:
+                yield self.model(work_item=work_item, group=group, case=case)
+            for family in families:
+                yield self.model(work_item=work_item, group=group, family=family)
+
+    def refresh(self, work_items, chunk_size=1000):
+        """Recompute what given work items make visible to their groups."""
+        self.filter(work_item__in=work_items).delete()
+
+        work_items = work_items.select_related(
+            "document", "case__document", "child_case__document"
+        )
+        for chunk in iterate_chunks(work_items, chunk_size):
+            self.bulk_create(
+                visibility
+                for work_item in chunk
+                for visibility in self._get_visibilities(work_item)
+            )
+
+
+class WorkItemVisibility(models.Model):
+    """
+    Case or document family visible to a group through an addressed work item.
+
+    This materializes what `AddressedGroups` makes visible, so it can be
+    looked up by group. It's kept up to date when work items and cases are
+    saved.
+    """
+
+    work_item = models.ForeignKey(
+        WorkItem, on_delete=models.CASCADE, related_name="visibilities"
+    )
+    group = models.CharField(max_length=150)
+    case = models.ForeignKey(
+        Case, on_delete=models.CASCADE, related_name="+", null=True, blank=True
+    )
+    family = models.UUIDField(null=True, blank=True)
+
+    objects = WorkItemVisibilityManager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["group", "case"]),
+            models.Index(fields=["group", "family"]),
+        ]
@@ -230,7 +230,11 @@ class CaseSerializer(serializers.ModelSerializer):
             ]
         )
 
-        bulk_create_with_history(work_items, models.WorkItem)
+        work_items = bulk_create_with_history(work_items, models.WorkItem)
+        # bulk creation doesn't send `post_save` signals
+        models.WorkItemVisibility.objects.refresh(
+            models.WorkItem.objects.filter(pk__in=[item.pk for item in work_items])
+        )
         return instance
 
     class Meta:
@@ -353,7 +357,11 @@ class CompleteWorkItemSerializer(serializers.ModelSerializer):
                 ]
             )
 
-            bulk_create_with_history(work_items, models.WorkItem)
+            work_items = bulk_create_with_history(work_items, models.WorkItem)
+            # bulk creation doesn't send `post_save` signals
+            models.WorkItemVisibility.objects.refresh(
+                models.WorkItem.objects.filter(pk__in=[item.pk for item in work_items])
+            )
         else:
             # no more tasks, mark case as complete
             case.status = models.Case.STATUS_COMPLETED
@@ -0,0 +1,20 @@
+from django.db.models import Q
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from . import models
+
+
+@receiver(post_save, sender=models.WorkItem)
+def refresh_work_item_visibilities(sender, instance, **kwargs):
+    models.WorkItemVisibility.objects.refresh(
+        models.WorkItem.objects.filter(pk=instance.pk)
+    )
+
+
+@receiver(post_save, sender=models.Case)
+def refresh_case_visibilities(sender, instance, **kwargs):
+    # the document of the case is visible through its work items
+    models.WorkItemVisibility.objects.refresh(
+        models.WorkItem.objects.filter(Q(case=instance) | Q(child_case=instance))
+    )
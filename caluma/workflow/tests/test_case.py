@@ -1,8 +1,10 @@
 import pytest
 
 from ...core.relay import extract_global_id
+from ...core.visibilities import BaseVisibility, filter_queryset_for
 from ...form.models import Question
 from .. import models
+from ..schema import WorkItem
 
 
 @pytest.mark.parametrize(
@@ -438,3 +440,161 @@ def test_document_form(
     document = result.data["allCases"]["edges"][0]["node"]["document"]
 
     assert extract_global_id(document["form"]["id"]) == form_a.slug
+
+
+@pytest.mark.parametrize("case_count", [1, 4])
+def test_query_all_cases_nested_connections(
+    db,
+    case_count,
+    case_factory,
+    work_item_factory,
+    form_question_factory,
+    question_option_factory,
+    answer_factory,
+    answer_document_factory,
+    schema_executor,
+    django_assert_num_queries,
+):
+    for _ in range(case_count):
+        case = case_factory()
+        for _ in range(2):
+            work_item = work_item_factory(
+                case=case,
+                child_case=None,
+                task__type=models.Task.TYPE_COMPLETE_TASK_FORM,
+            )
+            question = form_question_factory(
+                form=work_item.task.form, question__type=Question.TYPE_CHOICE
+            ).question
+            question_option_factory.create_batch(2, question=question)
+        answer_factory(document=case.document, question__type=Question.TYPE_TEXT)
+        table_answer = answer_factory(
+            document=case.document, question__type=Question.TYPE_TABLE
+        )
+        answer_document_factory.create_batch(2, answer=table_answer)
+
+    query = """
+        query AllCases {
+          allCases {
+            edges {
+              node {
+                workItems {
+                  edges {
+                    node {
+                      task {
+                        ... on CompleteTaskFormTask {
+                          form {
+                            questions {
+                              edges {
+                                node {
+                                  ...Options
+                                }
+                              }
+                            }
+                          }
+                        }
+                      }
+                    }
+                  }
+                }
+                document {
+                  answers {
+                    totalCount
+                    edges {
+                      node {
+                        question {
+                          slug
+                        }
+                        ... on TableAnswer {
+                          value {
+                            id
+                          }
+                        }
+                      }
+                    }
+                  }
+                }
+              }
+            }
+          }
+        }
+
+        fragment Options on ChoiceQuestion {
+          options (first: 1) {
+            totalCount
+            edges {
+              node {
+                slug
+              }
+            }
+          }
+        }
+    """
+
+    # one query per connection, regardless of the number of cases
+    with django_assert_num_queries(6):
+        result = schema_executor(query)
+    assert not result.errors
+
+    for edge in result.data["allCases"]["edges"]:
+        case = edge["node"]
+        for work_item in case["workItems"]["edges"]:
+            questions = work_item["node"]["task"]["form"]["questions"]["edges"]
+            assert len(questions) == 1
+            options = questions[0]["node"]["options"]
+            assert options["totalCount"] == 2
+            assert len(options["edges"]) == 1
+        assert case["document"]["answers"]["totalCount"] == 2
+        rows = [
+            answer["node"]["value"]
+            for answer in case["document"]["answers"]["edges"]
+            if "value" in answer["node"]
+        ]
+        assert [len(value) for value in rows] == [2]
+
+
+def test_query_all_cases_nested_connections_visibility(
+    db, case, work_item_factory, schema_executor, mocker
+):
+    ready, completed, hidden = work_item_factory.create_batch(
+        3, case=case, child_case=None
+    )
+    completed.status = models.WorkItem.STATUS_COMPLETED
+    completed.save()
+
+    class CustomVisibility(BaseVisibility):
+        @filter_queryset_for(WorkItem)
+        def filter_queryset_for_work_item(self, node, queryset, info):
+            return queryset.exclude(pk=hidden.pk)
+
+    mocker.patch("caluma.core.types.Node.visibility_classes", [CustomVisibility])
+
+    query = """
+        query AllCases ($status: WorkItemStatusArgument) {
+          allCases {
+            edges {
+              node {
+                workItems {
+                  totalCount
+                }
+                readyWorkItems: workItems (status: $status) {
+                  edges {
+                    node {
+                      id
+                    }
+                  }
+                }
+              }
+            }
+          }
+        }
+    """
+    result = schema_executor(query, variables={"status": "READY"})
+    assert not result.errors
+
+    case_node = result.data["allCases"]["edges"][0]["node"]
+    assert case_node["workItems"]["totalCount"] == 2
+    assert [
+        extract_global_id(edge["node"]["id"])
+        for edge in case_node["readyWorkItems"]["edges"]
+    ] == [str(ready.pk)]
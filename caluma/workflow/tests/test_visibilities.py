@@ -4,15 +4,18 @@ from ...form import models as form_models
 from ...form.schema import Answer, Document
 from .. import models
 from ..schema import Case, WorkItem
-from ..visibilities import AddressedGroups
+from ..visibilities import AddressedGroups, MaterializedAddressedGroups
 
 
 @pytest.mark.parametrize(
     "work_item__addressed_groups,size", [(["unknown"], 0), (["admin", "other"], 1)]
 )
-def test_assigned_groups_work_item_visibility(db, admin_info, size, work_item):
+@pytest.mark.parametrize("visibility", [AddressedGroups, MaterializedAddressedGroups])
+def test_assigned_groups_work_item_visibility(
+    db, admin_info, size, visibility, work_item
+):
 
-    queryset = AddressedGroups().filter_queryset(
+    queryset = visibility().filter_queryset(
         WorkItem, models.WorkItem.objects, admin_info
     )
     assert queryset.count() == size
@@ -21,18 +24,22 @@ def test_assigned_groups_work_item_visibility(db, admin_info, size, work_item):
 @pytest.mark.parametrize(
     "work_item__addressed_groups,size", [(["unknown"], 0), (["admin", "other"], 1)]
 )
-def test_assigned_groups_case_visibility(db, admin_info, size, work_item):
+@pytest.mark.parametrize("visibility", [AddressedGroups, MaterializedAddressedGroups])
+def test_assigned_groups_case_visibility(db, admin_info, size, visibility, work_item):
 
-    queryset = AddressedGroups().filter_queryset(Case, models.Case.objects, admin_info)
+    queryset = visibility().filter_queryset(Case, models.Case.objects, admin_info)
     assert queryset.count() == size
 
 
 @pytest.mark.parametrize(
     "work_item__addressed_groups,size", [(["unknown"], 0), (["admin", "other"], 1)]
 )
-def test_assigned_groups_document_visibility(db, admin_info, size, work_item):
+@pytest.mark.parametrize("visibility", [AddressedGroups, MaterializedAddressedGroups])
+def test_assigned_groups_document_visibility(
+    db, admin_info, size, visibility, work_item
+):
 
-    queryset = AddressedGroups().filter_queryset(
+    queryset = visibility().filter_queryset(
         Document, form_models.Document.objects, admin_info
     )
     assert queryset.count() == size
@@ -41,9 +48,74 @@ def test_assigned_groups_document_visibility(db, admin_info, size, work_item):
 @pytest.mark.parametrize(
     "work_item__addressed_groups,size", [(["unknown"], 0), (["admin", "other"], 1)]
 )
-def test_assigned_groups_answer_visibility(db, admin_info, size, work_item, answer):
+@pytest.mark.parametrize("visibility", [AddressedGroups, MaterializedAddressedGroups])
+def test_assigned_groups_answer_visibility(
+    db, admin_info, size, visibility, work_item, answer
+):
 
-    queryset = AddressedGroups().filter_queryset(
+    queryset = visibility().filter_queryset(
         Answer, form_models.Answer.objects, admin_info
     )
     assert queryset.count() == size
+
+
+def _get_visible(visibility, info):
+    return {
+        node: set(
+            visibility()
+            .filter_queryset(node, model.objects, info)
+            .values_list("pk", flat=True)
+        )
+        for node, model in [
+            (WorkItem, models.WorkItem),
+            (Case, models.Case),
+            (Document, form_models.Document),
+            (Answer, form_models.Answer),
+        ]
+    }
+
+
+def test_materialized_addressed_groups(
+    db, admin_info, work_item_factory, document_factory, answer_factory
+):
+    work_item = work_item_factory(addressed_groups=["admin"])
+    row = document_factory(family=work_item.case.document.family)
+    answer_factory(document=row)
+    other = work_item_factory(addressed_groups=["other"], child_case=None)
+    answer_factory(document=other.document)
+
+    visible = _get_visible(MaterializedAddressedGroups, admin_info)
+    assert visible == _get_visible(AddressedGroups, admin_info)
+    assert visible[Case] == {work_item.case.pk, work_item.child_case.pk}
+    assert row.pk in visible[Document]
+
+    other.addressed_groups = ["admin", "other"]
+    other.save()
+    work_item.child_case.document = document_factory()
+    work_item.child_case.save()
+    work_item.addressed_groups = ["other"]
+    work_item.save()
+
+    visible = _get_visible(MaterializedAddressedGroups, admin_info)
+    assert visible == _get_visible(AddressedGroups, admin_info)
+    assert visible[Case] == {other.case.pk}
+
+
+@pytest.mark.parametrize("task__address_groups", ['["admin"]'])
+def test_materialized_addressed_groups_start_case(
+    db, admin_info, workflow, workflow_start_tasks, schema_executor
+):
+    query = """
+        mutation StartCase($input: StartCaseInput!) {
+          startCase(input: $input) {
+            clientMutationId
+          }
+        }
+    """
+
+    result = schema_executor(query, variables={"input": {"workflow": workflow.slug}})
+    assert not result.errors
+
+    visible = _get_visible(MaterializedAddressedGroups, admin_info)
+    assert visible == _get_visible(AddressedGroups, admin_info)
+    assert len(visible[Case]) == 1
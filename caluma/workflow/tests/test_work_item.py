@@ -36,6 +36,47 @@ def test_query_all_work_items_filter_status(db, work_item_factory, schema_execut
     )
 
 
+@pytest.mark.parametrize("task__type", [models.Task.TYPE_COMPLETE_TASK_FORM])
+def test_query_all_work_items_selected_relations(
+    db, task, work_item_factory, schema_executor, django_assert_num_queries
+):
+    work_item_factory.create_batch(3, task=task, child_case=None)
+
+    query = """
+        query WorkItems {
+          allWorkItems {
+            edges {
+              node {
+                case {
+                  document {
+                    form {
+                      slug
+                    }
+                  }
+                }
+                task {
+                  ... on CompleteTaskFormTask {
+                    form {
+                      slug
+                    }
+                  }
+                }
+              }
+            }
+          }
+        }
+    """
+
+    # nullable relations are joined as well as they are selected
+    with django_assert_num_queries(1):
+        result = schema_executor(query)
+    assert not result.errors
+    assert [
+        edge["node"]["task"]["form"]["slug"]
+        for edge in result.data["allWorkItems"]["edges"]
+    ] == [task.form.slug] * 3
+
+
 def test_query_all_work_items_filter_addressed_groups(
     db, work_item_factory, schema_executor
 ):
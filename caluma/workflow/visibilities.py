@@ -48,3 +48,34 @@ class AddressedGroups(BaseVisibility):
     def filter_queryset_for_answer(self, node, queryset, info):
         documents = self.get_visible_documents(node, queryset, info)
         return queryset.filter(document__in=documents)
+
+
+class MaterializedAddressedGroups(AddressedGroups):
+    """
+    Same as `AddressedGroups`, but looked up in `WorkItemVisibility`.
+
+    Instead of nesting work items, cases and documents, visible cases and
+    document families are read from the precomputed visibilities of the
+    groups of the user.
+    """
+
+    def get_visible_cases(self, node, queryset, info):
+        cases = models.WorkItemVisibility.objects.filter(
+            group__in=info.context.user.groups, case__isnull=False
+        ).values("case")
+        return models.Case.objects.filter(pk__in=cases)
+
+    def get_visible_families(self, node, queryset, info):
+        return models.WorkItemVisibility.objects.filter(
+            group__in=info.context.user.groups, family__isnull=False
+        ).values("family")
+
+    @filter_queryset_for(Document)
+    def filter_queryset_for_document(self, node, queryset, info):
+        families = self.get_visible_families(node, queryset, info)
+        return queryset.filter(family__in=families)
+
+    @filter_queryset_for(Answer)
+    def filter_queryset_for_answer(self, node, queryset, info):
+        families = self.get_visible_families(node, queryset, info)
+        return queryset.filter(document__family__in=families)
@@ -9,8 +9,19 @@ https://docs.djangoproject.com/en/1.11/howto/deployment/wsgi/
 
 import os
 
+from django.conf import settings
 from django.core.wsgi import get_wsgi_application
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "caluma.settings")
 
 application = get_wsgi_application()
+
+if settings.JEXL_CACHE_WARMUP:
+    from django.db import connections
+
+    from caluma.jexl import warm_up_jexl_cache
+
+    warm_up_jexl_cache()
+    # the application may be loaded before forking workers, which must not
+    # share the connection of the master process
+    connections.close_all()